@@ -1,38 +1,99 @@
-from typing import List, Optional
+from typing import Callable, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 import logging
-from functools import lru_cache
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import groupby
+from operator import itemgetter
+
+from src.constants import env
 
 from .schemas import (
+    ProductMention,
     TopProductsResponse,
+    ChannelActivity,
     ChannelActivityResponse,
     MessageSearchRequest,
     MessageSearchResponse
 )
+from .query import execute_query
 
 logger = logging.getLogger(__name__)
 
-def _execute_query_with_retry(db, query: str, params: dict = None, retries: int = 3) -> List:
-    """Execute query with retry mechanism"""
-    for attempt in range(retries):
-        try:
-            cur = db.cursor()
-            if params:
-                cur.execute(query, params)
-            else:
-                cur.execute(query)
-            return cur.fetchall()
-        except Exception as e:
-            if attempt == retries - 1:
-                raise
-            logger.warning(f"Query failed, retrying ({attempt + 1}/{retries}): {str(e)}")
-            continue
-
-@lru_cache(maxsize=128)
+_query_caches: List[Callable[[], None]] = []
+
+def clear_query_caches() -> None:
+    """Drop every memoized query result (e.g. after the data version changed)"""
+    for cache_clear in _query_caches:
+        cache_clear()
+
+_EPOCH = datetime(1970, 1, 1)
+
+def default_range(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    days: int = 30
+) -> Tuple[datetime, datetime]:
+    """Fill in a missing range as the last `days` days.
+
+    "Now" is rounded up to the end of the current `env.API_CACHE_TTL` window,
+    so requests relying on the defaults share one `_query_cache` key per
+    window instead of a new one every microsecond.
+    """
+    now = datetime.utcnow()
+    if env.API_CACHE_TTL > 0:
+        window = timedelta(seconds=env.API_CACHE_TTL)
+        now = _EPOCH + ((now - _EPOCH) // window + 1) * window
+    return start_date or now - timedelta(days=days), end_date or now
+
+def _query_cache(maxsize: int = 128):
+    """Memoize a crud function on its arguments, ignoring the connection.
+
+    Entries expire after `env.API_CACHE_TTL` seconds; a TTL of 0 disables the cache.
+    Callers fill in default dates with `default_range` so they can hit it.
+    Endpoints run in the threadpool, so the cache is only touched under its lock;
+    the query itself runs outside it.
+    """
+    def decorator(fn):
+        cache: OrderedDict = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            ttl = env.API_CACHE_TTL
+            if ttl <= 0:
+                return fn(db, *args, **kwargs)
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+                if hit is not None and now - hit[0] < ttl:
+                    cache.move_to_end(key)
+                    return hit[1]
+            value = fn(db, *args, **kwargs)
+            with lock:
+                cache[key] = (now, value)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return value
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        _query_caches.append(cache_clear)
+        return wrapper
+    return decorator
+
+@_query_cache(maxsize=128)
 def get_top_products(db, limit: int = 10) -> List[TopProductsResponse]:
     """Get top products based on mention frequency"""
     try:
-        results = _execute_query_with_retry(db, """
+        results = execute_query(db, "top_products", """
             SELECT 
                 ch.channel_name,
                 p.product_name,
@@ -65,7 +126,52 @@ def get_top_products(db, limit: int = 10) -> List[TopProductsResponse]:
         logger.error(f"Error in get_top_products: {str(e)}")
         raise
 
-@lru_cache(maxsize=64)
+ACTIVITY_FIELDS = ("date", "message_count", "avg_message_length", "image_count", "video_count")
+SEARCH_FIELDS = ("message_id", "channel", "content", "timestamp", "media_type", "sentiment_score", "confidence_score")
+CLUSTER_FIELDS = ("cluster_channel", "cluster_id", "cluster_size")
+DETECTED_CLASS_FIELDS = ("class_id", "class_name", "detection_count", "mean_confidence", "image_count")
+DETECTION_DAY_FIELDS = ("date", "images_processed", "images_with_detections", "detection_count")
+
+def _fetch_channel_activity(db, channel_name: str, start_date: datetime, end_date: datetime) -> List:
+    """Run the daily activity aggregation for a channel"""
+    return execute_query(db, "channel_activity", """
+        WITH daily_stats AS (
+            SELECT 
+                TRUNC(m.message_ts) as date,
+                COUNT(*) as message_count,
+                AVG(LENGTH(m.message_text)) as avg_message_length,
+                COUNT(CASE WHEN m.media_type = 'image' THEN 1 END) as image_count,
+                COUNT(CASE WHEN m.media_type = 'video' THEN 1 END) as video_count
+            FROM telegram_mart.messages m
+            JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
+            WHERE c.channel_name = :channel_name
+            AND m.message_ts BETWEEN :start_date AND :end_date
+            GROUP BY TRUNC(m.message_ts)
+        )
+        SELECT 
+            ds.date,
+            ds.message_count,
+            ds.avg_message_length,
+            ds.image_count,
+            ds.video_count
+        FROM daily_stats ds
+        ORDER BY ds.date
+    """, {
+        "channel_name": channel_name,
+        "start_date": start_date,
+        "end_date": end_date
+    })
+
+def _activity_totals(results: List) -> dict:
+    total_messages = sum(row[1] for row in results)
+    total_media = sum(row[3] + row[4] for row in results)
+    return {
+        "total_messages": total_messages,
+        "total_media": total_media,
+        "avg_daily_messages": total_messages / len(results) if results else 0
+    }
+
+@_query_cache(maxsize=64)
 def get_channel_activity(
     db, 
     channel_name: str,
@@ -74,33 +180,7 @@ def get_channel_activity(
 ) -> ChannelActivityResponse:
     """Get posting activity for a specific channel"""
     try:
-        results = _execute_query_with_retry(db, """
-            WITH daily_stats AS (
-                SELECT 
-                    TRUNC(m.message_ts) as date,
-                    COUNT(*) as message_count,
-                    AVG(LENGTH(m.message_text)) as avg_message_length,
-                    COUNT(CASE WHEN m.media_type = 'image' THEN 1 END) as image_count,
-                    COUNT(CASE WHEN m.media_type = 'video' THEN 1 END) as video_count
-                FROM telegram_mart.messages m
-                JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
-                WHERE c.channel_name = :channel_name
-                AND m.message_ts BETWEEN :start_date AND :end_date
-                GROUP BY TRUNC(m.message_ts)
-            )
-            SELECT 
-                ds.date,
-                ds.message_count,
-                ds.avg_message_length,
-                ds.image_count,
-                ds.video_count
-            FROM daily_stats ds
-            ORDER BY ds.date
-        """, {
-            "channel_name": channel_name,
-            "start_date": start_date,
-            "end_date": end_date
-        })
+        results = _fetch_channel_activity(db, channel_name, start_date, end_date)
         
         if not results:
             return None
@@ -116,52 +196,423 @@ def get_channel_activity(
             for date, message_count, avg_message_length, image_count, video_count in results
         ]
         
-        total_messages = sum(item.message_count for item in activity_history)
-        total_media = sum(item.image_count + item.video_count for item in activity_history)
-        avg_daily_messages = total_messages / len(activity_history) if activity_history else 0
-        
         return ChannelActivityResponse(
             channel_name=channel_name,
             activity_history=activity_history,
-            total_messages=total_messages,
-            total_media=total_media,
-            avg_daily_messages=avg_daily_messages
+            **_activity_totals(results)
         )
     except Exception as e:
         logger.error(f"Error in get_channel_activity: {str(e)}")
         raise
 
+@_query_cache(maxsize=64)
+def get_channel_activity_payload(
+    db,
+    channel_name: str,
+    start_date: datetime,
+    end_date: datetime,
+    columnar: bool = False
+) -> Optional[dict]:
+    """Channel activity as plain JSON-ready data, skipping per-row model validation
+
+    DB rows are trusted, so they go straight into dicts (or, with `columnar`, one
+    array per field under `activity_columns`) for `FastJSONResponse`.
+    """
+    try:
+        results = _fetch_channel_activity(db, channel_name, start_date, end_date)
+        
+        if not results:
+            return None
+        
+        payload = {"channel_name": channel_name, **_activity_totals(results)}
+        if columnar:
+            payload["activity_columns"] = dict(zip(ACTIVITY_FIELDS, map(list, zip(*results))))
+        else:
+            payload["activity_history"] = [dict(zip(ACTIVITY_FIELDS, row)) for row in results]
+        return payload
+    except Exception as e:
+        logger.error(f"Error in get_channel_activity_payload: {str(e)}")
+        raise
+
+def _padded_in_list(prefix: str, values: Sequence) -> Tuple[str, dict]:
+    """Bind placeholders and values for an IN list padded to a power of two
+
+    Padding repeats the last value, so the number of distinct statements, and
+    hard parses, stays small.
+    """
+    size = 8
+    while size < len(values):
+        size *= 2
+    padded = list(values) + [values[-1]] * (size - len(values))
+    params = {f"{prefix}{i}": value for i, value in enumerate(padded)}
+    return ", ".join(f":{prefix}{i}" for i in range(size)), params
+
+def _fetch_channels_activity(db, channel_names: tuple, start_date: datetime, end_date: datetime) -> List:
+    """Run the daily activity aggregation for several channels in one statement"""
+    in_list, params = _padded_in_list("c", channel_names)
+    params.update({"start_date": start_date, "end_date": end_date})
+
+    return execute_query(db, "channels_activity", f"""
+        SELECT 
+            c.channel_name,
+            TRUNC(m.message_ts) as date,
+            COUNT(*) as message_count,
+            AVG(LENGTH(m.message_text)) as avg_message_length,
+            COUNT(CASE WHEN m.media_type = 'image' THEN 1 END) as image_count,
+            COUNT(CASE WHEN m.media_type = 'video' THEN 1 END) as video_count
+        FROM telegram_mart.messages m
+        JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
+        WHERE c.channel_name IN ({in_list})
+        AND m.message_ts BETWEEN :start_date AND :end_date
+        GROUP BY c.channel_name, TRUNC(m.message_ts)
+        ORDER BY c.channel_name, date
+    """, params)
+
+@_query_cache(maxsize=32)
+def get_channels_activity_payloads(
+    db,
+    channel_names: tuple,
+    start_date: datetime,
+    end_date: datetime,
+    columnar: bool = False
+) -> List[dict]:
+    """Activity payloads for several channels from one grouped query
+
+    Each payload has the shape of `get_channel_activity_payload`, in the order
+    of `channel_names`; channels without activity in the period get an empty
+    history and zero totals.
+    """
+    try:
+        results = _fetch_channels_activity(db, channel_names, start_date, end_date)
+
+        rows_by_channel = {
+            channel: [row[1:] for row in rows]
+            for channel, rows in groupby(results, key=itemgetter(0))
+        }
+        payloads = []
+        for channel_name in channel_names:
+            rows = rows_by_channel.get(channel_name, [])
+            payload = {"channel_name": channel_name, **_activity_totals(rows)}
+            if columnar:
+                columns = list(map(list, zip(*rows))) or [[] for _ in ACTIVITY_FIELDS]
+                payload["activity_columns"] = dict(zip(ACTIVITY_FIELDS, columns))
+            else:
+                payload["activity_history"] = [dict(zip(ACTIVITY_FIELDS, row)) for row in rows]
+            payloads.append(payload)
+        return payloads
+    except Exception as e:
+        logger.error(f"Error in get_channels_activity_payloads: {str(e)}")
+        raise
+
+# Granularity -> (rollup table, bucket expression, range start rounded down to its bucket)
+_SERIES_SOURCES = {
+    "hour": ("channel_activity_hourly", "a.bucket_ts", "TRUNC(:start_date, 'HH24')"),
+    "day": ("channel_activity_daily", "a.bucket_ts", "TRUNC(:start_date)"),
+    "week": ("channel_activity_daily", "TRUNC(a.bucket_ts, 'IW')", "TRUNC(:start_date, 'IW')"),
+    "month": ("channel_activity_daily", "TRUNC(a.bucket_ts, 'MM')", "TRUNC(:start_date, 'MM')"),
+}
+
+def _fetch_activity_buckets(db, channel_name: str, granularity: str, start_date: datetime, end_date: datetime) -> List:
+    """Read one channel's activity buckets from the rollup tables, oldest first"""
+    table, bucket, range_start = _SERIES_SOURCES[granularity]
+    return execute_query(db, f"activity_series_{granularity}", f"""
+        SELECT
+            {bucket} as bucket,
+            SUM(a.message_count),
+            SUM(a.text_count),
+            SUM(a.text_length_sum),
+            SUM(a.image_count),
+            SUM(a.video_count)
+        FROM telegram_mart.{table} a
+        JOIN telegram_mart.channels c ON c.channel_id = a.channel_id
+        WHERE c.channel_name = :channel_name
+        AND a.bucket_ts BETWEEN {range_start} AND :end_date
+        GROUP BY {bucket}
+        ORDER BY bucket
+    """, {
+        "channel_name": channel_name,
+        "start_date": start_date,
+        "end_date": end_date
+    })
+
+@_query_cache(maxsize=64)
+def get_activity_series(
+    db,
+    channel_name: str,
+    granularity: str,
+    start_date: datetime,
+    end_date: datetime,
+    points: int = 1000
+) -> Optional[dict]:
+    """Activity series in a compact columnar encoding, downsampled to `points`
+
+    Buckets without messages between the first and last active one are filled
+    with zeros; series longer than `points` are reduced with LTTB on
+    `message_count`, the other fields taken at the same buckets. Timestamps
+    are bucket starts in epoch seconds (UTC) under `series["t"]`. Totals are
+    computed before downsampling.
+    """
+    try:
+        results = _fetch_activity_buckets(db, channel_name, granularity, start_date, end_date)
+
+        if not results:
+            return None
+
+        import numpy as np
+
+        from src.activity import fill_buckets, lttb
+
+        buckets, *columns = zip(*results)
+        grid, (messages, texts, text_lengths, images, videos) = fill_buckets(buckets, columns, granularity)
+        keep = lttb(messages, points)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_length = np.round(text_lengths[keep] / texts[keep], 1)
+        return {
+            "channel_name": channel_name,
+            "granularity": granularity,
+            "buckets": len(grid),
+            "points": len(keep),
+            "total_messages": int(messages.sum()),
+            "total_media": int(images.sum() + videos.sum()),
+            "series": {
+                "t": grid[keep].astype(np.int64).tolist(),
+                "message_count": messages[keep].astype(np.int64).tolist(),
+                "avg_message_length": [None if np.isnan(v) else v for v in avg_length.tolist()],
+                "image_count": images[keep].astype(np.int64).tolist(),
+                "video_count": videos[keep].astype(np.int64).tolist(),
+            }
+        }
+    except Exception as e:
+        logger.error(f"Error in get_activity_series: {str(e)}")
+        raise
+
+@_query_cache(maxsize=64)
+def get_top_detected_classes(
+    db,
+    channel: Optional[str],
+    start_date: datetime,
+    end_date: datetime,
+    limit: int = 10
+) -> dict:
+    """Most detected object classes from the daily detection aggregates"""
+    try:
+        params = {"start_date": start_date, "end_date": end_date, "limit": limit}
+        channel_clause = ""
+        if channel:
+            channel_clause = "AND channel_slug = :channel"
+            params["channel"] = channel
+
+        results = execute_query(db, "top_detected_classes", f"""
+            SELECT 
+                class_id,
+                MAX(class_name) as class_name,
+                SUM(detection_count) as detection_count,
+                SUM(confidence_sum) / SUM(detection_count) as mean_confidence,
+                SUM(image_count) as image_count
+            FROM telegram_raw.detection_class_daily
+            WHERE detection_date BETWEEN TRUNC(:start_date) AND :end_date
+            {channel_clause}
+            GROUP BY class_id
+            ORDER BY detection_count DESC
+            FETCH FIRST :limit ROWS ONLY
+        """, params)
+
+        return {
+            "channel": channel,
+            "start_date": start_date,
+            "end_date": end_date,
+            "classes": [dict(zip(DETECTED_CLASS_FIELDS, row)) for row in results]
+        }
+    except Exception as e:
+        logger.error(f"Error in get_top_detected_classes: {str(e)}")
+        raise
+
+@_query_cache(maxsize=64)
+def get_channel_detections_payload(
+    db,
+    channel_name: str,
+    start_date: datetime,
+    end_date: datetime
+) -> Optional[dict]:
+    """Daily image and detection counts for a channel from the detection aggregates"""
+    try:
+        results = execute_query(db, "channel_detections", """
+            SELECT 
+                detection_date as date,
+                images_processed,
+                images_with_detections,
+                detection_count
+            FROM telegram_raw.detection_daily
+            WHERE channel_slug = :channel_name
+            AND detection_date BETWEEN TRUNC(:start_date) AND :end_date
+            ORDER BY detection_date
+        """, {
+            "channel_name": channel_name,
+            "start_date": start_date,
+            "end_date": end_date
+        })
+
+        if not results:
+            return None
+
+        return {
+            "channel_name": channel_name,
+            "detection_history": [dict(zip(DETECTION_DAY_FIELDS, row)) for row in results],
+            "total_images": sum(row[1] for row in results),
+            "total_images_with_detections": sum(row[2] for row in results),
+            "total_detections": sum(row[3] for row in results)
+        }
+    except Exception as e:
+        logger.error(f"Error in get_channel_detections_payload: {str(e)}")
+        raise
+
+def _fetch_search_messages(
+    db,
+    query: str,
+    channel: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: int,
+    collapse_duplicates: bool = False
+) -> List:
+    """Run the keyword search with optional channel and date filters
+
+    With `collapse_duplicates`, matches in the same near-duplicate cluster
+    (`telegram_raw.message_clusters`) are returned once, as the newest match,
+    with the cluster (channel and message id of its first post) and the
+    number of matches it stands for.
+    """
+    params = {
+        "query": f"%{query}%",
+        "limit": limit
+    }
+    
+    where_clauses = []
+    if channel:
+        where_clauses.append("c.channel_name = :channel_name")
+        params["channel_name"] = channel
+    
+    if start_date:
+        where_clauses.append("m.message_ts >= :start_date")
+        params["start_date"] = start_date
+    
+    if end_date:
+        where_clauses.append("m.message_ts <= :end_date")
+        params["end_date"] = end_date
+    
+    where_clauses.append("LOWER(m.message_text) LIKE LOWER(:query)")
+    where_clause = "WHERE " + " AND ".join(where_clauses)
+    
+    if collapse_duplicates:
+        return execute_query(db, "search_messages_collapsed", f"""
+            SELECT 
+                message_id,
+                channel_name,
+                content,
+                message_ts as timestamp,
+                media_type,
+                sentiment_score,
+                confidence_score,
+                cluster_channel,
+                cluster_id,
+                cluster_size
+            FROM (
+                SELECT 
+                    m.message_id,
+                    c.channel_name,
+                    m.message_text as content,
+                    m.message_ts,
+                    m.media_type,
+                    m.sentiment_score,
+                    m.confidence_score,
+                    COALESCE(mc.cluster_slug, c.channel_name) as cluster_channel,
+                    COALESCE(mc.cluster_id, m.message_id) as cluster_id,
+                    COUNT(*) OVER (
+                        PARTITION BY COALESCE(mc.cluster_slug, c.channel_name), COALESCE(mc.cluster_id, m.message_id)
+                    ) as cluster_size,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY COALESCE(mc.cluster_slug, c.channel_name), COALESCE(mc.cluster_id, m.message_id)
+                        ORDER BY m.message_ts DESC, m.message_id DESC
+                    ) as cluster_rank
+                FROM telegram_mart.messages m
+                JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
+                LEFT JOIN telegram_raw.message_clusters mc
+                    ON mc.channel_slug = c.channel_name AND mc.message_id = m.message_id
+                {where_clause}
+            )
+            WHERE cluster_rank = 1
+            ORDER BY message_ts DESC
+            FETCH FIRST :limit ROWS ONLY
+        """, params)
+    
+    return execute_query(db, "search_messages", f"""
+        SELECT 
+            m.message_id,
+            c.channel_name,
+            m.message_text as content,
+            m.message_ts as timestamp,
+            m.media_type,
+            m.sentiment_score,
+            m.confidence_score
+        FROM telegram_mart.messages m
+        JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
+        {where_clause}
+        ORDER BY m.message_ts DESC
+        FETCH FIRST :limit ROWS ONLY
+    """, params)
+
 def search_messages(
     db,
     query: str,
     channel: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    limit: int = 10
+    limit: int = 10,
+    collapse_duplicates: bool = False
 ) -> List[MessageSearchResponse]:
     """Search messages containing specific keywords"""
     try:
-        params = {
-            "query": f"%{query}%",
-            "limit": limit
-        }
-        
-        where_clauses = []
-        if channel:
-            where_clauses.append("c.channel_name = :channel_name")
-            params["channel_name"] = channel
-        
-        if start_date:
-            where_clauses.append("m.message_ts >= :start_date")
-            params["start_date"] = start_date
-        
-        if end_date:
-            where_clauses.append("m.message_ts <= :end_date")
-            params["end_date"] = end_date
-        
-        where_clause = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+        results = _fetch_search_messages(
+            db, query, channel, start_date, end_date, limit, collapse_duplicates
+        )
+        fields = SEARCH_FIELDS + CLUSTER_FIELDS if collapse_duplicates else SEARCH_FIELDS
         
-        results = _execute_query_with_retry(db, f"""
+        return [MessageSearchResponse(**dict(zip(fields, row))) for row in results]
+    except Exception as e:
+        logger.error(f"Error in search_messages: {str(e)}")
+        raise
+
+def search_messages_records(
+    db,
+    query: str,
+    channel: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 10,
+    collapse_duplicates: bool = False
+) -> List[dict]:
+    """Same as `search_messages` but returns plain dicts shaped like `MessageSearchResponse`"""
+    try:
+        results = _fetch_search_messages(
+            db, query, channel, start_date, end_date, limit, collapse_duplicates
+        )
+        fields = SEARCH_FIELDS + CLUSTER_FIELDS if collapse_duplicates else SEARCH_FIELDS
+        return [dict(zip(fields, row)) for row in results]
+    except Exception as e:
+        logger.error(f"Error in search_messages_records: {str(e)}")
+        raise
+
+def get_messages_by_keys(db, keys: Sequence[Tuple[str, int]]) -> List[dict]:
+    """Mart rows for the given (channel, message_id) keys, in the given order, shaped like `MessageSearchResponse`
+
+    Keys missing from the mart (not transformed yet) are skipped.
+    """
+    if not keys:
+        return []
+    try:
+        in_list, params = _padded_in_list("m", list(dict.fromkeys(mid for _, mid in keys)))
+        results = execute_query(db, "messages_by_ids", f"""
             SELECT 
                 m.message_id,
                 c.channel_name,
@@ -172,24 +623,11 @@ def search_messages(
                 m.confidence_score
             FROM telegram_mart.messages m
             JOIN telegram_mart.channels c ON c.channel_id = m.channel_id
-            {where_clause}
-            AND (LOWER(m.message_text) LIKE LOWER(:query))
-            ORDER BY m.message_ts DESC
-            FETCH FIRST :limit ROWS ONLY
+            WHERE m.message_id IN ({in_list})
         """, params)
-        
-        return [
-            MessageSearchResponse(
-                message_id=message_id,
-                channel=channel_name,
-                content=content,
-                timestamp=timestamp,
-                media_type=media_type,
-                sentiment_score=sentiment_score,
-                confidence_score=confidence_score
-            )
-            for message_id, channel_name, content, timestamp, media_type, sentiment_score, confidence_score in results
-        ]
+        # Message ids repeat across channels; the channel picks the row
+        by_key = {(row[1], row[0]): dict(zip(SEARCH_FIELDS, row)) for row in results}
+        return [by_key[key] for key in keys if key in by_key]
     except Exception as e:
-        logger.error(f"Error in search_messages: {str(e)}")
+        logger.error(f"Error in get_messages_by_keys: {str(e)}")
         raise
@@ -1,23 +1,68 @@
-from typing import Generator
-import oracledb
+from typing import TYPE_CHECKING, Generator, Optional
 from contextlib import contextmanager
 from src.constants import env
+from src.db import init_client
+from .query import guarded_connect
 
-# Initialize Oracle thin mode
-oracledb.init_oracle_client(lib_dir=None)
+if TYPE_CHECKING:
+    import oracledb
 
-@contextmanager
-def get_db():
-    """Get database connection context manager"""
-    try:
-        conn = oracledb.connect(
+_pool: Optional["oracledb.ConnectionPool"] = None
+
+def init_pool(min_size: int, max_size: int) -> None:
+    """Open the per-worker session pool and make one round trip before serving"""
+    global _pool
+    if env.DB_BACKEND != "local" and _pool is None:
+        oracledb = init_client()
+        _pool = oracledb.create_pool(
             user="SYSTEM",
             password=env.ORACLE_PASSWORD,
-            dsn=env.ORACLE_DSN
+            dsn=env.ORACLE_DSN,
+            min=min_size,
+            max=max_size,
+            increment=1,
+            getmode=oracledb.POOL_GETMODE_WAIT,
         )
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM dual")
+        cur.fetchall()
+
+def close_pool() -> None:
+    """Close the session pool once in-flight requests have drained"""
+    global _pool
+    if _pool is not None:
+        _pool.close(force=True)
+        _pool = None
+
+def _connect():
+    if env.DB_BACKEND == "local":
+        from src.db.local import connect_local
+
+        return connect_local(env.LOCAL_DB_DIR)
+    if _pool is not None:
+        return _pool.acquire()
+    return init_client().connect(
+        user="SYSTEM",
+        password=env.ORACLE_PASSWORD,
+        dsn=env.ORACLE_DSN
+    )
+
+@contextmanager
+def get_db():
+    """Get database connection context manager
+
+    Connecting goes through the circuit breaker: it fails fast with
+    `CircuitOpenError` while the breaker is open, and transient connect errors
+    count towards opening it.
+    """
+    conn = guarded_connect(_connect)
+    try:
         yield conn
-    except Exception as e:
-        raise Exception(f"Database connection error: {str(e)}")
     finally:
-        if 'conn' in locals():
-            conn.close()
+        conn.close()
+
+def get_db_session() -> Generator:
+    """FastAPI dependency yielding a connection for the duration of a request"""
+    with get_db() as conn:
+        yield conn
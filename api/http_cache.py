@@ -0,0 +1,164 @@
+"""Conditional GET support for the report endpoints.
+
+The marts only change when the daily pipeline runs, so report responses are
+validated against the data-version watermark (`src.db.watermark`) rather than
+recomputed. `ConditionalGetMiddleware` runs before routing and dependency
+resolution: a matching `If-None-Match` / `If-Modified-Since` is answered with
+304 without acquiring a DB connection. The watermark itself is read at most
+once per `API_WATERMARK_TTL` seconds per worker.
+
+Successful responses get ETag, Last-Modified and a Cache-Control header that
+lets browsers (`max-age`) and shared caches such as a CDN or reverse proxy
+(`s-maxage`) absorb dashboard polling.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.constants import env
+from src.db.watermark import read_watermark
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersion:
+    """Caches the data-version watermark for `ttl` seconds.
+
+    `on_change` runs when a refresh sees a new watermark, so in-process result
+    caches never serve pre-load data under a post-load ETag.
+    """
+
+    def __init__(self, connect: Callable, ttl: float, on_change: Optional[Callable[[], None]] = None) -> None:
+        self._connect = connect
+        self._ttl = ttl
+        self._on_change = on_change
+        self._value: Optional[datetime] = None
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> Optional[datetime]:
+        with self._connect() as conn:
+            return read_watermark(conn.cursor())
+
+    async def get(self) -> Optional[datetime]:
+        if time.monotonic() - self._fetched_at < self._ttl:
+            return self._value
+        async with self._lock:
+            if time.monotonic() - self._fetched_at < self._ttl:
+                return self._value
+            try:
+                value = await run_in_threadpool(self._read)
+            except Exception as e:
+                # Keep the last known version (None: no validators yet); never fail
+                # the request over it, and don't drop the result caches for a blip
+                logger.warning(f"Could not read data version watermark: {str(e)}")
+                value = self._value
+            if value != self._value and self._on_change is not None:
+                self._on_change()
+            self._value = value
+            self._fetched_at = time.monotonic()
+        return self._value
+
+
+def _last_modified(watermark: datetime, today: datetime) -> datetime:
+    # Endpoints default to "last 30 days", so a response can change at midnight
+    # UTC without a new watermark; the ETag keys on the date for the same reason
+    return max(watermark, today).replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def _etag(watermark: datetime, today: datetime, scope: Scope) -> str:
+    key = "|".join((
+        watermark.isoformat(),
+        today.date().isoformat(),
+        scope["path"],
+        scope.get("query_string", b"").decode("latin-1"),
+    ))
+    return 'W/"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore the W/ prefix on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified <= since
+
+
+class ConditionalGetMiddleware:
+    """Adds validators to GET responses under `prefixes` and answers 304s."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        version: DataVersion,
+        prefixes: tuple[str, ...],
+        exclude: tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self.version = version
+        self.prefixes = prefixes
+        self.exclude = exclude
+        self.cache_control = (
+            f"public, max-age={env.API_HTTP_MAX_AGE}, s-maxage={env.API_HTTP_SHARED_MAX_AGE}"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.prefixes)
+            or (self.exclude and scope["path"].startswith(self.exclude))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        watermark = await self.version.get()
+        if watermark is None:
+            await self.app(scope, receive, send)
+            return
+
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        etag = _etag(watermark, today, scope)
+        last_modified = _last_modified(watermark, today)
+        validators = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": self.cache_control,
+        }
+
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        else:
+            if_modified_since = request_headers.get("if-modified-since")
+            not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, last_modified)
+        if not_modified:
+            await Response(status_code=304, headers=validators)(scope, receive, send)
+            return
+
+        async def send_with_validators(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                MutableHeaders(scope=message).update(validators)
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
@@ -1,36 +1,96 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Literal, Optional, Union
+from datetime import datetime
+from contextlib import asynccontextmanager
+from pathlib import Path
 import logging
-from functools import lru_cache
+import time
 
-from .database import get_db
+from fastapi.responses import StreamingResponse
+
+from src.constants import env
+from src.trending import SnapshotReader
+from .database import close_pool, get_db, get_db_session, init_pool
+from .export import EXPORT_COLUMNS, MEDIA_TYPES, export_schema, iter_record_batches, stream_export
+from .http_cache import ConditionalGetMiddleware, DataVersion
+from .query import CircuitOpenError, breaker, guarded_stream, query_stats
+from .responses import FastJSONResponse, NDJSONResponse
 from .schemas import (
     TopProductsResponse,
     ChannelActivityResponse,
+    ChannelActivityColumnarResponse,
+    ActivitySeriesResponse,
     MessageSearchResponse,
-    MessageSearchRequest
+    MessageSearchRequest,
+    TrendingResponse,
+    TopDetectedClassesResponse,
+    ChannelDetectionsResponse,
+    SimilarMessageResponse
 )
 from .crud import (
+    clear_query_caches,
+    default_range,
+    get_activity_series,
     get_top_products,
-    get_channel_activity,
-    search_messages
+    get_channel_activity_payload,
+    get_channels_activity_payloads,
+    get_channel_detections_payload,
+    get_messages_by_keys,
+    get_top_detected_classes,
+    search_messages_records
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the DB pool before the worker accepts traffic; close it after draining"""
+    from src.config import ServerSettings
+
+    server = ServerSettings()
+    init_pool(server.db_pool_min, server.db_pool_max)
+    # Start warm: load the trending snapshot before serving
+    trending_snapshot.get(time.monotonic())
+    yield
+    close_pool()
+
 app = FastAPI(
     title="Telegram Analytics API",
     version="1.0.0",
     description="API for analyzing medical product mentions in Telegram channels",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Enable CORS
+# Streaming trending sketches, reloaded when the pipeline writes a new snapshot
+trending_snapshot = SnapshotReader(Path(env.TRENDING_SNAPSHOT), env.TRENDING_CHECK_SECONDS)
+
+# Similar-message index, created on first use: numpy/scipy stay out of the import path
+_similar_reader = None
+
+def _similar_index():
+    global _similar_reader
+    if _similar_reader is None:
+        from src.similar import IndexReader
+
+        _similar_reader = IndexReader(Path(env.SIMILAR_INDEX), env.SIMILAR_CHECK_SECONDS)
+    return _similar_reader.get(time.monotonic())
+
+# ETag / Last-Modified / 304 handling for the read-only report endpoints
+app.add_middleware(
+    ConditionalGetMiddleware,
+    version=DataVersion(get_db, ttl=env.API_WATERMARK_TTL, on_change=clear_query_caches),
+    prefixes=("/api/reports/", "/api/channels/"),
+    # Trending windows slide with the clock, not with the data-version watermark
+    exclude=("/api/reports/trending",),
+)
+
+# Enable CORS (added last so it also wraps 304 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -44,11 +104,29 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@app.get("/api/health/queries")
+async def query_stats_endpoint():
+    """Per-query timings of this worker and the database circuit breaker state"""
+    return query_stats()
+
+# Endpoints that query the database are plain `def`: FastAPI runs them in its
+# threadpool, so blocking driver calls and execute_query's retry backoff do not
+# stall the event loop.
+
+def _unavailable(e: CircuitOpenError) -> HTTPException:
+    """503 telling clients when the circuit breaker lets queries through again"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request, e: CircuitOpenError):
+    """503 for the breaker refusing a connection before the endpoint ran (`get_db_session`)"""
+    error = _unavailable(e)
+    return FastJSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+
 @app.get("/api/reports/top-products", response_model=List[TopProductsResponse])
-@lru_cache(maxsize=128)
-async def get_top_products_endpoint(
+def get_top_products_endpoint(
     limit: int = Query(10, ge=1, le=100),
-    db=Depends(get_db)
+    db=Depends(get_db_session)
 ):
     """Get top products based on mention frequency
     
@@ -58,16 +136,151 @@ async def get_top_products_endpoint(
     try:
         results = get_top_products(db, limit)
         return results
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching top products: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/channels/{channel_name}/activity", response_model=ChannelActivityResponse)
-async def get_channel_activity_endpoint(
+@app.get("/api/reports/trending", response_model=TrendingResponse)
+def get_trending_endpoint(
+    hours: int = Query(1, ge=1, le=24),
+    baseline_hours: int = Query(24, ge=1, le=144),
+    channel: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    min_count: int = Query(3, ge=1)
+):
+    """Get products whose mention rate is spiking, answered from the streaming sketches
+    
+    Args:
+        hours: Window length in hours, ending now
+        baseline_hours: Preceding hours used as the expected mention rate
+        channel: Optional channel filter
+        limit: Number of products to return
+        min_count: Minimum mentions in the window
+    """
+    try:
+        store = trending_snapshot.get(time.monotonic())
+    except Exception as e:
+        logger.error(f"Error loading trending snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if store is None:
+        raise HTTPException(status_code=503, detail="Trending snapshot not available yet")
+
+    result = store.trending(
+        hours=hours,
+        baseline_hours=baseline_hours,
+        channel=channel,
+        limit=limit,
+        min_count=min_count
+    )
+    return FastJSONResponse(
+        result,
+        headers={"Cache-Control": f"public, max-age={env.TRENDING_CHECK_SECONDS}"}
+    )
+
+@app.get("/api/reports/detections/top-classes", response_model=TopDetectedClassesResponse)
+def get_top_detected_classes_endpoint(
+    channel: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db=Depends(get_db_session)
+):
+    """Get the most detected object classes in channel images
+    
+    Args:
+        channel: Optional channel filter
+        start_date: Start date (default: 30 days ago)
+        end_date: End date (default: now)
+        limit: Number of classes to return (1-100)
+    """
+    try:
+        start_date, end_date = default_range(start_date, end_date)
+
+        result = get_top_detected_classes(db, channel, start_date, end_date, limit)
+        return FastJSONResponse(result)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching top detected classes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/channels/{channel_name}/detections", response_model=ChannelDetectionsResponse)
+def get_channel_detections_endpoint(
     channel_name: str,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db=Depends(get_db)
+    db=Depends(get_db_session)
+):
+    """Get daily image enrichment counts for a specific channel
+    
+    Args:
+        channel_name: Name of the channel to analyze
+        start_date: Start date (default: 30 days ago)
+        end_date: End date (default: now)
+    """
+    try:
+        start_date, end_date = default_range(start_date, end_date)
+
+        result = get_channel_detections_payload(db, channel_name, start_date, end_date)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching channel detections: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Channel {channel_name} has no processed images in specified period"
+        )
+    return FastJSONResponse(result)
+
+@app.get("/api/channels/activity", response_class=NDJSONResponse)
+def get_channels_activity_endpoint(
+    channels: List[str] = Query(..., alias="channel"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    format: Literal["rows", "columnar"] = "rows",
+    db=Depends(get_db_session)
+):
+    """Get posting activity for several channels in one request
+    
+    Runs one query grouped by channel and day and streams one JSON line per
+    channel (same shape as the single-channel endpoint), in request order.
+    
+    Args:
+        channels: Channel names, repeated (`?channel=a&channel=b`), at most 100
+        start_date: Start date for activity analysis
+        end_date: End date for activity analysis
+        format: "rows" (one object per day) or "columnar" (one array per field)
+    """
+    names = tuple(dict.fromkeys(channels))
+    if len(names) > 100:
+        raise HTTPException(status_code=422, detail="At most 100 channels per request")
+    try:
+        start_date, end_date = default_range(start_date, end_date)
+
+        payloads = get_channels_activity_payloads(
+            db, names, start_date, end_date, columnar=format == "columnar"
+        )
+        return NDJSONResponse(payloads)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching activity for {len(names)} channels: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get(
+    "/api/channels/{channel_name}/activity",
+    response_model=Union[ChannelActivityResponse, ChannelActivityColumnarResponse]
+)
+def get_channel_activity_endpoint(
+    channel_name: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    format: Literal["rows", "columnar"] = "rows",
+    db=Depends(get_db_session)
 ):
     """Get posting activity for a specific channel
     
@@ -75,28 +288,69 @@ async def get_channel_activity_endpoint(
         channel_name: Name of the channel to analyze
         start_date: Start date for activity analysis
         end_date: End date for activity analysis
+        format: "rows" (one object per day) or "columnar" (one array per field)
     """
     try:
-        if not start_date:
-            start_date = datetime.utcnow() - timedelta(days=30)
-        if not end_date:
-            end_date = datetime.utcnow()
+        start_date, end_date = default_range(start_date, end_date)
             
-        result = get_channel_activity(db, channel_name, start_date, end_date)
-        if not result:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Channel {channel_name} not found or no activity in specified period"
-            )
-        return result
+        result = get_channel_activity_payload(
+            db, channel_name, start_date, end_date, columnar=format == "columnar"
+        )
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching channel activity: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Channel {channel_name} not found or no activity in specified period"
+        )
+    # Returning the response directly skips response_model re-validation
+    return FastJSONResponse(result)
+
+@app.get("/api/channels/{channel_name}/activity/series", response_model=ActivitySeriesResponse)
+def get_activity_series_endpoint(
+    channel_name: str,
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    points: int = Query(1000, ge=3, le=10000),
+    db=Depends(get_db_session)
+):
+    """Get a channel's posting activity as a compact, downsampled time series
+    
+    Reads the pre-bucketed hourly/daily rollups (weeks and months are summed
+    from days), so long ranges stay cheap. Series with more buckets than
+    `points` are reduced with LTTB, which keeps peaks and dips.
+    
+    Args:
+        channel_name: Name of the channel to analyze
+        granularity: Bucket size: "hour", "day", "week" (ISO, from Monday) or "month"
+        start_date: Start date (default: 30 days ago)
+        end_date: End date (default: now)
+        points: Maximum number of points returned (3-10000)
+    """
+    try:
+        start_date, end_date = default_range(start_date, end_date)
+
+        result = get_activity_series(db, channel_name, granularity, start_date, end_date, points)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching activity series: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Channel {channel_name} not found or no activity in specified period"
+        )
+    return FastJSONResponse(result)
 
 @app.post("/api/search/messages", response_model=List[MessageSearchResponse])
-async def search_messages_endpoint(
+def search_messages_endpoint(
     request: MessageSearchRequest,
-    db=Depends(get_db)
+    db=Depends(get_db_session)
 ):
     """Search messages containing specific keywords
     
@@ -106,17 +360,120 @@ async def search_messages_endpoint(
         start_date: Optional start date for search
         end_date: Optional end date for search
         limit: Maximum number of results to return
+        collapse_duplicates: Return each near-duplicate cluster once
     """
     try:
-        results = search_messages(
+        results = search_messages_records(
             db,
             query=request.query,
             channel=request.channel,
             start_date=request.start_date,
             end_date=request.end_date,
-            limit=request.limit
+            limit=request.limit,
+            collapse_duplicates=request.collapse_duplicates
         )
-        return results
+        return FastJSONResponse(results)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         logger.error(f"Error searching messages: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/export/messages", response_class=StreamingResponse)
+async def export_messages_endpoint(
+    channel: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    columns: List[str] = Query(list(EXPORT_COLUMNS), alias="column"),
+    format: Literal["arrow", "parquet"] = "arrow",
+    batch_size: int = Query(65536, ge=1024, le=1048576)
+):
+    """Stream mart messages as an Arrow IPC stream or a Parquet file
+    
+    Rows go from the driver into Arrow record batches without per-row Python
+    objects and are sent batch by batch, oldest message first.
+    
+    Args:
+        channel: Optional channel filter
+        start_date: Start date (default: 30 days ago)
+        end_date: End date (default: now)
+        columns: Columns to export, repeated (`?column=message_id&column=content`); all by default
+        format: "arrow" (IPC stream) or "parquet"
+        batch_size: Rows per record batch (and Parquet row group)
+    """
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown columns {unknown}; choose from {list(EXPORT_COLUMNS)}"
+        )
+    columns = list(dict.fromkeys(columns))
+    start_date, end_date = default_range(start_date, end_date)
+    try:
+        # Answer 503 up front; the stream itself is the breaker call (see guarded_stream)
+        breaker.check()
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+
+    def body():
+        # The connection is held for as long as the response streams
+        with get_db() as db:
+            batches = iter_record_batches(db, columns, channel, start_date, end_date, batch_size)
+            yield from guarded_stream(stream_export(batches, export_schema(columns), format))
+
+    filename = f"messages_{channel or 'all'}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/search/similar", response_model=List[SimilarMessageResponse])
+def search_similar_endpoint(
+    channel: Optional[str] = None,
+    message_id: Optional[int] = None,
+    text: Optional[str] = Query(None, max_length=4000),
+    limit: int = Query(10, ge=1, le=50),
+    db=Depends(get_db_session)
+):
+    """Find messages similar to an indexed message or to free text
+    
+    Answered from the local vector index (`SIMILAR_INDEX`); only the matches
+    are read from the database.
+    
+    Args:
+        channel: Channel of `message_id` (message ids are only unique per channel)
+        message_id: Indexed message to find neighbours of
+        text: Free text to match instead of a message
+        limit: Number of messages to return (1-50)
+    """
+    if (message_id is None) == (text is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of message_id or text")
+    if message_id is not None and channel is None:
+        raise HTTPException(status_code=422, detail="message_id needs its channel")
+    try:
+        index = _similar_index()
+    except Exception as e:
+        logger.error(f"Error loading similar-message index: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if index is None:
+        raise HTTPException(status_code=503, detail="Similar-message index not available yet")
+
+    if message_id is not None:
+        hits = index.similar_to(channel, message_id, limit, env.SIMILAR_NPROBE)
+        if hits is None:
+            raise HTTPException(status_code=404, detail=f"Message {message_id} of {channel} is not indexed")
+    else:
+        hits = index.similar_to_text(text, limit, env.SIMILAR_NPROBE)
+
+    try:
+        scores = {(slug, mid): score for slug, mid, score in hits}
+        results = get_messages_by_keys(db, list(scores))
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error(f"Error fetching similar messages: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    for row in results:
+        row["similarity"] = round(scores[(row["channel"], row["message_id"])], 4)
+    return FastJSONResponse(results)
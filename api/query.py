@@ -0,0 +1,395 @@
+"""Query execution for the crud layer: timing, slow-query log, retries, circuit breaker.
+
+Every crud query goes through `execute_query`, which
+
+- times the query (execute + fetch) and keeps per-query counters
+  (`query_stats()`, served at `/api/health/queries`);
+- logs queries slower than `SLOW_QUERY_MS` to the `api.slow_queries` logger
+  (and to `SLOW_QUERY_LOG` as JSON lines when set) with their bind values and
+  execution plan. On Oracle the plan is the one the statement actually ran
+  with (`DBMS_XPLAN.DISPLAY_CURSOR` for the session's previous SQL id); on the
+  SQLite stand-in it is `EXPLAIN QUERY PLAN`. Plans are captured at most once
+  per `SLOW_QUERY_PLAN_INTERVAL` seconds per query;
+- retries only transient failures (lost connections, listener/instance
+  unavailable, deadlocks, lock timeouts) with capped exponential backoff and
+  full jitter. Anything else (bad SQL, missing objects, constraint errors)
+  raises immediately;
+- stops calling a database that keeps failing: after `DB_BREAKER_FAILURES`
+  consecutive transient failures the breaker opens and queries fail fast with
+  `CircuitOpenError` for `DB_BREAKER_RESET_SECONDS`, then one probe query is
+  let through to decide whether to close it again.
+
+Opening a connection (`guarded_connect`, used by `api.database.get_db`) and
+streamed reads (`guarded_stream`) go through the same breaker.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from src.constants import env
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("api.slow_queries")
+
+# Errors worth retrying: the database or the network is briefly unavailable, or
+# the statement lost a race it can win on a second attempt.
+TRANSIENT_ERRORS = frozenset({
+    "ORA-00054",  # resource busy (NOWAIT)
+    "ORA-00060",  # deadlock detected
+    "ORA-01033",  # initialization or shutdown in progress
+    "ORA-01089",  # immediate shutdown in progress
+    "ORA-03113",  # end-of-file on communication channel
+    "ORA-03114",  # not connected to Oracle
+    "ORA-03135",  # connection lost contact
+    "ORA-04021",  # timeout waiting for lock
+    "ORA-12170",  # connect timeout
+    "ORA-12514",  # service not (yet) registered with the listener
+    "ORA-12516",  # no handler available
+    "ORA-12519",
+    "ORA-12520",
+    "ORA-12528",  # listener: instance blocking new connections
+    "ORA-12537",  # TNS connection closed
+    "ORA-12541",  # no listener
+    "ORA-12547",  # TNS lost contact
+    "ORA-25408",  # cannot safely replay call
+    "ORA-30006",  # resource busy; acquire with WAIT timeout expired
+    "DPY-4011",   # database or network closed the connection
+    "DPY-4024",   # call timeout exceeded
+    "DPY-6005",   # cannot connect to database
+})
+
+T = TypeVar("T")
+
+_ERROR_CODE = re.compile(r"\b((?:ORA|DPY)-\d{4,5})\b")
+
+
+def error_code(exc: BaseException) -> Optional[str]:
+    """The ORA-/DPY- code of a database error, if it has one."""
+    err = exc.args[0] if exc.args else None
+    code = getattr(err, "full_code", None)
+    if code:
+        return code
+    m = _ERROR_CODE.search(str(exc))
+    return m.group(1) if m else None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether retrying the same statement can reasonably succeed."""
+    # SQLite stand-in: another writer holds the database lock
+    return error_code(exc) in TRANSIENT_ERRORS or "database is locked" in str(exc)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of querying while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Database unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_seconds`.
+
+    Half-open lets a single probe through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def _refuse(self) -> bool:
+        """Raise if no call may start now; True if the next call is the half-open probe. Hold the lock."""
+        if self._opened_at is None:
+            return False
+        waited = time.monotonic() - self._opened_at
+        if waited < self.reset_seconds:
+            raise CircuitOpenError(self.reset_seconds - waited)
+        if self._probing:
+            raise CircuitOpenError(1)
+        return True
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` unless a query may run now.
+
+        Every call that passes must end in `record_success`, `record_failure`
+        or `release`, or a half-open circuit stays blocked on its probe.
+        """
+        with self._lock:
+            if self._refuse():
+                self._probing = True
+
+    def check(self) -> None:
+        """Raise `CircuitOpenError` if `before_call` would, without taking the probe slot."""
+        with self._lock:
+            self._refuse()
+
+    def release(self) -> None:
+        """End a call that produced no verdict (e.g. abandoned by the client); the next call probes instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Database circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.error(f"Database circuit open for {self.reset_seconds}s after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
+
+
+breaker = CircuitBreaker(env.DB_BREAKER_FAILURES, env.DB_BREAKER_RESET_SECONDS)
+
+
+@dataclass
+class QueryTiming:
+    """Running totals for one named query."""
+
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    slow: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["mean_ms"] = self.total_ms / self.calls if self.calls else 0.0
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in out.items()}
+
+
+_stats: Dict[str, QueryTiming] = {}
+_stats_lock = threading.Lock()
+_plans_captured: Dict[str, float] = {}
+
+
+def query_stats() -> Dict[str, Any]:
+    """Per-query timings of this worker plus the circuit breaker state."""
+    with _stats_lock:
+        queries = {name: timing.as_dict() for name, timing in sorted(_stats.items())}
+    return {"breaker": breaker.snapshot(), "slow_query_ms": env.SLOW_QUERY_MS, "queries": queries}
+
+
+def reset_query_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+        _plans_captured.clear()
+
+
+def _record(name: str, elapsed_ms: Optional[float] = None, error: bool = False, retry: bool = False) -> QueryTiming:
+    with _stats_lock:
+        timing = _stats.setdefault(name, QueryTiming())
+        if retry:
+            timing.retries += 1
+            return timing
+        timing.calls += 1
+        if error:
+            timing.errors += 1
+        if elapsed_ms is not None:
+            timing.total_ms += elapsed_ms
+            timing.max_ms = max(timing.max_ms, elapsed_ms)
+            timing.last_ms = elapsed_ms
+        return timing
+
+
+def _bind_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "..."
+    return value
+
+
+def _explain(db, query: str, params: Optional[dict]) -> List[str]:
+    """Execution plan of the statement just run on `db`."""
+    cur = db.cursor()
+    if env.DB_BACKEND == "local":
+        cur.execute(f"EXPLAIN QUERY PLAN {query}", params or {})
+        return [row[-1] for row in cur.fetchall()]
+    cur.execute("SELECT prev_sql_id, prev_child_number FROM v$session WHERE sid = SYS_CONTEXT('USERENV', 'SID')")
+    sql_id, child = cur.fetchone()
+    cur.execute(
+        "SELECT plan_table_output FROM TABLE(DBMS_XPLAN.DISPLAY_CURSOR(:sql_id, :child, 'TYPICAL +PEEKED_BINDS'))",
+        {"sql_id": sql_id, "child": child}
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _log_slow(db, name: str, query: str, params: Optional[dict], elapsed_ms: float, rows: int) -> None:
+    entry: Dict[str, Any] = {
+        "ts": datetime.utcnow().isoformat(),
+        "query": name,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "rows": rows,
+        "binds": {k: _bind_value(v) for k, v in (params or {}).items()},
+        "sql": " ".join(query.split()),
+    }
+    now = time.monotonic()
+    if now - _plans_captured.get(name, float("-inf")) >= env.SLOW_QUERY_PLAN_INTERVAL:
+        _plans_captured[name] = now
+        try:
+            entry["plan"] = _explain(db, query, params)
+        except Exception as e:
+            entry["plan_error"] = str(e)
+
+    slow_logger.warning(f"Slow query {name}: {elapsed_ms:.0f} ms, {rows} rows, binds={entry['binds']}")
+    if "plan" in entry:
+        slow_logger.warning("\n".join(entry["plan"]))
+    if env.SLOW_QUERY_LOG:
+        try:
+            with open(env.SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write slow-query log {env.SLOW_QUERY_LOG}: {e}")
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff in seconds for retry `attempt` (0-based)."""
+    ceiling = min(env.DB_RETRY_MAX_MS, env.DB_RETRY_BASE_MS * 2 ** attempt)
+    return random.uniform(0, ceiling) / 1000
+
+
+def guarded_connect(connect: Callable[[], T]) -> T:
+    """Open a database connection as one circuit-breaker call.
+
+    A transient failure (listener down, pool wait timeout, ...) counts towards
+    opening the breaker like a failed query; any other error is raised as is.
+    A successful connect records no verdict: the queries run on the connection
+    decide whether a half-open circuit closes.
+
+    Raises:
+        CircuitOpenError: The breaker is open; `connect` was not called
+    """
+    breaker.before_call()
+    try:
+        conn = connect()
+    except Exception as e:
+        if is_transient(e):
+            breaker.record_failure()
+            logger.warning(f"Connecting to the database failed with {error_code(e) or type(e).__name__}")
+        else:
+            # The database answered (bad credentials, unknown service, ...)
+            breaker.record_success()
+        raise
+    breaker.release()
+    return conn
+
+
+def guarded_stream(chunks: Iterable[T]) -> Iterator[T]:
+    """Run a streamed database read as one circuit-breaker call.
+
+    The breaker is consulted when iteration starts, and the outcome is recorded
+    when it ends: success once `chunks` is exhausted, a failure if it raised a
+    transient error. A stream the client abandons midway records nothing.
+
+    Raises:
+        CircuitOpenError: The breaker is open; `chunks` was not started
+    """
+    breaker.before_call()
+    try:
+        yield from chunks
+    except GeneratorExit:
+        breaker.release()
+        raise
+    except Exception as e:
+        if is_transient(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
+
+
+def execute_query(db, name: str, query: str, params: Optional[dict] = None) -> List:
+    """Execute `query` and fetch all rows, with timing, slow-query logging and retries.
+
+    Args:
+        db: Database connection
+        name: Stable label for the query in stats and logs
+        query: SQL statement
+        params: Bind values
+
+    Returns:
+        All result rows
+
+    Raises:
+        CircuitOpenError: The breaker is open; the database was not called
+    """
+    retries = max(env.DB_QUERY_RETRIES, 1)
+    for attempt in range(retries):
+        breaker.before_call()
+        start = time.perf_counter()
+        try:
+            cur = db.cursor()
+            if params:
+                cur.execute(query, params)
+            else:
+                cur.execute(query)
+            rows = cur.fetchall()
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if not is_transient(e):
+                # The database answered; the statement itself is at fault
+                breaker.record_success()
+                _record(name, elapsed_ms, error=True)
+                raise
+            breaker.record_failure()
+            # A dead connection cannot be retried on; the pool discards it on release
+            healthy = getattr(db, "is_healthy", None)
+            if attempt == retries - 1 or (healthy is not None and not healthy()):
+                _record(name, elapsed_ms, error=True)
+                raise
+            _record(name, retry=True)
+            delay = _backoff(attempt)
+            logger.warning(
+                f"Query {name} failed with {error_code(e) or type(e).__name__}, "
+                f"retrying in {delay * 1000:.0f} ms ({attempt + 1}/{retries - 1})"
+            )
+            time.sleep(delay)
+            continue
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        breaker.record_success()
+        timing = _record(name, elapsed_ms)
+        logger.debug(f"Query {name}: {elapsed_ms:.1f} ms, {len(rows)} rows")
+        if elapsed_ms >= env.SLOW_QUERY_MS:
+            with _stats_lock:
+                timing.slow += 1
+            _log_slow(db, name, query, params, elapsed_ms, len(rows))
+        return rows
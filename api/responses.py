@@ -0,0 +1,55 @@
+"""Response classes for large JSON payloads.
+
+`FastJSONResponse` renders with orjson when it is installed (native datetime
+support, several times faster than the stdlib encoder on row-heavy payloads)
+and falls back to `json.dumps` otherwise. `NDJSONResponse` streams one JSON
+document per line with the same encoder.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (stdlib fallback)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Streams `items` as newline-delimited JSON, encoding each one as it is sent."""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, items: Iterable[Any], **kwargs: Any) -> None:
+        super().__init__(self._lines(items), media_type=self.media_type, **kwargs)
+
+    @staticmethod
+    def _lines(items: Iterable[Any]) -> Iterator[bytes]:
+        for item in items:
+            yield dumps(item) + b"\n"
@@ -1,17 +1,108 @@
+"""Launch the API with uvicorn.
+
+Usage:
+    python -m api.run_api                 # dev: single auto-reloading worker
+    python -m api.run_api --mode prod     # prod: tuned multi-worker server
+    API_MODE=prod API_WORKERS=8 python -m api.run_api
+
+All server options come from `src.config.ServerSettings` (`API_*` variables).
+In prod mode the app is imported once in the supervisor before any worker is
+spawned, so import or configuration errors fail fast instead of crash-looping
+workers. Each worker opens and warms its DB pool during lifespan startup, which
+uvicorn completes before it starts accepting connections. On SIGTERM uvicorn
+stops accepting, drains in-flight requests for up to `API_GRACEFUL_TIMEOUT`
+seconds and then runs lifespan shutdown, which closes the pool.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import os
+from pathlib import Path
+from typing import Any
+
 import uvicorn
 from dotenv import load_dotenv
-from pathlib import Path
 
-if __name__ == "__main__":
+APP = "api.main:app"
+
+
+def available_cores() -> int:
+    """CPU cores usable by this process (respects container CPU affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_workers(server) -> int:
+    if server.workers > 0:
+        return server.workers
+    return max(1, min(server.max_workers, available_cores() * server.workers_per_core))
+
+
+def resolve_impl(choice: str, fast: str, fallback: str) -> str:
+    """Pick the fast implementation when installed, failing loudly if it was requested explicitly."""
+    installed = importlib.util.find_spec(fast) is not None
+    if choice == fast and not installed:
+        raise RuntimeError(f"{fast} was requested but is not installed (pip install {fast})")
+    if choice == "auto":
+        return fast if installed else fallback
+    return choice
+
+
+def server_options(server) -> dict[str, Any]:
+    """uvicorn keyword arguments for the configured mode."""
+    options: dict[str, Any] = {
+        "host": server.host,
+        "port": server.port,
+        "log_level": server.log_level,
+    }
+    if server.mode == "dev":
+        return {**options, "reload": True}
+
+    return {
+        **options,
+        "workers": resolve_workers(server),
+        "loop": resolve_impl(server.loop, "uvloop", "asyncio"),
+        "http": resolve_impl(server.http, "httptools", "h11"),
+        "backlog": server.backlog,
+        "timeout_keep_alive": server.keepalive_timeout,
+        "timeout_graceful_shutdown": server.graceful_timeout,
+        "limit_concurrency": server.limit_concurrency,
+        "limit_max_requests": server.limit_max_requests,
+        "access_log": server.access_log,
+        "proxy_headers": True,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the analytics API")
+    parser.add_argument("--mode", choices=["dev", "prod"], help="Override API_MODE")
+    parser.add_argument("--workers", type=int, help="Override API_WORKERS (prod only)")
+    args = parser.parse_args()
+
     # Load environment variables
     root_dir = Path(__file__).parent.parent
     load_dotenv(root_dir / ".env")
-    
-    # Run the FastAPI application
-    uvicorn.run(
-        "api.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+
+    from src.config import ServerSettings
+
+    overrides = {k: v for k, v in {"mode": args.mode, "workers": args.workers}.items() if v is not None}
+    server = ServerSettings(**overrides)
+    options = server_options(server)
+
+    if server.mode == "prod":
+        # Preload: surface import/config errors in the supervisor
+        module, attr = APP.split(":")
+        getattr(importlib.import_module(module), attr)
+        print(
+            f"Starting {options['workers']} worker(s) on {server.host}:{server.port} "
+            f"(loop={options['loop']}, http={options['http']})"
+        )
+
+    uvicorn.run(APP, **options)
+
+
+if __name__ == "__main__":
+    main()
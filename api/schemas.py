@@ -27,12 +27,43 @@ class ChannelActivityResponse(BaseModel):
     total_media: int
     avg_daily_messages: float
 
+class ChannelActivityColumns(BaseModel):
+    date: List[datetime]
+    message_count: List[int]
+    avg_message_length: List[float]
+    image_count: List[int]
+    video_count: List[int]
+
+class ChannelActivityColumnarResponse(BaseModel):
+    channel_name: str
+    activity_columns: ChannelActivityColumns
+    total_messages: int
+    total_media: int
+    avg_daily_messages: float
+
+class ActivitySeries(BaseModel):
+    t: List[int]
+    message_count: List[int]
+    avg_message_length: List[Optional[float]]
+    image_count: List[int]
+    video_count: List[int]
+
+class ActivitySeriesResponse(BaseModel):
+    channel_name: str
+    granularity: str
+    buckets: int
+    points: int
+    total_messages: int
+    total_media: int
+    series: ActivitySeries
+
 class MessageSearchRequest(BaseModel):
     query: str
     channel: Optional[str] = None
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     limit: int = 10
+    collapse_duplicates: bool = False
 
 class MessageSearchResponse(BaseModel):
     message_id: int
@@ -42,3 +73,52 @@ class MessageSearchResponse(BaseModel):
     media_type: Optional[str] = None
     sentiment_score: Optional[float] = None
     confidence_score: Optional[float] = None
+    cluster_channel: Optional[str] = None
+    cluster_id: Optional[int] = None
+    cluster_size: Optional[int] = None
+
+class SimilarMessageResponse(MessageSearchResponse):
+    similarity: float
+
+class TrendingProduct(BaseModel):
+    product_name: str
+    mention_count: int
+    baseline_count: int
+    expected_count: float
+    growth: float
+
+class TrendingResponse(BaseModel):
+    channel: Optional[str] = None
+    window_start: datetime
+    window_end: datetime
+    baseline_start: datetime
+    window_mentions: int
+    error_bound: int
+    confidence: float
+    products: List[TrendingProduct]
+
+class DetectedClass(BaseModel):
+    class_id: int
+    class_name: str
+    detection_count: int
+    mean_confidence: float
+    image_count: int
+
+class TopDetectedClassesResponse(BaseModel):
+    channel: Optional[str] = None
+    start_date: datetime
+    end_date: datetime
+    classes: List[DetectedClass]
+
+class DetectionDay(BaseModel):
+    date: datetime
+    images_processed: int
+    images_with_detections: int
+    detection_count: int
+
+class ChannelDetectionsResponse(BaseModel):
+    channel_name: str
+    detection_history: List[DetectionDay]
+    total_images: int
+    total_images_with_detections: int
+    total_detections: int
@@ -0,0 +1,96 @@
+"""Benchmarks for the API query layer (`api.crud`) against the stand-in mart."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+import numpy as np
+
+from api import crud
+from benchmarks.harness import BenchContext, benchmark
+from src.activity import lttb, refresh_buckets
+
+
+@benchmark("crud.search_messages")
+def search_messages(ctx: BenchContext):
+    return lambda: crud.search_messages(ctx.conn, query="paracetamol", limit=50)
+
+
+@benchmark("crud.search_messages.filtered")
+def search_messages_filtered(ctx: BenchContext):
+    end = ctx.extra["end"]
+    return lambda: crud.search_messages(
+        ctx.conn,
+        query="vitamin",
+        channel=ctx.channels[0],
+        start_date=end - timedelta(days=30),
+        end_date=end,
+        limit=50,
+    )
+
+
+@benchmark("crud.get_top_products")
+def get_top_products(ctx: BenchContext):
+    # Bypass the query cache so every round actually runs the aggregation
+    return lambda: crud.get_top_products.__wrapped__(ctx.conn, 10)
+
+
+@benchmark("crud.get_channel_activity")
+def get_channel_activity(ctx: BenchContext):
+    end = ctx.extra["end"]
+    return lambda: crud.get_channel_activity.__wrapped__(
+        ctx.conn, ctx.channels[0], end - timedelta(days=90), end
+    )
+
+
+@benchmark("crud.get_channels_activity.batch")
+def get_channels_activity_batch(ctx: BenchContext):
+    """Every channel's activity from one grouped query."""
+    end = ctx.extra["end"]
+    channels = tuple(ctx.channels)
+    return lambda: crud.get_channels_activity_payloads.__wrapped__(
+        ctx.conn, channels, end - timedelta(days=90), end
+    )
+
+
+@benchmark("crud.get_channels_activity.per_channel")
+def get_channels_activity_per_channel(ctx: BenchContext):
+    """Every channel's activity with one query each, as dashboards did before the batch endpoint."""
+    end = ctx.extra["end"]
+    return lambda: [
+        crud.get_channel_activity_payload.__wrapped__(ctx.conn, channel, end - timedelta(days=90), end)
+        for channel in ctx.channels
+    ]
+
+
+def _activity_buckets(ctx: BenchContext) -> None:
+    if not ctx.extra.get("activity_buckets"):
+        refresh_buckets(ctx.conn.cursor())
+        ctx.conn.commit()
+        ctx.extra["activity_buckets"] = True
+
+
+@benchmark("crud.get_activity_series.day")
+def get_activity_series_day(ctx: BenchContext):
+    """Same channel and range as crud.get_channel_activity, from the daily rollup."""
+    _activity_buckets(ctx)
+    end = ctx.extra["end"]
+    return lambda: crud.get_activity_series.__wrapped__(
+        ctx.conn, ctx.channels[0], "day", end - timedelta(days=90), end
+    )
+
+
+@benchmark("crud.get_activity_series.hour")
+def get_activity_series_hour(ctx: BenchContext):
+    """Every hour of the dataset, zero-filled and reduced to 1000 points with LTTB."""
+    _activity_buckets(ctx)
+    end = ctx.extra["end"]
+    return lambda: crud.get_activity_series.__wrapped__(
+        ctx.conn, ctx.channels[0], "hour", end - timedelta(days=365), end, 1000
+    )
+
+
+@benchmark("activity.lttb")
+def activity_lttb(ctx: BenchContext):
+    """Three years of hourly buckets down to 1000 points (points/second)."""
+    y = np.random.default_rng(0).poisson(5, 3 * 8760).astype(np.float64)
+    return (lambda: lttb(y, 1000)), None, len(y)
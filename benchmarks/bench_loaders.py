@@ -0,0 +1,127 @@
+"""Benchmarks for the raw loader, near-duplicate clustering, the photo downloader and the detection writer."""
+from __future__ import annotations
+
+import asyncio
+import random
+import shutil
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, SkipBenchmark, benchmark
+from src.loaders import load_raw_to_oracle as loader
+
+
+@benchmark("loader.load_file")
+def load_file(ctx: BenchContext):
+    """Parse one channel JSON file and MERGE it into an empty raw table."""
+    path = synthetic.write_raw_partition(
+        ctx.root / "lake", ctx.channels[:1], ctx.scale["messages"]
+    )[0]
+    cur = ctx.conn.cursor()
+    loader.ensure_table(cur)
+
+    def reset():
+        cur.execute("DELETE FROM telegram_raw.messages")
+        ctx.conn.commit()
+
+    def run():
+        loader.load_file(cur, path)
+        ctx.conn.commit()
+
+    return run, reset
+
+
+@benchmark("loader.load_file.compact")
+def load_file_compact(ctx: BenchContext):
+    """Same as `loader.load_file` for a file written by the projecting scraper."""
+    path = synthetic.write_raw_partition(
+        ctx.root / "lake-compact", ctx.channels[:1], ctx.scale["messages"], compact=True
+    )[0]
+    cur = ctx.conn.cursor()
+    loader.ensure_table(cur)
+
+    def reset():
+        cur.execute("DELETE FROM telegram_raw.messages")
+        ctx.conn.commit()
+
+    def run():
+        loader.load_file(cur, path)
+        ctx.conn.commit()
+
+    return run, reset
+
+
+
+@benchmark("loader.dedup.assign")
+def dedup_assign(ctx: BenchContext):
+    """MinHash + LSH clustering of one channel's messages into a fresh index (messages/second)."""
+    from src.dedup import NearDuplicateIndex
+
+    messages = [
+        ((rec["channel"], rec["message_id"]), rec["text"])
+        for rec in synthetic.iter_messages(ctx.channels[:1], ctx.scale["messages"])
+    ]
+    return (lambda: NearDuplicateIndex().assign(messages)), None, len(messages)
+
+class _FakeMediaClient:
+    """Serves photo bytes after a fixed delay, like a Telegram DC round trip."""
+
+    latency = 0.02
+
+    async def download_photo(self, ref, size_type: str) -> bytes:
+        await asyncio.sleep(self.latency)
+        return b"\xff\xd8" + bytes(30_000)
+
+
+@benchmark("image.download_many")
+def download_many(ctx: BenchContext):
+    """Fetch the photos of 200 messages (10% reposts) into an empty cache, 8 at a time."""
+    from src.image.downloader import MediaCache, MediaDownloader
+    from src.scraper.records import MessageRecord
+
+    messages = []
+    for rec in synthetic.iter_messages(ctx.channels[:1], ctx.scale["messages"]):
+        if rec["media_type"] == "image":
+            messages.append(MessageRecord.from_message(synthetic.telethon_dict(rec)).to_dict())
+        if len(messages) == 180:
+            break
+    messages += messages[:20]
+    root = ctx.root / "media"
+
+    def reset():
+        shutil.rmtree(root, ignore_errors=True)
+
+    def run():
+        downloader = MediaDownloader(_FakeMediaClient(), MediaCache(root, 1 << 30, 86400), concurrency=8, rate=0)
+        asyncio.run(downloader.fetch_many(messages))
+
+    return run, reset, len(messages)
+
+
+@benchmark("image.store_detections")
+def store_detections(ctx: BenchContext):
+    """Write a typical batch of YOLO detections for one message."""
+    try:
+        from src.image import ImageProcessor
+    except ImportError as e:
+        raise SkipBenchmark(f"src.image unavailable: {e}")
+
+    rng = random.Random(7)
+    detections = [
+        {
+            "class": rng.randrange(80),
+            "confidence": round(rng.uniform(0.3, 0.99), 4),
+            "bbox": [rng.uniform(0, 640) for _ in range(4)],
+        }
+        for _ in range(12)
+    ]
+    cur = ctx.conn.cursor()
+    loader.ensure_table(cur)
+    cur.execute(
+        "INSERT OR IGNORE INTO telegram_raw.messages (message_id, channel_slug, message_ts, payload) "
+        "VALUES (1, :slug, :ts, '{}')",
+        {"slug": ctx.channels[0], "ts": ctx.extra["end"]},
+    )
+    ctx.conn.commit()
+    # Skip __init__: the writer does not need the YOLO weights
+    processor = ImageProcessor.__new__(ImageProcessor)
+    return lambda: processor.store_detections(1, detections)
@@ -0,0 +1,43 @@
+"""Throughput benchmarks for the product mention extractor (messages/second)."""
+from __future__ import annotations
+
+import random
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, benchmark
+from src.mentions import MentionExtractor
+
+BATCH = 10_000
+
+
+def _typo(rng: random.Random, word: str) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i] + word[i:]
+
+
+def _messages(ctx: BenchContext, typo_rate: float) -> list[tuple]:
+    rng = random.Random(3)
+    batch = []
+    for rec in synthetic.iter_messages(ctx.channels, BATCH // len(ctx.channels) + 1):
+        text = rec["text"]
+        for product, _ in rec["products"]:
+            if rng.random() < typo_rate and len(product) > 5:
+                text = text.replace(product, _typo(rng, product), 1)
+        batch.append((rec["message_id"], rec["channel"], text))
+        if len(batch) == BATCH:
+            break
+    return batch
+
+
+@benchmark("mentions.extract_batch.exact")
+def extract_exact(ctx: BenchContext):
+    extractor = MentionExtractor.from_csv(fuzzy=False)
+    batch = _messages(ctx, typo_rate=0.0)
+    return (lambda: extractor.extract_batch(batch)), None, len(batch)
+
+
+@benchmark("mentions.extract_batch.fuzzy")
+def extract_fuzzy(ctx: BenchContext):
+    extractor = MentionExtractor.from_csv()
+    batch = _messages(ctx, typo_rate=0.1)
+    return (lambda: extractor.extract_batch(batch)), None, len(batch)
@@ -0,0 +1,77 @@
+"""Benchmarks for the scraper's message projection and lake serialisation.
+
+`*.full` is the previous path: `Message.to_dict()` for every message, dumped
+with `indent=2`. `*.compact` is the current one: `MessageRecord` projection,
+dumped without whitespace. Run the module directly for the bytes-per-message
+comparison of lake files and raw payloads:
+
+    python -m benchmarks.bench_scraper --messages 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, SkipBenchmark, benchmark
+from src.scraper.records import MessageRecord
+
+
+def _telethon_messages(ctx: BenchContext) -> list:
+    try:
+        return [synthetic.telethon_message(rec) for rec in synthetic.iter_messages(ctx.channels[:1], ctx.scale["messages"])]
+    except ImportError as e:
+        raise SkipBenchmark(f"telethon unavailable: {e}")
+
+
+@benchmark("scraper.project.full")
+def project_full(ctx: BenchContext):
+    """`Message.to_dict()` for one channel's history."""
+    messages = _telethon_messages(ctx)
+    return (lambda: [m.to_dict() for m in messages]), None, len(messages)
+
+
+@benchmark("scraper.project.compact")
+def project_compact(ctx: BenchContext):
+    """`MessageRecord` projection for one channel's history."""
+    messages = _telethon_messages(ctx)
+    return (lambda: [MessageRecord.from_message(m).to_dict() for m in messages]), None, len(messages)
+
+
+@benchmark("scraper.serialise.full")
+def serialise_full(ctx: BenchContext):
+    """Dump one channel file of `to_dict()` trees as the scraper used to."""
+    messages = [synthetic.telethon_dict(rec) for rec in synthetic.iter_messages(ctx.channels[:1], ctx.scale["messages"])]
+    return (lambda: json.dumps(messages, ensure_ascii=False, indent=2, default=str)), None, len(messages)
+
+
+@benchmark("scraper.serialise.compact")
+def serialise_compact(ctx: BenchContext):
+    """Dump one channel file of compact records."""
+    messages = [
+        MessageRecord.from_message(synthetic.telethon_dict(rec)).to_dict()
+        for rec in synthetic.iter_messages(ctx.channels[:1], ctx.scale["messages"])
+    ]
+    return (lambda: json.dumps(messages, ensure_ascii=False, default=str)), None, len(messages)
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Bytes per message, full vs compact")
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    full = [synthetic.telethon_dict(rec) for rec in synthetic.iter_messages(synthetic.CHANNELS[:1], args.messages)]
+    compact = [MessageRecord.from_message(m).to_dict() for m in full]
+    with_raw = [MessageRecord.from_message(m, keep_raw=True).to_dict() for m in full]
+
+    def per_message(data: list, **kwargs) -> float:
+        return len(json.dumps(data, ensure_ascii=False, default=str, **kwargs).encode("utf-8")) / len(data)
+
+    print(f"{'':<24} {'lake file':>12} {'raw payload':>12}  (bytes/message)")
+    print(f"{'full to_dict()':<24} {per_message(full, indent=2):>12,.0f} {per_message(full):>12,.0f}")
+    print(f"{'compact':<24} {per_message(compact):>12,.0f} {per_message(compact):>12,.0f}")
+    print(f"{'compact + raw':<24} {per_message(with_raw):>12,.0f} {per_message(with_raw):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput benchmarks for sentiment scoring (messages/second).
+
+`sentiment.score` is the vectorised lexicon scorer alone.
+`sentiment.stage.cold` scores a batch through `SentimentStage` into empty
+tables, including the cache lookups and bulk writes. `sentiment.stage.reload`
+runs the same batch again, so every text is served from the cache.
+"""
+from __future__ import annotations
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, benchmark
+from src.sentiment import LexiconScorer, SentimentStage
+
+BATCH = 5_000
+
+
+def _messages(ctx: BenchContext) -> list[tuple]:
+    records = synthetic.iter_messages(ctx.channels, BATCH // len(ctx.channels) + 1)
+    return [(rec["channel"], rec["message_id"], rec["text"]) for rec, _ in zip(records, range(BATCH))]
+
+
+@benchmark("sentiment.score")
+def score(ctx: BenchContext):
+    scorer = LexiconScorer.from_csv()
+    texts = [text for *_, text in _messages(ctx)]
+    return (lambda: scorer.score(texts)), None, len(texts)
+
+
+def _clear(ctx: BenchContext) -> None:
+    cur = ctx.conn.cursor()
+    cur.execute("DELETE FROM telegram_raw.sentiment_cache")
+    cur.execute("DELETE FROM telegram_raw.message_sentiment")
+    ctx.conn.commit()
+
+
+@benchmark("sentiment.stage.cold")
+def stage_cold(ctx: BenchContext):
+    stage = SentimentStage(ctx.conn.cursor())
+    batch = _messages(ctx)
+
+    def run():
+        stage.process(batch)
+        ctx.conn.commit()
+
+    return run, lambda: _clear(ctx), len(batch)
+
+
+@benchmark("sentiment.stage.reload")
+def stage_reload(ctx: BenchContext):
+    stage = SentimentStage(ctx.conn.cursor())
+    batch = _messages(ctx)
+    _clear(ctx)
+    stage.process(batch)
+    ctx.conn.commit()
+
+    def run():
+        stage.process(batch)
+        ctx.conn.commit()
+
+    return run, None, len(batch)
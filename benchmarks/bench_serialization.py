@@ -0,0 +1,146 @@
+"""Micro-benchmarks for response serialisation of large result sets.
+
+`*.pydantic` reproduces the default FastAPI path: one model per row, re-validation
+against `response_model`, then the stdlib JSON encoder. `*.fast` is the path the
+search and activity endpoints use: plain dicts from trusted DB rows rendered by
+`FastJSONResponse`.
+
+`export.messages.*` streams every mart message through `/api/export/messages`
+encoders (rows/second): Arrow IPC, Parquet, and for comparison the same rows
+as dicts rendered to JSON.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from api import crud
+from api.export import EXPORT_COLUMNS, export_query, export_schema, iter_record_batches, stream_export
+from api.responses import FastJSONResponse
+from api.schemas import ChannelActivity, ChannelActivityResponse, MessageSearchResponse
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, benchmark
+
+SEARCH_ROWS = 5000
+ACTIVITY_DAYS = 3 * 365
+
+
+def _search_rows(ctx: BenchContext) -> list[tuple]:
+    rows = []
+    for rec in synthetic.iter_messages(ctx.channels, SEARCH_ROWS // len(ctx.channels) + 1):
+        rows.append((rec["message_id"], rec["channel"], rec["text"], rec["ts"], rec["media_type"], 0.12, 0.87))
+        if len(rows) == SEARCH_ROWS:
+            break
+    return rows
+
+
+def _activity_rows() -> list[tuple]:
+    start = datetime(2022, 7, 13)
+    return [
+        (start + timedelta(days=i), 40 + i % 17, 180.5 + i % 9, 12 + i % 5, i % 3)
+        for i in range(ACTIVITY_DAYS)
+    ]
+
+
+@benchmark("serialize.search.pydantic")
+def search_pydantic(ctx: BenchContext):
+    rows = _search_rows(ctx)
+    adapter = TypeAdapter(List[MessageSearchResponse])
+
+    def run():
+        models = [MessageSearchResponse(**dict(zip(crud.SEARCH_FIELDS, row))) for row in rows]
+        content = adapter.dump_python(adapter.validate_python(models), mode="json")
+        return JSONResponse(content).body
+
+    return run
+
+
+@benchmark("serialize.search.fast")
+def search_fast(ctx: BenchContext):
+    rows = _search_rows(ctx)
+    return lambda: FastJSONResponse([dict(zip(crud.SEARCH_FIELDS, row)) for row in rows]).body
+
+
+@benchmark("serialize.activity.pydantic")
+def activity_pydantic(ctx: BenchContext):
+    rows = _activity_rows()
+    adapter = TypeAdapter(ChannelActivityResponse)
+
+    def run():
+        model = ChannelActivityResponse(
+            channel_name="lobelia4cosmetics",
+            activity_history=[ChannelActivity(**dict(zip(crud.ACTIVITY_FIELDS, row))) for row in rows],
+            total_messages=0,
+            total_media=0,
+            avg_daily_messages=0.0,
+        )
+        content = adapter.dump_python(adapter.validate_python(model), mode="json")
+        return JSONResponse(content).body
+
+    return run
+
+
+@benchmark("serialize.activity.fast")
+def activity_fast(ctx: BenchContext):
+    rows = _activity_rows()
+    return lambda: FastJSONResponse(
+        {
+            "channel_name": "lobelia4cosmetics",
+            "activity_history": [dict(zip(crud.ACTIVITY_FIELDS, row)) for row in rows],
+        }
+    ).body
+
+
+@benchmark("serialize.activity.columnar")
+def activity_columnar(ctx: BenchContext):
+    rows = _activity_rows()
+    return lambda: FastJSONResponse(
+        {
+            "channel_name": "lobelia4cosmetics",
+            "activity_columns": dict(zip(crud.ACTIVITY_FIELDS, map(list, zip(*rows)))),
+        }
+    ).body
+
+
+def _export_range(ctx: BenchContext) -> tuple[datetime, datetime]:
+    return ctx.extra["end"] - timedelta(days=365), ctx.extra["end"]
+
+
+def _export(ctx: BenchContext, fmt: str):
+    columns = list(EXPORT_COLUMNS)
+    start, end = _export_range(ctx)
+    rows = sum(b.num_rows for b in iter_record_batches(ctx.conn, columns, None, start, end))
+
+    def run():
+        batches = iter_record_batches(ctx.conn, columns, None, start, end)
+        return sum(len(chunk) for chunk in stream_export(batches, export_schema(columns), fmt))
+
+    return run, None, rows
+
+
+@benchmark("export.messages.arrow")
+def export_arrow(ctx: BenchContext):
+    return _export(ctx, "arrow")
+
+
+@benchmark("export.messages.parquet")
+def export_parquet(ctx: BenchContext):
+    return _export(ctx, "parquet")
+
+
+@benchmark("export.messages.json")
+def export_json(ctx: BenchContext):
+    columns = list(EXPORT_COLUMNS)
+    start, end = _export_range(ctx)
+    query, params = export_query(columns, None, start, end)
+
+    def fetch():
+        cur = ctx.conn.cursor()
+        cur.execute(query, params)
+        return cur.fetchall()
+
+    rows = len(fetch())
+    return (lambda: len(FastJSONResponse([dict(zip(columns, row)) for row in fetch()]).body)), None, rows
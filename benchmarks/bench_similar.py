@@ -0,0 +1,135 @@
+"""Benchmarks for the similar-message index.
+
+`similar.add` is indexing throughput (messages/second) into a fresh index,
+including the k-means training and list layout of `compact`; `similar.query`
+is one `/api/search/similar` lookup with the default `nprobe`, and
+`similar.query.exact` the same lookup scanning every list.
+
+The corpus mimics the channels: adverts reposted with a few words changed
+(a new price, another product). Recall is reported by the standalone mode,
+against exact search over the same vectors:
+
+    python -m benchmarks.bench_similar --messages 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, benchmark
+from src.similar import DEFAULT_NPROBE, SimilarIndex
+
+VARIANTS_PER_ADVERT = 20
+
+
+def repost_corpus(n: int, seed: int = 3) -> list[tuple[str, int, str]]:
+    """`n` (channel, message_id, text) rows: ~20 variants of each synthetic advert with 0-3 words replaced.
+
+    Message ids restart in every channel, as they do on Telegram.
+    """
+    rng = random.Random(seed)
+    channels = synthetic.channel_names(20)
+    per_channel = max(1, n // VARIANTS_PER_ADVERT // len(channels))
+    adverts = [rec["text"].split() for rec in synthetic.iter_messages(channels, per_channel, seed=seed)]
+    vocab = sorted({word for words in adverts for word in words})
+    corpus = []
+    for i in range(n):
+        words = list(rng.choice(adverts))
+        for _ in range(rng.randint(0, 3)):
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+        corpus.append((channels[i % len(channels)], i // len(channels) + 1, " ".join(words)))
+    return corpus
+
+
+def _corpus_size(ctx: BenchContext) -> int:
+    return len(ctx.channels) * ctx.scale["messages"]
+
+
+def _built(ctx: BenchContext) -> tuple[SimilarIndex, list[tuple[str, int]]]:
+    corpus = repost_corpus(_corpus_size(ctx))
+    index = SimilarIndex()
+    index.add(corpus)
+    index.compact()
+    queries = random.Random(0).sample([(slug, mid) for slug, mid, _ in corpus], 256)
+    return index, queries
+
+
+@benchmark("similar.add")
+def add(ctx: BenchContext):
+    corpus = repost_corpus(_corpus_size(ctx))
+
+    def run():
+        index = SimilarIndex()
+        index.add(corpus)
+        index.compact()
+
+    return run, None, len(corpus)
+
+
+def _lookup(index: SimilarIndex, queries: list[tuple[str, int]], nprobe: int):
+    state = {"i": 0}
+
+    def run():
+        state["i"] = (state["i"] + 1) % len(queries)
+        return index.similar_to(*queries[state["i"]], 10, nprobe)
+
+    return run
+
+
+@benchmark("similar.query")
+def query(ctx: BenchContext):
+    index, queries = _built(ctx)
+    return _lookup(index, queries, DEFAULT_NPROBE)
+
+
+@benchmark("similar.query.exact")
+def query_exact(ctx: BenchContext):
+    index, queries = _built(ctx)
+    return _lookup(index, queries, index.nlist)
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Recall and latency of the similar-message index")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    corpus = repost_corpus(args.messages)
+    started = time.perf_counter()
+    index = SimilarIndex()
+    for i in range(0, len(corpus), 20_000):
+        index.add(corpus[i:i + 20_000])
+    index.compact()
+    print(f"Indexed {len(index)} messages in {index.nlist} lists ({time.perf_counter() - started:.1f}s)")
+
+    queries = random.Random(0).sample([(slug, mid) for slug, mid, _ in corpus], args.queries)
+    exact_ms = []
+    kth = []
+    for key in queries:
+        t = time.perf_counter()
+        hits = index.similar_to(*key, 10, index.nlist)
+        exact_ms.append((time.perf_counter() - t) * 1000)
+        kth.append(hits[-1][2])
+    print(f"{'exact':>8}  recall@10 1.000  p50 {np.median(exact_ms):6.2f} ms  p99 {np.percentile(exact_ms, 99):6.2f} ms")
+
+    for nprobe in args.nprobe:
+        found, latency = [], []
+        for key, threshold in zip(queries, kth):
+            t = time.perf_counter()
+            hits = index.similar_to(*key, 10, nprobe)
+            latency.append((time.perf_counter() - t) * 1000)
+            # Ties at the 10th score count as hits: any of them is an exact answer
+            found.append(sum(score >= threshold - 1e-6 for *_, score in hits) / 10)
+        print(
+            f"{'nprobe ' + str(nprobe):>8}  recall@10 {np.mean(found):.3f}  "
+            f"p50 {np.median(latency):6.2f} ms  p99 {np.percentile(latency, 99):6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
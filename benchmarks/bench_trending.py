@@ -0,0 +1,44 @@
+"""Benchmarks for the streaming trending-products store.
+
+`trending.add_mentions` is ingest throughput (mentions/second) into a fresh
+store; `trending.query` answers the `/api/reports/trending` question from a
+week of sketches, for comparison with `crud.get_top_products` scanning the mart.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from benchmarks import synthetic
+from benchmarks.harness import BenchContext, benchmark
+from src.trending import TrendingStore
+
+
+def _events(ctx: BenchContext) -> list[tuple]:
+    end = ctx.extra["end"]
+    return [
+        (rec["ts"], rec["channel"], rec["message_id"], product)
+        for rec in synthetic.iter_messages(ctx.channels, ctx.scale["messages"], days=7, end=end)
+        for product, _ in rec["products"]
+    ]
+
+
+@benchmark("trending.add_mentions")
+def add_mentions(ctx: BenchContext):
+    events = _events(ctx)
+    return (lambda: TrendingStore().add_mentions(events)), None, len(events)
+
+
+@benchmark("trending.query")
+def query(ctx: BenchContext):
+    store = TrendingStore()
+    store.add_mentions(_events(ctx))
+    now = ctx.extra["end"] - timedelta(hours=1)
+    return lambda: store.trending(hours=3, baseline_hours=24, limit=10, now=now)
+
+
+@benchmark("trending.query.channel")
+def query_channel(ctx: BenchContext):
+    store = TrendingStore()
+    store.add_mentions(_events(ctx))
+    now = ctx.extra["end"] - timedelta(hours=1)
+    return lambda: store.trending(hours=3, baseline_hours=24, channel=ctx.channels[0], limit=10, now=now)
@@ -0,0 +1,88 @@
+"""Minimal benchmark registry and timer.
+
+A benchmark is a function decorated with `@benchmark(name)` that receives the
+shared `BenchContext` and returns the callable to time, or a tuple of
+(callable, reset, items): `reset` runs untimed before every call and `items`
+is the number of records one call processes, reported as a throughput.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+REGISTRY: dict[str, Callable[["BenchContext"], Any]] = {}
+
+
+class SkipBenchmark(Exception):
+    """Raised from a benchmark setup when its dependencies are unavailable."""
+
+
+@dataclass
+class BenchContext:
+    """Shared state handed to every benchmark setup."""
+
+    root: Path
+    conn: Any
+    channels: list[str]
+    scale: dict[str, int]
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Result:
+    name: str
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+    def as_dict(self) -> dict[str, float]:
+        return {"rounds": self.rounds, "min": self.min, "median": self.median, "mean": self.mean, "stdev": self.stdev}
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function under `name`."""
+
+    def decorator(fn):
+        REGISTRY[name] = fn
+        return fn
+
+    return decorator
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    reset: Optional[Callable[[], Any]] = None,
+    min_time: float = 1.0,
+    min_rounds: int = 5,
+    max_rounds: int = 500,
+) -> Result:
+    """Time `fn` until `min_time` seconds or `max_rounds` calls have elapsed."""
+    if reset:
+        reset()
+    fn()  # warm-up: statement caches, page cache, lazy imports
+
+    samples: list[float] = []
+    spent = 0.0
+    while len(samples) < max_rounds and (len(samples) < min_rounds or spent < min_time):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+
+    return Result(
+        name=name,
+        rounds=len(samples),
+        min=min(samples),
+        median=statistics.median(samples),
+        mean=statistics.fmean(samples),
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    )
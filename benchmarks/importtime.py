@@ -0,0 +1,131 @@
+"""Import-time budgets for the project's entry points.
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`
+and its cumulative import time (best of `--repeat` runs) is compared with a
+budget. The check also fails when an entry point pulls in a heavy dependency it
+should only load on first use (torch/ultralytics for detection, oracledb before
+the first connection, telethon outside the scraper).
+
+Usage:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --repeat 10 --slack 1.5 --json importtime.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_HEAVY = ("torch", "ultralytics", "PIL", "cv2", "oracledb", "telethon")
+
+
+@dataclass
+class EntryPoint:
+    """A module whose import cost is budgeted."""
+
+    module: str
+    budget_ms: float
+    forbidden: tuple[str, ...] = field(default=_HEAVY)
+
+
+# Budgets leave ~1.5x headroom over the best-of-5 import with warm bytecode caches
+ENTRY_POINTS = [
+    EntryPoint("api.main", 400),
+    EntryPoint("api.run_api", 120),
+    EntryPoint("src.loaders.load_raw_to_oracle", 60),
+    EntryPoint("src.mentions.extract_mentions", 60),
+    EntryPoint("src.image.process_images", 60),  # asyncio for the concurrent downloader
+    EntryPoint("src.db.setup", 10),
+    EntryPoint("src.config", 200),
+    # The scraper needs telethon (and PIL through it) by definition
+    EntryPoint("src.scraper.collector", 450, forbidden=("torch", "ultralytics", "cv2", "oracledb")),
+]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    """Import `module` in a fresh interpreter.
+
+    Returns:
+        Cumulative import time of `module` in milliseconds and the set of
+        top-level packages imported along the way
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+        raise RuntimeError(f"import {module} failed: {last}")
+
+    cumulative = None
+    packages: set[str] = set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        packages.add(name.split(".")[0])
+        if name == module and not m.group(3):
+            cumulative = int(m.group(2)) / 1000
+    if cumulative is None:
+        raise RuntimeError(f"{module} did not appear in the -X importtime output")
+    return cumulative, packages
+
+
+def check(entry: EntryPoint, repeat: int, slack: float) -> dict:
+    """Measure one entry point against its budget."""
+    try:
+        runs = [import_profile(entry.module) for _ in range(repeat)]
+    except RuntimeError as e:
+        return {"module": entry.module, "status": "error", "error": str(e)}
+    best = min(ms for ms, _ in runs)
+    heavy = sorted(set(entry.forbidden) & set().union(*(pkgs for _, pkgs in runs)))
+    budget = entry.budget_ms * slack
+    return {
+        "module": entry.module,
+        "best_ms": round(best, 1),
+        "budget_ms": round(budget, 1),
+        "heavy": heavy,
+        "status": "ok" if best <= budget and not heavy else "over",
+    }
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Check entry-point import times against budgets")
+    parser.add_argument("--filter", default="", help="Only entry points containing this substring")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point (best is kept)")
+    parser.add_argument("--slack", type=float, default=1.0, help="Multiply every budget (slow machines)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'entry point':<34} {'best ms':>9} {'budget':>8}  status")
+    for entry in ENTRY_POINTS:
+        if args.filter not in entry.module:
+            continue
+        r = check(entry, args.repeat, args.slack)
+        results.append(r)
+        if r["status"] == "error":
+            print(f"{entry.module:<34} {'-':>9} {'-':>8}  error: {r['error']}")
+            continue
+        note = f" (imports {', '.join(r['heavy'])})" if r["heavy"] else ""
+        print(f"{entry.module:<34} {r['best_ms']:>9.1f} {r['budget_ms']:>8.0f}  {r['status']}{note}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if any(r["status"] == "over" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
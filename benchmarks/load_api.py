@@ -0,0 +1,290 @@
+"""Load generator for the FastAPI endpoints, backed by the local DB stand-in.
+
+Drives a weighted mix of `/api/reports/top-products`,
+`/api/channels/{channel_name}/activity` and `/api/search/messages` at
+increasing concurrency and reports throughput and latency percentiles.
+
+Usage:
+    python -m benchmarks.load_api                                   # in-process (ASGI transport)
+    python -m benchmarks.load_api --mode uvicorn --workers 1,4      # real server, compare worker counts
+    python -m benchmarks.load_api --cache-ttl 0,300 --concurrency 1,8,32,64
+    python -m benchmarks.load_api --mode uvicorn --json load.json
+
+In-process mode measures the application alone (no sockets, one event loop);
+uvicorn mode spawns the production launcher (`api.run_api --mode prod`) for
+every worker/cache combination.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import httpx
+
+from benchmarks import synthetic
+
+# Share of each endpoint in the mix, roughly what the dashboards generate
+MIX = (("top_products", 0.3), ("activity", 0.45), ("search", 0.25))
+
+
+@dataclass
+class LevelReport:
+    """Outcome of one concurrency level."""
+
+    label: str
+    concurrency: int
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class QueryMix:
+    """Produces randomised requests following `MIX`."""
+
+    def __init__(self, channels: list[str], end: datetime, seed: int = 1) -> None:
+        self.rng = random.Random(seed)
+        self.channels = channels
+        self.end = end
+        self.kinds = [k for k, _ in MIX]
+        self.weights = [w for _, w in MIX]
+
+    def next(self) -> tuple[str, str, dict[str, Any]]:
+        """Return (method, url, request kwargs) for the next request."""
+        kind = self.rng.choices(self.kinds, weights=self.weights)[0]
+        if kind == "top_products":
+            return "GET", "/api/reports/top-products", {"params": {"limit": self.rng.choice([10, 10, 25, 50])}}
+        if kind == "activity":
+            days = self.rng.choice([7, 30, 30, 90])
+            channel = self.rng.choice(self.channels)
+            return "GET", f"/api/channels/{channel}/activity", {
+                "params": {
+                    "start_date": (self.end - timedelta(days=days)).isoformat(),
+                    "end_date": self.end.isoformat(),
+                }
+            }
+        body: dict[str, Any] = {
+            "query": self.rng.choice(synthetic.PRODUCTS[:15]).split()[0].lower(),
+            "limit": self.rng.choice([10, 20, 50]),
+        }
+        if self.rng.random() < 0.5:
+            body["channel"] = self.rng.choice(self.channels)
+        return "POST", "/api/search/messages", {"json": body}
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    mix: QueryMix,
+    concurrency: int,
+    duration: float,
+    label: str,
+) -> LevelReport:
+    """Run `concurrency` closed-loop clients for `duration` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, url, kwargs = mix.next()
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, url, **kwargs)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return LevelReport(
+        label=label,
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        rps=len(latencies) / elapsed if elapsed else 0.0,
+        p50_ms=_percentile(latencies, 50) * 1e3,
+        p90_ms=_percentile(latencies, 90) * 1e3,
+        p99_ms=_percentile(latencies, 99) * 1e3,
+        max_ms=(latencies[-1] if latencies else 0.0) * 1e3,
+    )
+
+
+async def sweep(
+    client_factory: Callable[[int], httpx.AsyncClient],
+    mix: QueryMix,
+    levels: list[int],
+    duration: float,
+    label: str,
+) -> list[LevelReport]:
+    reports = []
+    for concurrency in levels:
+        async with client_factory(concurrency) as client:
+            await run_level(client, mix, 1, min(duration, 1.0), label)  # warm-up
+            report = await run_level(client, mix, concurrency, duration, label)
+        print(
+            f"{label:<24} c={concurrency:<4} {report.requests:>7} req  {report.rps:9.1f} req/s  "
+            f"p50 {report.p50_ms:8.2f}  p90 {report.p90_ms:8.2f}  p99 {report.p99_ms:8.2f}  "
+            f"max {report.max_ms:8.2f} ms  errors {report.errors}"
+        )
+        reports.append(report)
+    return reports
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(base_url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"API at {base_url} did not become healthy in {timeout}s")
+
+
+def run_in_process(mix: QueryMix, levels: list[int], duration: float, cache_ttl: int) -> list[LevelReport]:
+    from api import crud
+    from api.main import app
+    from src.constants import env
+
+    env.API_CACHE_TTL = cache_ttl
+    crud.get_top_products.cache_clear()
+    crud.get_channel_activity.cache_clear()
+
+    def factory(concurrency: int) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+
+    return asyncio.run(sweep(factory, mix, levels, duration, f"in-process ttl={cache_ttl}"))
+
+
+def run_uvicorn(
+    mix: QueryMix,
+    levels: list[int],
+    duration: float,
+    workers: int,
+    cache_ttl: int,
+    extra_env: Optional[dict[str, str]] = None,
+) -> list[LevelReport]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc_env = {
+        **os.environ,
+        "API_CACHE_TTL": str(cache_ttl),
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(port),
+        "API_LOG_LEVEL": "warning",
+        "API_ACCESS_LOG": "false",
+        **(extra_env or {}),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "api.run_api", "--mode", "prod", "--workers", str(workers)],
+        env=proc_env,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    try:
+        _wait_healthy(base_url, proc)
+
+        def factory(concurrency: int) -> httpx.AsyncClient:
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0)
+
+        label = f"uvicorn w={workers} ttl={cache_ttl}"
+        return asyncio.run(sweep(factory, mix, levels, duration, label))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the analytics API")
+    parser.add_argument("--mode", choices=["in-process", "uvicorn"], default="in-process")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16, 64], help="Comma-separated levels")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--workers", type=_int_list, default=[1], help="uvicorn worker counts to compare")
+    parser.add_argument("--cache-ttl", type=_int_list, default=[300], help="API_CACHE_TTL values to compare")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per channel")
+    parser.add_argument("--db-dir", help="Reuse an already seeded stand-in directory")
+    parser.add_argument("--json", help="Write all level reports to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="telegram-load-") as tmp:
+        root = args.db_dir or tmp
+        # Spawned servers read the environment; this process may already have
+        # imported src.constants.env (via benchmarks.synthetic), so patch it too
+        os.environ["DB_BACKEND"] = "local"
+        os.environ["LOCAL_DB_DIR"] = root
+        from src.constants import env
+        from src.db.local import connect_local
+
+        env.DB_BACKEND = "local"
+        env.LOCAL_DB_DIR = root
+
+        names = synthetic.channel_names(args.channels)
+        with connect_local(root) as conn:
+            if args.db_dir:
+                end = datetime(2025, 7, 13)
+            else:
+                ds = synthetic.seed_mart(conn, names, args.messages)
+                end = ds.end
+                print(f"Dataset: {len(names)} channels, {ds.messages} messages, {ds.mentions} mentions")
+
+        reports: list[LevelReport] = []
+        for ttl in args.cache_ttl:
+            if args.mode == "in-process":
+                reports += run_in_process(QueryMix(names, end), args.concurrency, args.duration, ttl)
+                continue
+            for workers in args.workers:
+                reports += run_uvicorn(QueryMix(names, end), args.concurrency, args.duration, workers, ttl)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps([asdict(r) for r in reports], indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {len(reports)} reports -> {args.json}")
+
+
+if __name__ == "__main__":
+    main()
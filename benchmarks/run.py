@@ -0,0 +1,142 @@
+"""Run the benchmark suite against the local Oracle stand-in.
+
+Usage:
+    python -m benchmarks.run                       # run and print results
+    python -m benchmarks.run --compare             # fail if slower than baselines.json
+    python -m benchmarks.run --save                # overwrite baselines.json
+    python -m benchmarks.run --filter crud --scale large
+
+A fresh synthetic dataset is generated in a temporary directory for every run,
+so results are comparable only at the same `--scale`: baselines.json keeps one
+set of baselines per scale, and `--compare` refuses to run against a scale
+that has none. Baselines are machine-specific; re-save them when the CI host
+changes.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+
+BASELINES = Path(__file__).with_name("baselines.json")
+MODULES = (
+    "benchmarks.bench_crud",
+    "benchmarks.bench_loaders",
+    "benchmarks.bench_serialization",
+    "benchmarks.bench_mentions",
+    "benchmarks.bench_scraper",
+    "benchmarks.bench_trending",
+    "benchmarks.bench_similar",
+    "benchmarks.bench_sentiment",
+)
+SCALES = {
+    "small": {"channels": 10, "messages": 500},
+    "medium": {"channels": 20, "messages": 2000},
+    "large": {"channels": 50, "messages": 10000},
+}
+
+
+def run(names_filter: str | None, scale: str, min_time: float) -> dict[str, dict[str, float]]:
+    from benchmarks import synthetic
+    from benchmarks.harness import REGISTRY, BenchContext, SkipBenchmark, measure
+    from src.constants import env
+    from src.db.local import connect_local
+
+    for module in MODULES:
+        importlib.import_module(module)
+
+    root = Path(env.LOCAL_DB_DIR)
+    conn = connect_local(root)
+    channels = synthetic.channel_names(SCALES[scale]["channels"])
+    ds = synthetic.seed_mart(conn, channels, SCALES[scale]["messages"])
+    print(f"Dataset: {len(channels)} channels, {ds.messages} messages, {ds.mentions} mentions ({scale})")
+    ctx = BenchContext(root=root, conn=conn, channels=channels, scale=SCALES[scale], extra={"end": ds.end})
+
+    results: dict[str, dict[str, float]] = {}
+    for name, setup in REGISTRY.items():
+        if names_filter and names_filter not in name:
+            continue
+        try:
+            prepared = setup(ctx)
+        except SkipBenchmark as e:
+            print(f"{name:<40} SKIPPED ({e})")
+            continue
+        fn, reset, items = (*prepared, None)[:3] if isinstance(prepared, tuple) else (prepared, None, None)
+        res = measure(name, fn, reset, min_time=min_time)
+        results[name] = res.as_dict()
+        line = f"{name:<40} median {res.median * 1e3:9.3f} ms   min {res.min * 1e3:9.3f} ms   ({res.rounds} rounds)"
+        if items:
+            results[name]["items_per_sec"] = items / res.median
+            line += f"   {items / res.median:,.0f} items/s"
+        print(line)
+    conn.close()
+    return results
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float) -> list[str]:
+    """Return the names of benchmarks whose median regressed beyond `tolerance`.
+
+    `baseline` holds the results recorded at the same scale as `results`.
+    """
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<40} no baseline")
+            continue
+        ratio = res["median"] / base["median"]
+        flag = "REGRESSION" if ratio > tolerance else "ok"
+        print(f"{name:<40} {ratio:6.2f}x baseline   {flag}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run performance benchmarks")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to spend per benchmark")
+    parser.add_argument("--save", action="store_true", help="Write results to baselines.json")
+    parser.add_argument("--compare", action="store_true", help="Compare against baselines.json")
+    parser.add_argument("--tolerance", type=float, default=1.3, help="Allowed slowdown ratio vs baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="telegram-bench-") as tmp:
+        # Must be set before any src module reads src.constants.env
+        os.environ["DB_BACKEND"] = "local"
+        os.environ["LOCAL_DB_DIR"] = tmp
+        results = run(args.filter, args.scale, args.min_time)
+
+    baselines = json.loads(BASELINES.read_text(encoding="utf-8")) if BASELINES.exists() else {}
+    if args.compare:
+        baseline = baselines.get("scales", {}).get(args.scale)
+        if not baseline:
+            recorded = ", ".join(sorted(baselines.get("scales", {}))) or "none"
+            print(f"No baselines recorded at scale {args.scale!r} (recorded: {recorded}); "
+                  f"run with --save --scale {args.scale} first")
+            sys.exit(2)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+    if args.save:
+        scales = baselines.get("scales", {})
+        # Keep baselines of benchmarks that were filtered out of this run
+        scales[args.scale] = {**scales.get(args.scale, {}), **results}
+        payload = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scales": scales,
+        }
+        BASELINES.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Saved {args.scale} baselines -> {BASELINES}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Deterministic synthetic Telegram data for benchmarks and local development.
+
+Volumes and distributions roughly follow the production channels: a long tail
+of product popularity (Zipf), mixed Amharic/English ad copy, more posts during
+the day than at night and roughly a third of posts carrying a photo.
+
+Usage:
+    python -m benchmarks.synthetic --root data/local --channels 20 --messages 2000
+    python -m benchmarks.synthetic --raw data/raw/telegram_messages/2025-07-13
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.db.watermark import bump_watermark
+from src.utils.file_io import write_json_atomic
+
+CHANNELS = [
+    "lobelia4cosmetics",
+    "tikvahpharma",
+    "chemed123",
+    "yetenaweg",
+    "eahci",
+    "medi-store-ethiopia",
+    "ethio-pharmacy",
+    "addis-medical-supplies",
+    "hakim-pharma",
+    "betelhem-cosmetics",
+]
+
+PRODUCTS = [
+    "Paracetamol", "Amoxicillin", "Ibuprofen", "Vitamin C", "Omeprazole",
+    "Metformin", "Azithromycin", "Cetirizine", "Ciprofloxacin", "Diclofenac",
+    "Loratadine", "Salbutamol", "Insulin", "Folic Acid", "Zinc Sulfate",
+    "Nivea Cream", "Vaseline", "Sunscreen SPF50", "Hyaluronic Serum", "Cerave Cleanser",
+    "Glucometer", "Blood Pressure Monitor", "Thermometer", "Pulse Oximeter", "Face Mask",
+    "Hand Sanitizer", "Oral Rehydration Salts", "Multivitamin", "Iron Supplement", "Cough Syrup",
+]
+
+_AMHARIC = ["ዋጋ", "አዲስ", "ቅናሽ", "ይደውሉ", "አለን", "በጣም", "ጥራት", "ያለው", "ለማዘዝ", "ብር"]
+_ENGLISH = ["available", "now", "original", "price", "call", "delivery", "free", "stock", "new", "best"]
+_MEDIA = [(None, 0.55), ("image", 0.35), ("video", 0.07), ("document", 0.03)]
+_HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 8, 7, 8, 9, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+@dataclass
+class Dataset:
+    """Summary of a generated dataset."""
+
+    channels: list[str]
+    messages: int
+    mentions: int
+    start: datetime
+    end: datetime
+
+
+def channel_names(count: int) -> list[str]:
+    """Return `count` channel names, cycling the real ones with a numeric suffix."""
+    return [
+        CHANNELS[i % len(CHANNELS)] + ("" if i < len(CHANNELS) else f"-{i // len(CHANNELS)}")
+        for i in range(count)
+    ]
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def _timestamp(rng: random.Random, start: datetime, days: int) -> datetime:
+    day = start + timedelta(days=rng.randrange(days))
+    hour = rng.choices(range(24), weights=_HOUR_WEIGHTS)[0]
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def _text(rng: random.Random, products: list[str]) -> str:
+    words = rng.choices(_AMHARIC + _ENGLISH, k=rng.randint(6, 40))
+    for product in products:
+        words.insert(rng.randrange(len(words) + 1), product)
+    words.append(f"{rng.randint(50, 5000)} ብር")
+    return " ".join(words)
+
+
+def iter_messages(
+    channels: list[str],
+    per_channel: int,
+    days: int = 180,
+    seed: int = 42,
+    end: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield flat message records (one per message) with their product mentions."""
+    rng = random.Random(seed)
+    end = end or datetime(2025, 7, 13)
+    start = end - timedelta(days=days)
+    weights = _zipf_weights(len(PRODUCTS))
+    media_types = [m for m, _ in _MEDIA]
+    media_weights = [w for _, w in _MEDIA]
+    message_id = 0
+
+    for channel_id, channel in enumerate(channels, start=1):
+        for _ in range(per_channel):
+            message_id += 1
+            mentioned = rng.choices(PRODUCTS, weights=weights, k=rng.choices([0, 1, 2, 3], [30, 45, 18, 7])[0])
+            yield {
+                "message_id": message_id,
+                "channel_id": channel_id,
+                "channel": channel,
+                "text": _text(rng, mentioned),
+                "ts": _timestamp(rng, start, days),
+                "media_type": rng.choices(media_types, weights=media_weights)[0],
+                "products": [(p, round(rng.uniform(0.55, 0.99), 4)) for p in dict.fromkeys(mentioned)],
+            }
+
+
+def telethon_dict(record: dict[str, Any]) -> dict[str, Any]:
+    """Render a flat record the way `Message.to_dict()` output lands in the data lake."""
+    ts = record["ts"].replace(tzinfo=timezone.utc)
+    media = None
+    if record["media_type"] == "image":
+        media = {
+            "_": "MessageMediaPhoto",
+            "spoiler": False,
+            "photo": {
+                "_": "Photo",
+                "id": 5_000_000_000 + record["message_id"],
+                "access_hash": -(7_000_000_000 + record["message_id"]),
+                "file_reference": "AgAD" + "x" * 24,
+                "date": str(ts),
+                "sizes": [
+                    {"_": "PhotoStrippedSize", "type": "i", "bytes": "AQgoA" + "y" * 80},
+                    {"_": "PhotoSize", "type": "m", "w": 320, "h": 320, "size": 21000},
+                    {"_": "PhotoSize", "type": "x", "w": 800, "h": 800, "size": 76000},
+                    {"_": "PhotoSizeProgressive", "type": "y", "w": 1280, "h": 1280, "sizes": [9000, 31000, 64000, 120000]},
+                ],
+                "dc_id": 4,
+                "has_stickers": False,
+                "video_sizes": [],
+            },
+            "ttl_seconds": None,
+        }
+    elif record["media_type"]:
+        media = {"_": "MessageMediaDocument", "document": {"_": "Document", "id": record["message_id"], "mime_type": "video/mp4" if record["media_type"] == "video" else "application/pdf"}}
+
+    return {
+        "_": "Message",
+        "id": record["message_id"],
+        "peer_id": {"_": "PeerChannel", "channel_id": 1_000_000 + record["channel_id"]},
+        "date": str(ts),
+        "message": record["text"],
+        "out": False,
+        "mentioned": False,
+        "media_unread": False,
+        "silent": False,
+        "post": True,
+        "from_scheduled": False,
+        "legacy": False,
+        "edit_hide": False,
+        "pinned": False,
+        "noforwards": False,
+        "from_id": None,
+        "fwd_from": None,
+        "via_bot_id": None,
+        "reply_to": None,
+        "media": media,
+        "reply_markup": None,
+        "entities": [],
+        "views": (record["message_id"] * 37) % 9000,
+        "forwards": (record["message_id"] * 7) % 40,
+        "replies": None,
+        "edit_date": None,
+        "post_author": None,
+        "grouped_id": None,
+        "reactions": None,
+        "restriction_reason": [],
+        "ttl_period": None,
+    }
+
+
+def telethon_message(record: dict[str, Any]):
+    """Build the Telethon `Message` object that `telethon_dict` describes."""
+    from telethon.tl import types
+
+    ts = record["ts"].replace(tzinfo=timezone.utc)
+    media = None
+    if record["media_type"] == "image":
+        media = types.MessageMediaPhoto(
+            spoiler=False,
+            photo=types.Photo(
+                id=5_000_000_000 + record["message_id"],
+                access_hash=-(7_000_000_000 + record["message_id"]),
+                file_reference=b"AgAD" + b"x" * 24,
+                date=ts,
+                sizes=[
+                    types.PhotoStrippedSize("i", b"AQgoA" + b"y" * 80),
+                    types.PhotoSize("m", 320, 320, 21000),
+                    types.PhotoSize("x", 800, 800, 76000),
+                    types.PhotoSizeProgressive("y", 1280, 1280, [9000, 31000, 64000, 120000]),
+                ],
+                dc_id=4,
+                has_stickers=False,
+                video_sizes=[],
+            ),
+        )
+    elif record["media_type"]:
+        mime = "video/mp4" if record["media_type"] == "video" else "application/pdf"
+        media = types.MessageMediaDocument(
+            document=types.Document(record["message_id"], 0, b"", ts, mime, 0, 4, [])
+        )
+
+    return types.Message(
+        id=record["message_id"],
+        peer_id=types.PeerChannel(1_000_000 + record["channel_id"]),
+        date=ts,
+        message=record["text"],
+        out=False,
+        mentioned=False,
+        media_unread=False,
+        silent=False,
+        post=True,
+        from_scheduled=False,
+        legacy=False,
+        edit_hide=False,
+        pinned=False,
+        noforwards=False,
+        media=media,
+        entities=[],
+        views=(record["message_id"] * 37) % 9000,
+        forwards=(record["message_id"] * 7) % 40,
+        restriction_reason=[],
+    )
+
+
+def seed_mart(conn, channels: list[str], per_channel: int, days: int = 180, seed: int = 42) -> Dataset:
+    """Populate the `telegram_mart` tables of a (stand-in) connection."""
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO telegram_mart.channels (channel_id, channel_name) VALUES (:1, :2)",
+        list(enumerate(channels, start=1)),
+    )
+    messages: list[tuple] = []
+    mentions: list[tuple] = []
+    first = last = None
+    for rec in iter_messages(channels, per_channel, days, seed):
+        messages.append((rec["message_id"], rec["channel_id"], rec["text"], rec["ts"], rec["media_type"], None, None))
+        for product, confidence in rec["products"]:
+            mentions.append((rec["message_id"], rec["channel_id"], product, confidence))
+        first = rec["ts"] if first is None or rec["ts"] < first else first
+        last = rec["ts"] if last is None or rec["ts"] > last else last
+    cur.executemany(
+        """
+        INSERT INTO telegram_mart.messages (
+            message_id, channel_id, message_text, message_ts, media_type, sentiment_score, confidence_score
+        ) VALUES (:1, :2, :3, :4, :5, :6, :7)
+        """,
+        messages,
+    )
+    cur.executemany(
+        """
+        INSERT INTO telegram_mart.product_mentions (message_id, channel_id, product_name, confidence_score)
+        VALUES (:1, :2, :3, :4)
+        """,
+        mentions,
+    )
+    bump_watermark(cur, "mart")
+    conn.commit()
+    return Dataset(channels, len(messages), len(mentions), first, last)
+
+
+def write_raw_partition(
+    base: Path,
+    channels: list[str],
+    per_channel: int,
+    days: int = 180,
+    seed: int = 42,
+    compact: bool = False,
+) -> list[Path]:
+    """Write one `<channel>.json` file per channel, as the scraper does.
+
+    `compact=True` writes `MessageRecord`s like the current scraper; the
+    default writes full `to_dict()` trees like scrapes from before it.
+    """
+    from src.scraper.records import MessageRecord
+
+    by_channel: dict[str, list[dict[str, Any]]] = {ch: [] for ch in channels}
+    for rec in iter_messages(channels, per_channel, days, seed):
+        msg = telethon_dict(rec)
+        by_channel[rec["channel"]].append(MessageRecord.from_message(msg).to_dict() if compact else msg)
+    paths = []
+    for ch, msgs in by_channel.items():
+        path = base / f"{ch}.json"
+        write_json_atomic(path, msgs, indent=None if compact else 2)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Generate synthetic Telegram data")
+    parser.add_argument("--root", help="Stand-in database directory to seed (telegram_mart)")
+    parser.add_argument("--raw", help="Data lake partition directory to write channel JSON files to")
+    parser.add_argument("--channels", type=int, default=20, help="Number of channels")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per channel")
+    parser.add_argument("--days", type=int, default=180, help="Days of history")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    names = channel_names(args.channels)
+    if args.root:
+        from src.db.local import connect_local
+
+        with connect_local(args.root) as conn:
+            ds = seed_mart(conn, names, args.messages, args.days, args.seed)
+        print(f"Seeded {ds.messages} messages / {ds.mentions} mentions -> {args.root}")
+    if args.raw:
+        paths = write_raw_partition(Path(args.raw), names, args.messages, args.days, args.seed)
+        print(f"Wrote {len(paths)} channel files -> {args.raw}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from dagster import job, op, schedule, ScheduleEvaluationContext
+from dagster import In, Nothing, job, op, schedule, ScheduleEvaluationContext
 from datetime import datetime, timedelta
 from pathlib import Path
 import subprocess
@@ -11,6 +11,8 @@ from src.scraper.collector import ChannelScraper
 from src.loaders.load_raw_to_oracle import load_messages_from_date
 from src.image.process_images import process_images_for_date
 from src.constants import env
+from src.db import get_connection
+from src.db.watermark import bump_watermark
 
 @op
 async def scrape_telegram_data(context):
@@ -49,10 +51,39 @@ async def run_dbt_transformations(context):
             text=True
         )
         context.log.info(f"DBT run completed: {result.stdout}")
+        
+        # Invalidate API HTTP caches (ETag / Last-Modified) now that marts changed
+        with get_connection() as conn:
+            bump_watermark(conn.cursor(), "mart")
+            conn.commit()
     except subprocess.CalledProcessError as e:
         context.log.error(f"DBT run failed: {e.stderr}")
         raise
 
+@op(ins={"mart_built": In(Nothing)})
+async def run_sentiment_scoring(context):
+    """Score the sentiment of newly loaded messages and copy it onto the mart."""
+    from src.sentiment.score_messages import main as score_messages
+
+    try:
+        score_messages()
+        context.log.info("Successfully scored message sentiment")
+    except Exception as e:
+        context.log.error(f"Error scoring sentiment: {str(e)}")
+        raise
+
+@op(ins={"mart_built": In(Nothing)})
+async def refresh_activity_buckets(context):
+    """Recompute the hourly/daily activity rollups for recent days after the mart rebuild."""
+    from src.activity.build_buckets import main as build_buckets
+
+    try:
+        build_buckets()
+        context.log.info("Successfully refreshed activity buckets")
+    except Exception as e:
+        context.log.error(f"Error refreshing activity buckets: {str(e)}")
+        raise
+
 @op
 async def run_yolo_enrichment(context):
     """Run YOLO object detection on images."""
@@ -70,7 +101,10 @@ async def telegram_analytics_pipeline():
     """Main pipeline for the Telegram analytics workflow."""
     scrape_telegram_data()
     load_raw_to_oracle()
-    run_dbt_transformations()
+    mart_built = run_dbt_transformations()
+    # Both read and write mart rows, so only after dbt has rebuilt them
+    run_sentiment_scoring(mart_built=mart_built)
+    refresh_activity_buckets(mart_built=mart_built)
     run_yolo_enrichment()
 
 @schedule(
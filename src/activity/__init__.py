@@ -0,0 +1,201 @@
+"""Pre-bucketed channel activity and server-side series downsampling.
+
+Activity charts used to aggregate `telegram_mart.messages` per request, one
+row per day. Two rollup tables now hold the counts per channel:
+
+- `telegram_mart.channel_activity_hourly`: one row per channel and hour with
+  messages, messages with text, summed text length (average = sum / count),
+  images and videos;
+- `telegram_mart.channel_activity_daily`: the same per day, summed from the
+  hourly table.
+
+Hourly and daily series read their table directly; weeks (ISO, starting
+Monday) and months are summed from the daily rows, so a multi-year monthly
+series reads a few thousand rows instead of every message. `refresh_buckets`
+rebuilds the buckets from a given day on (the mart is rebuilt by dbt, so
+recent days are simply recomputed).
+
+For charting, `bucket_grid` zero-fills the hours/days/weeks/months without
+messages and `lttb` picks the points that best preserve the visual shape of a
+long series (Largest-Triangle-Three-Buckets), so responses stay within a
+point budget whatever the range and granularity.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Granularity -> (numpy datetime unit, step in that unit)
+GRANULARITIES: Dict[str, Tuple[str, int]] = {
+    "hour": ("h", 1),
+    "day": ("D", 1),
+    "week": ("D", 7),
+    "month": ("M", 1),
+}
+
+BUCKET_COLUMNS = ("message_count", "text_count", "text_length_sum", "image_count", "video_count")
+
+
+def ensure_activity_tables(cur) -> None:
+    """Create the hourly and daily rollup tables if they do not exist."""
+    for table in ("channel_activity_hourly", "channel_activity_daily"):
+        ddl = f"""CREATE TABLE telegram_mart.{table} (
+                channel_id       NUMBER,
+                bucket_ts        DATE,
+                message_count    NUMBER,
+                text_count       NUMBER,
+                text_length_sum  NUMBER,
+                image_count      NUMBER,
+                video_count      NUMBER,
+                PRIMARY KEY (channel_id, bucket_ts)
+            )"""
+        cur.execute(f"""
+            BEGIN
+                EXECUTE IMMEDIATE '{ddl}';
+            EXCEPTION WHEN OTHERS THEN
+                IF SQLCODE != -955 THEN RAISE; END IF;
+            END;
+        """)
+
+
+def latest_bucket(cur) -> Optional[datetime]:
+    """Most recent hourly bucket stored, or None if the rollups are empty."""
+    cur.execute("SELECT MAX(bucket_ts) FROM telegram_mart.channel_activity_hourly")
+    row = cur.fetchone()
+    value = row[0] if row else None
+    if isinstance(value, str):  # SQLite stand-in returns aggregates as text
+        value = datetime.fromisoformat(value)
+    return value
+
+
+def refresh_buckets(cur, since: Optional[datetime] = None) -> int:
+    """Recompute the hourly and daily rollups from `since` (midnight of that day) on.
+
+    Args:
+        cur: Open cursor; the caller commits
+        since: First day to rebuild; everything when None
+
+    Returns:
+        Number of hourly buckets written
+    """
+    ensure_activity_tables(cur)
+    where, params = "", {}
+    if since is not None:
+        where = "WHERE {column} >= :since"
+        params = {"since": datetime(since.year, since.month, since.day)}
+
+    cur.execute(f"DELETE FROM telegram_mart.channel_activity_hourly {where.format(column='bucket_ts')}", params)
+    cur.execute(f"""
+        INSERT INTO telegram_mart.channel_activity_hourly (
+            channel_id, bucket_ts, message_count, text_count, text_length_sum, image_count, video_count
+        )
+        SELECT
+            m.channel_id,
+            TRUNC(m.message_ts, 'HH24'),
+            COUNT(*),
+            COUNT(m.message_text),
+            SUM(LENGTH(m.message_text)),
+            COUNT(CASE WHEN m.media_type = 'image' THEN 1 END),
+            COUNT(CASE WHEN m.media_type = 'video' THEN 1 END)
+        FROM telegram_mart.messages m
+        {where.format(column='m.message_ts')}
+        GROUP BY m.channel_id, TRUNC(m.message_ts, 'HH24')
+    """, params)
+    written = cur.rowcount
+
+    cur.execute(f"DELETE FROM telegram_mart.channel_activity_daily {where.format(column='bucket_ts')}", params)
+    cur.execute(f"""
+        INSERT INTO telegram_mart.channel_activity_daily (
+            channel_id, bucket_ts, message_count, text_count, text_length_sum, image_count, video_count
+        )
+        SELECT
+            h.channel_id,
+            TRUNC(h.bucket_ts),
+            SUM(h.message_count),
+            SUM(h.text_count),
+            SUM(h.text_length_sum),
+            SUM(h.image_count),
+            SUM(h.video_count)
+        FROM telegram_mart.channel_activity_hourly h
+        {where.format(column='h.bucket_ts')}
+        GROUP BY h.channel_id, TRUNC(h.bucket_ts)
+    """, params)
+    return written
+
+
+def bucket_grid(first, last, granularity: str) -> np.ndarray:
+    """Every bucket start from `first` to `last` (both bucket starts) as datetime64[s]."""
+    unit, step = GRANULARITIES[granularity]
+    return np.arange(np.datetime64(first, unit), np.datetime64(last, unit) + step, step).astype("datetime64[s]")
+
+
+def fill_buckets(
+    buckets: Sequence,
+    columns: Sequence[Sequence[float]],
+    granularity: str,
+) -> Tuple[np.ndarray, list]:
+    """Spread sparse bucket rows over the full grid between the first and last bucket.
+
+    Args:
+        buckets: Ascending bucket starts (datetimes or ISO strings)
+        columns: Values per bucket, one sequence per column
+        granularity: Key of `GRANULARITIES`
+
+    Returns:
+        (grid as datetime64[s], one float64 array per column, 0 where a bucket had no row)
+    """
+    stamps = np.array(buckets, dtype="datetime64[s]")
+    grid = bucket_grid(stamps[0], stamps[-1], granularity)
+    positions = np.searchsorted(grid, stamps)
+    filled = []
+    for values in columns:
+        column = np.zeros(len(grid), dtype=np.float64)
+        column[positions] = np.asarray(values, dtype=np.float64)
+        filled.append(column)
+    return grid, filled
+
+
+def lttb(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    The first and last points are always kept. The points in between are split
+    into `threshold - 2` buckets, and from each bucket the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket is kept, which preserves peaks and dips that plain striding
+    would skip.
+
+    Args:
+        y: Series values, one per bucket (x is the bucket index)
+        threshold: Number of points to keep (at least 3)
+
+    Returns:
+        Ascending indices into `y`; all of them when `len(y) <= threshold`
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket i covers [edges[i], edges[i + 1]) of the points between the first and last
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Average of each bucket's successor; the last bucket's successor is the final point
+    sums = np.concatenate(([0.0], np.cumsum(y)))
+    next_start = edges[1:]
+    next_end = np.append(edges[2:], n)
+    avg_x = (next_start + next_end - 1) / 2
+    avg_y = (sums[next_end] - sums[next_start]) / (next_end - next_start)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        xs = np.arange(start, end)
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((a - avg_x[i]) * (y[start:end] - y[a]) - (a - xs) * (avg_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,53 @@
+"""CLI script to refresh the pre-bucketed channel activity tables.
+
+Usage:
+    python -m src.activity.build_buckets                # recent days (see --lookback-days)
+    python -m src.activity.build_buckets --since 2025-01-01
+    python -m src.activity.build_buckets --full
+
+dbt rebuilds `telegram_mart.messages` on every run, so by default the buckets
+from a few days before the latest stored hour onwards are recomputed, which
+also picks up late-scraped messages of those days. `--full` rebuilds every
+bucket (first run, or after a backfill further back). The `activity`
+data-version watermark is bumped so API caches revalidate.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.activity import ensure_activity_tables, latest_bucket, refresh_buckets
+from src.db import get_connection
+from src.db.watermark import bump_watermark
+
+
+def main(since: Optional[str] = None, full: bool = False, lookback_days: int = 3) -> None:
+    started = time.perf_counter()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        ensure_activity_tables(cur)
+        if full:
+            start = None
+        elif since:
+            start = datetime.strptime(since, "%Y-%m-%d")
+        else:
+            latest = latest_bucket(cur)
+            start = latest - timedelta(days=lookback_days) if latest else None
+
+        written = refresh_buckets(cur, start)
+        bump_watermark(cur, "activity")
+        conn.commit()
+
+    scope = f"from {start:%Y-%m-%d}" if start else "all days"
+    print(f"Rebuilt {written} hourly activity buckets ({scope}) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the hourly/daily channel activity rollups")
+    parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--full", action="store_true", help="Rebuild every bucket")
+    parser.add_argument("--lookback-days", type=int, default=3, help="Days before the latest bucket to recompute")
+    args = parser.parse_args()
+    main(args.since, args.full, args.lookback_days)
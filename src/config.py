@@ -5,7 +5,9 @@ attributes can be overridden by real environment variables in production.
 """
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
@@ -32,4 +34,57 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings()
+class ServerSettings(BaseSettings):
+    """API server settings, read from `API_*` environment variables."""
+
+    # "dev" runs a single auto-reloading worker, "prod" the tuned multi-worker server
+    mode: Literal["dev", "prod"] = "dev"
+    host: str = "0.0.0.0"
+    port: int = 8000
+
+    # 0 = derive from available cores (cores * workers_per_core, capped at max_workers)
+    workers: int = 0
+    workers_per_core: int = 2
+    max_workers: int = 16
+
+    # "auto" picks uvloop / httptools when installed
+    loop: Literal["auto", "uvloop", "asyncio"] = "auto"
+    http: Literal["auto", "httptools", "h11"] = "auto"
+
+    # Keep-alive must outlive the load balancer idle timeout (60s on most LBs)
+    keepalive_timeout: int = 65
+    graceful_timeout: int = 30
+    backlog: int = 2048
+    limit_concurrency: Optional[int] = None
+    limit_max_requests: Optional[int] = None
+    access_log: bool = True
+    log_level: str = "info"
+
+    # Oracle session pool per worker, opened before the worker accepts traffic
+    db_pool_min: int = 2
+    db_pool_max: int = 10
+
+    model_config = SettingsConfigDict(
+        env_prefix="API_",
+        env_file=str(Path(__file__).resolve().parents[1] / ".env"),
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
+    )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Build the scraper settings on first use.
+
+    `Settings` requires Telegram credentials, so it is not constructed at import:
+    modules that only need `ServerSettings` (or nothing) import cleanly without them.
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Keep `from src.config import settings` working, resolved lazily
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,3 +10,55 @@ ORACLE_HOST: str = os.getenv("ORACLE_HOST", "localhost")
 ORACLE_PORT: int = int(os.getenv("ORACLE_PORT", "1521"))
 ORACLE_SERVICE: Optional[str] = os.getenv("ORACLE_SERVICE")
 ORACLE_DSN: str = os.getenv("ORACLE_DSN")
+
+# "oracle" (default) or "local" for the SQLite stand-in used by benchmarks
+DB_BACKEND: str = os.getenv("DB_BACKEND", "oracle").lower()
+LOCAL_DB_DIR: str = os.getenv("LOCAL_DB_DIR", "data/local")
+
+# Seconds the API keeps query results in memory (0 disables the cache)
+API_CACHE_TTL: int = int(os.getenv("API_CACHE_TTL", "300"))
+
+# HTTP caching of report endpoints (see api/http_cache.py)
+API_WATERMARK_TTL: int = int(os.getenv("API_WATERMARK_TTL", "30"))
+API_HTTP_MAX_AGE: int = int(os.getenv("API_HTTP_MAX_AGE", "60"))
+API_HTTP_SHARED_MAX_AGE: int = int(os.getenv("API_HTTP_SHARED_MAX_AGE", "300"))
+
+# API query execution (see api/query.py): slow-query log, retries on transient errors, circuit breaker
+SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG: Optional[str] = os.getenv("SLOW_QUERY_LOG")
+SLOW_QUERY_PLAN_INTERVAL: int = int(os.getenv("SLOW_QUERY_PLAN_INTERVAL", "300"))
+DB_QUERY_RETRIES: int = int(os.getenv("DB_QUERY_RETRIES", "3"))
+DB_RETRY_BASE_MS: float = float(os.getenv("DB_RETRY_BASE_MS", "50"))
+DB_RETRY_MAX_MS: float = float(os.getenv("DB_RETRY_MAX_MS", "1000"))
+DB_BREAKER_FAILURES: int = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+DB_BREAKER_RESET_SECONDS: float = float(os.getenv("DB_BREAKER_RESET_SECONDS", "30"))
+
+# Telegram photo cache and downloader (see src/image/downloader.py)
+MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", "data/media")
+MEDIA_CACHE_MAX_MB: int = int(os.getenv("MEDIA_CACHE_MAX_MB", "5120"))
+MEDIA_CACHE_MAX_AGE_DAYS: int = int(os.getenv("MEDIA_CACHE_MAX_AGE_DAYS", "30"))
+MEDIA_DOWNLOAD_CONCURRENCY: int = int(os.getenv("MEDIA_DOWNLOAD_CONCURRENCY", "8"))
+MEDIA_DOWNLOAD_RATE: float = float(os.getenv("MEDIA_DOWNLOAD_RATE", "10"))
+
+# Trending-products sketches (see src/trending): snapshot shared by writers and API workers
+TRENDING_SNAPSHOT: str = os.getenv("TRENDING_SNAPSHOT", "data/trending/snapshot.bin")
+TRENDING_CHECK_SECONDS: int = int(os.getenv("TRENDING_CHECK_SECONDS", "30"))
+
+# Near-duplicate clustering in the raw loader (see src/dedup)
+DEDUP_WINDOW_DAYS: int = int(os.getenv("DEDUP_WINDOW_DAYS", "14"))
+DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+
+# Similar-message index (see src/similar): written by the loader, memory-mapped by API workers
+SIMILAR_INDEX: str = os.getenv("SIMILAR_INDEX", "data/similar/index.bin")
+SIMILAR_CHECK_SECONDS: int = int(os.getenv("SIMILAR_CHECK_SECONDS", "60"))
+SIMILAR_NPROBE: int = int(os.getenv("SIMILAR_NPROBE", "16"))
+
+# Scraper channel resolution cache (see src/scraper/entities.py)
+SCRAPER_ENTITY_CACHE: str = os.getenv("SCRAPER_ENTITY_CACHE", "data/scraper/entities.json")
+SCRAPER_ENTITY_TTL_DAYS: float = float(os.getenv("SCRAPER_ENTITY_TTL_DAYS", "7"))
+
+# Distributed scraping work queue (see src/scraper/work_queue.py)
+SCRAPE_LEASE_SECONDS: float = float(os.getenv("SCRAPE_LEASE_SECONDS", "300"))
+SCRAPE_INTERVAL_MINUTES: float = float(os.getenv("SCRAPE_INTERVAL_MINUTES", "60"))
+SCRAPE_RETRY_SECONDS: float = float(os.getenv("SCRAPE_RETRY_SECONDS", "300"))
+SCRAPE_POLL_SECONDS: float = float(os.getenv("SCRAPE_POLL_SECONDS", "30"))
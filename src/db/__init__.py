@@ -1,21 +1,54 @@
 """Oracle DB connection helpers."""
 from __future__ import annotations
 
-from src.constants import env
+import threading
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import TYPE_CHECKING, Generator, Optional
 
-import oracledb
+from src.constants import env
 
-# Allow thin mode without Oracle Instant Client
-oracledb.init_oracle_client(lib_dir=None)
+if TYPE_CHECKING:
+    import oracledb
 
 _pool: Optional[oracledb.ConnectionPool] = None
+_client_lock = threading.Lock()
+_client_initialized = False
+
+
+def init_client():
+    """Import oracledb and initialise the Oracle client library once per process.
+
+    Importing oracledb and loading the client library cost tens of milliseconds
+    and fail on machines without Instant Client, so this runs on first
+    connection rather than when `src.db` is imported.
+
+    Returns:
+        The `oracledb` module
+    """
+    global _client_initialized
+    import oracledb
+
+    if not _client_initialized:
+        with _client_lock:
+            if not _client_initialized:
+                oracledb.init_oracle_client(lib_dir=None)
+                _client_initialized = True
+    return oracledb
 
 
 @contextmanager
 def get_connection():
-    """Get a direct Oracle connection."""
+    """Get a direct Oracle connection (or the local stand-in if DB_BACKEND=local)."""
+    if env.DB_BACKEND == "local":
+        from src.db.local import connect_local
+
+        conn = connect_local(env.LOCAL_DB_DIR)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
     user = env.ORACLE_USER
     password = env.ORACLE_PASSWORD
     dsn = env.ORACLE_DSN
@@ -23,6 +56,7 @@ def get_connection():
     if not all([user, password, dsn]):
         raise RuntimeError("Oracle connection env vars are not fully set")
     
+    oracledb = init_client()
     try:
         conn = oracledb.connect(
             user=user,
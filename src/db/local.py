@@ -0,0 +1,275 @@
+"""SQLite stand-in for the Oracle `telegram_raw` and `telegram_mart` schemas.
+
+Benchmarks and local development use this backend instead of a live Oracle
+instance. Each schema is an attached SQLite database file, so schema-qualified
+names such as `telegram_mart.messages` resolve unchanged. The handful of Oracle
+constructs used by the crud and loader modules (`FETCH FIRST`, `TRUNC` to a day,
+hour, ISO week or month, `TO_DATE`, positional `:1` binds, the raw-table `MERGE`
+and PL/SQL `EXECUTE IMMEDIATE` DDL blocks) are rewritten to SQLite on the fly.
+
+The stand-in mirrors the python-oracledb connection/cursor surface that this
+codebase relies on; it is not a general Oracle emulator.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+SCHEMAS = ("telegram_raw", "telegram_mart")
+
+LOCAL_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS telegram_raw.messages (
+        message_id      INTEGER PRIMARY KEY,
+        channel_slug    TEXT,
+        message_ts      TIMESTAMP,
+        payload         TEXT CHECK (json_valid(payload))
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_raw.image_detections (
+        detection_id    INTEGER PRIMARY KEY,
+        message_id      INTEGER REFERENCES messages(message_id),
+        class_id        INTEGER,
+        confidence      REAL,
+        bbox_x1         REAL,
+        bbox_y1         REAL,
+        bbox_x2         REAL,
+        bbox_y2         REAL,
+        created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_raw.product_mentions (
+        message_id       INTEGER,
+        channel_slug     TEXT,
+        product_name     TEXT,
+        confidence_score REAL,
+        match_type       TEXT,
+        created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS telegram_raw.product_mentions_message_ix ON product_mentions (message_id, channel_slug)",
+    """
+    CREATE TABLE IF NOT EXISTS telegram_raw.message_clusters (
+        channel_slug    TEXT,
+        message_id      INTEGER,
+        message_ts      TIMESTAMP,
+        cluster_slug    TEXT,
+        cluster_id      INTEGER,
+        minhash         BLOB,
+        PRIMARY KEY (channel_slug, message_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS telegram_raw.message_clusters_ts_ix ON message_clusters (message_ts)",
+    """
+    CREATE TABLE IF NOT EXISTS telegram_raw.data_version (
+        source          TEXT PRIMARY KEY,
+        loaded_at       TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_mart.channels (
+        channel_id      INTEGER PRIMARY KEY,
+        channel_name    TEXT UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS telegram_mart.messages (
+        message_id       INTEGER PRIMARY KEY,
+        channel_id       INTEGER,
+        message_text     TEXT,
+        message_ts       TIMESTAMP,
+        media_type       TEXT,
+        sentiment_score  REAL,
+        confidence_score REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS telegram_mart.messages_channel_ts_ix ON messages (channel_id, message_ts)",
+    """
+    CREATE TABLE IF NOT EXISTS telegram_mart.product_mentions (
+        mention_id       INTEGER PRIMARY KEY,
+        message_id       INTEGER,
+        channel_id       INTEGER,
+        product_name     TEXT,
+        confidence_score REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS telegram_mart.product_mentions_message_ix ON product_mentions (message_id)",
+)
+
+_PLSQL_DDL = re.compile(r"BEGIN\s+EXECUTE\s+IMMEDIATE\s+'(?P<ddl>.*?)';\s+EXCEPTION.*END;", re.S | re.I)
+_MERGE = re.compile(
+    r"MERGE\s+INTO\s+(?P<table>[\w.]+)\s+\w+\s+"
+    r"USING\s+\((?P<select>SELECT\s+.*?)\s+FROM\s+dual\)\s+(?P<alias>\w+)\s+"
+    r"ON\s+\(.*?\)\s+WHEN\s+NOT\s+MATCHED\s+THEN\s+INSERT\s+\((?P<cols>[^)]*)\)",
+    re.S | re.I,
+)
+# TRUNC(ts, unit) for the units the activity buckets use; IW weeks start on Monday
+_TRUNC_UNITS = {
+    "HH24": "STRFTIME('%Y-%m-%d %H:00:00', {0})",
+    "DD": "DATETIME(DATE({0}))",
+    "IW": "DATETIME(DATE({0}, '-6 days', 'weekday 1'))",
+    "MM": "DATETIME(DATE({0}, 'start of month'))",
+}
+_REWRITES = (
+    (re.compile(r"FETCH\s+FIRST\s+(:\w+|\d+)\s+ROWS\s+ONLY", re.I), r"LIMIT \1"),
+    (re.compile(r"\bTRUNC\(([^(),]+),\s*'(HH24|DD|IW|MM)'\)", re.I), lambda m: _TRUNC_UNITS[m.group(2).upper()].format(m.group(1))),
+    (re.compile(r"\bTRUNC\(([^()]+)\)", re.I), r"DATETIME(DATE(\1))"),
+    (re.compile(r"\bTO_DATE\(([^,()]+),\s*'YYYY-MM-DD'\)", re.I), r"DATETIME(\1)"),
+    (re.compile(r"\bJSON_VALUE\(([\w.]+),\s*('[^']*')(?:\s+RETURNING\s+\w+(?:\(\d+\))?)?\)", re.I), r"json_extract(\1, \2)"),
+    (re.compile(r"\bJSON_EXISTS\((\w+),\s*('[^']*')\)", re.I), r"(json_type(\1, \2) IS NOT NULL)"),
+    (re.compile(r"\bSYSTIMESTAMP\b", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bUPDATE\s+([\w.]+)\s+(?!SET\b)(\w+)\s+SET\b", re.I), r"UPDATE \1 AS \2 SET"),
+    (re.compile(r"\s+FROM\s+dual\b", re.I), ""),
+    (re.compile(r"(?<![\w:?]):(\d+)\b"), r"?\1"),
+)
+_DDL_TYPES = (
+    (re.compile(r"\bNUMBER\s+GENERATED\s+BY\s+DEFAULT\s+AS\s+IDENTITY\s+PRIMARY\s+KEY", re.I), "INTEGER PRIMARY KEY"),
+    (re.compile(r"\bNUMBER\(\d+,\s*\d+\)", re.I), "REAL"),
+    (re.compile(r"\bNUMBER\b", re.I), "NUMERIC"),
+    (re.compile(r"\b(VARCHAR2|NVARCHAR2|CLOB)\b(\(\d+\))?", re.I), "TEXT"),
+    (re.compile(r"\bDATE\b", re.I), "TIMESTAMP"),
+    (re.compile(r"CHECK\s*\((\w+)\s+IS\s+JSON\)", re.I), r"CHECK (json_valid(\1))"),
+    (re.compile(r"REFERENCES\s+\w+\.(\w+)", re.I), r"REFERENCES \1"),
+    (re.compile(r"CREATE\s+TABLE\s+(?!IF)", re.I), "CREATE TABLE IF NOT EXISTS "),
+)
+
+
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(" ")
+
+
+def _convert_timestamp(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+
+
+@lru_cache(maxsize=256)
+def translate(sql: str) -> Optional[str]:
+    """Rewrite an Oracle statement into SQLite, or None if it is a no-op here."""
+    stripped = sql.strip()
+    if re.match(r"ALTER\s+SESSION", stripped, re.I):
+        return None
+
+    ddl = _PLSQL_DDL.search(stripped)
+    if ddl:
+        stripped = ddl.group("ddl").replace("''", "'")
+
+    merge = _MERGE.search(stripped)
+    if merge:
+        stripped = (
+            f"INSERT OR IGNORE INTO {merge.group('table')} ({merge.group('cols')}) "
+            f"SELECT {merge.group('cols')} FROM ({merge.group('select')})"
+        )
+
+    # SQLite names the schema on the index only: CREATE INDEX s.ix ON table (...)
+    stripped = re.sub(r"^CREATE\s+INDEX\s+([\w.]+)\s+ON\s+\w+\.(\w+)", r"CREATE INDEX IF NOT EXISTS \1 ON \2", stripped, flags=re.I)
+
+    if re.match(r"CREATE\s+TABLE", stripped, re.I):
+        for pattern, repl in _DDL_TYPES:
+            stripped = pattern.sub(repl, stripped)
+
+    for pattern, repl in _REWRITES:
+        stripped = pattern.sub(repl, stripped)
+    return stripped
+
+
+class LocalCursor:
+    """Cursor exposing the subset of the oracledb cursor API used in the repo."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._cur = conn.cursor()
+        self.arraysize = 100
+
+    def __enter__(self) -> "LocalCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self._cur)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def execute(self, statement: str, parameters: Any = None) -> "LocalCursor":
+        sql = translate(statement)
+        if sql is not None:
+            self._cur.execute(sql, parameters or ())
+        return self
+
+    def executemany(self, statement: str, parameters: Sequence[Any]) -> None:
+        sql = translate(statement)
+        if sql is not None:
+            self._cur.executemany(sql, parameters)
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._cur.fetchone()
+
+    def fetchmany(self, size: Optional[int] = None) -> list[tuple]:
+        return self._cur.fetchmany(size or self.arraysize)
+
+    def fetchall(self) -> list[tuple]:
+        return self._cur.fetchall()
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class LocalConnection:
+    """Connection over an in-memory SQLite database with both schemas attached."""
+
+    def __init__(self, root: Path | str) -> None:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            ":memory:",
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        for schema in SCHEMAS:
+            self._conn.execute("ATTACH DATABASE ? AS " + schema, (str(root / f"{schema}.db"),))
+            self._conn.execute(f"PRAGMA {schema}.journal_mode = WAL")
+
+    def __enter__(self) -> "LocalConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def cursor(self) -> LocalCursor:
+        return LocalCursor(self._conn)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def connect_local(root: Path | str) -> LocalConnection:
+    """Open a stand-in connection rooted at `root`, creating the schemas if needed."""
+    conn = LocalConnection(root)
+    cur = conn.cursor()
+    for ddl in LOCAL_DDL:
+        cur.execute(ddl)
+    conn.commit()
+    return conn
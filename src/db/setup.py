@@ -4,13 +4,9 @@ from __future__ import annotations
 import os
 from typing import Optional
 
-import oracledb
-from src.db import get_connection
+from src.db import get_connection, init_client
 from src.constants import env
 
-# Initialize Oracle thin mode
-oracledb.init_oracle_client(lib_dir=None)
-
 
 def create_schema(cur) -> None:
     """Create the TELEGRAM_RAW schema with necessary privileges."""
@@ -73,6 +69,132 @@ def create_tables(conn) -> None:
                 )
             """)
             
+            # Create near-duplicate clusters table (written by src.dedup)
+            cur.execute("""
+                CREATE TABLE telegram_raw.message_clusters (
+                    channel_slug    VARCHAR2(100),
+                    message_id      NUMBER,
+                    message_ts      TIMESTAMP,
+                    cluster_slug    VARCHAR2(100),
+                    cluster_id      NUMBER,
+                    minhash         RAW(512),
+                    PRIMARY KEY (channel_slug, message_id)
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX telegram_raw.message_clusters_ts_ix
+                ON telegram_raw.message_clusters (message_ts)
+            """)
+            
+            # Create detection aggregates (maintained by src.image.analytics)
+            cur.execute("""
+                CREATE TABLE telegram_raw.detection_class_daily (
+                    channel_slug     VARCHAR2(100),
+                    detection_date   DATE,
+                    class_id         NUMBER,
+                    class_name       VARCHAR2(100),
+                    detection_count  NUMBER,
+                    confidence_sum   NUMBER,
+                    image_count      NUMBER,
+                    PRIMARY KEY (channel_slug, detection_date, class_id)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE telegram_raw.detection_daily (
+                    channel_slug            VARCHAR2(100),
+                    detection_date          DATE,
+                    images_processed        NUMBER,
+                    images_with_detections  NUMBER,
+                    detection_count         NUMBER,
+                    PRIMARY KEY (channel_slug, detection_date)
+                )
+            """)
+            
+            # Create product mentions table (written by src.mentions)
+            cur.execute("""
+                CREATE TABLE telegram_raw.product_mentions (
+                    message_id       NUMBER,
+                    channel_slug     VARCHAR2(100),
+                    product_name     VARCHAR2(200),
+                    confidence_score NUMBER(5,4),
+                    match_type       VARCHAR2(10),
+                    created_at       TIMESTAMP DEFAULT SYSTIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX telegram_raw.product_mentions_message_ix
+                ON telegram_raw.product_mentions (message_id, channel_slug)
+            """)
+            
+            # Create sentiment score tables (written by src.sentiment)
+            cur.execute("""
+                CREATE TABLE telegram_raw.sentiment_cache (
+                    content_hash     VARCHAR2(32) PRIMARY KEY,
+                    sentiment_score  NUMBER(5,4),
+                    confidence_score NUMBER(5,4)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE telegram_raw.message_sentiment (
+                    channel_slug     VARCHAR2(100),
+                    message_id       NUMBER,
+                    content_hash     VARCHAR2(32),
+                    sentiment_score  NUMBER(5,4),
+                    confidence_score NUMBER(5,4),
+                    scored_at        TIMESTAMP DEFAULT SYSTIMESTAMP,
+                    PRIMARY KEY (channel_slug, message_id)
+                )
+            """)
+            
+            # Create pre-bucketed activity rollups (refreshed by src.activity.build_buckets)
+            for table in ("channel_activity_hourly", "channel_activity_daily"):
+                cur.execute(f"""
+                    CREATE TABLE telegram_mart.{table} (
+                        channel_id       NUMBER,
+                        bucket_ts        DATE,
+                        message_count    NUMBER,
+                        text_count       NUMBER,
+                        text_length_sum  NUMBER,
+                        image_count      NUMBER,
+                        video_count      NUMBER,
+                        PRIMARY KEY (channel_id, bucket_ts)
+                    )
+                """)
+            
+            # Create scraping work queue (leased by src.scraper.work_queue workers)
+            cur.execute("""
+                CREATE TABLE telegram_raw.scrape_queue (
+                    channel_slug        VARCHAR2(100) PRIMARY KEY,
+                    channel             VARCHAR2(200),
+                    next_run_at         TIMESTAMP,
+                    lease_owner         VARCHAR2(200),
+                    lease_expires_at    TIMESTAMP,
+                    lease_version       NUMBER DEFAULT 0,
+                    attempts            NUMBER DEFAULT 0,
+                    last_run_at         TIMESTAMP,
+                    last_message_count  NUMBER,
+                    last_error          VARCHAR2(1000)
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX telegram_raw.scrape_queue_due_ix
+                ON telegram_raw.scrape_queue (next_run_at)
+            """)
+            cur.execute("""
+                CREATE TABLE telegram_raw.scrape_lake (
+                    lake_id             VARCHAR2(36),
+                    registered_at       TIMESTAMP
+                )
+            """)
+            
+            # Create data version watermark table (drives API ETags)
+            cur.execute("""
+                CREATE TABLE telegram_raw.data_version (
+                    source          VARCHAR2(30) PRIMARY KEY,
+                    loaded_at       TIMESTAMP
+                )
+            """)
+            
             print("Tables created successfully")
             
         except Exception as e:
@@ -86,6 +208,7 @@ def setup_database() -> None:
     """Setup the database schema and tables."""
     print("Setting up database...")
     
+    oracledb = init_client()
     try:
         # First connect as SYSTEM
         system_conn = oracledb.connect(
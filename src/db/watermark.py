@@ -0,0 +1,41 @@
+"""Data-version watermark used for HTTP cache validation.
+
+Every stage that changes what the API serves (raw load, dbt build) records the
+time it finished in `TELEGRAM_RAW.DATA_VERSION`, one row per source. The API
+derives ETag / Last-Modified from the latest of those timestamps, so cached
+responses stay valid until the next pipeline run.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+
+def bump_watermark(cur, source: str, loaded_at: Optional[datetime] = None) -> datetime:
+    """Record that `source` finished loading (UTC, now by default). Caller commits.
+
+    Plain DML only, so the bump joins the caller's transaction: DDL here would
+    commit the caller's pending writes on Oracle. `src/db/setup.py` creates the
+    table.
+    """
+    loaded_at = loaded_at or datetime.utcnow()
+    cur.execute(
+        "UPDATE telegram_raw.data_version SET loaded_at = :loaded_at WHERE source = :source",
+        {"loaded_at": loaded_at, "source": source},
+    )
+    if cur.rowcount == 0:
+        cur.execute(
+            "INSERT INTO telegram_raw.data_version (source, loaded_at) VALUES (:source, :loaded_at)",
+            {"loaded_at": loaded_at, "source": source},
+        )
+    return loaded_at
+
+
+def read_watermark(cur) -> Optional[datetime]:
+    """Latest load time across all sources, or None if nothing was recorded."""
+    cur.execute("SELECT MAX(loaded_at) FROM telegram_raw.data_version")
+    row = cur.fetchone()
+    value = row[0] if row else None
+    if isinstance(value, str):  # SQLite stand-in returns aggregates as text
+        value = datetime.fromisoformat(value)
+    return value
@@ -1,59 +1,51 @@
 """Image processing and object detection utilities.
 
 This module provides tools for:
-1. Downloading images from Telegram messages
+1. Downloading images from Telegram messages (see `src.image.downloader`)
 2. Running YOLOv8 object detection
-3. Storing detection results in Oracle
+3. Storing detection results and their daily aggregates in Oracle (see `src.image.analytics`)
 """
 from __future__ import annotations
 
-import os
+import asyncio
+import json
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
-import torch
-from PIL import Image
-from ultralytics import YOLO
-
-from src.constants import env
 from src.db import get_connection
-from src.utils.file_io import ensure_parent
+from src.image.analytics import ensure_detection_tables, record_enrichment, write_detections
+from src.image.downloader import MediaCache, download_photos
 
 
 class ImageProcessor:
     """Handles image downloading, processing, and detection."""
     
-    def __init__(self, model_name: str = "yolov8n.pt"):
-        """Initialize YOLO model and set up directories.
+    def __init__(self, model_name: str = "yolov8n.pt", cache: Optional[MediaCache] = None):
+        """Initialize YOLO model and the photo cache.
         
         Args:
             model_name: Name of the YOLO model to load (default: yolov8n.pt)
+            cache: Photo cache (default: `MediaCache.from_env()`)
         """
+        # ultralytics pulls in torch; import it only when a model is actually needed
+        from ultralytics import YOLO
+
         self.model = YOLO(model_name)
-        self.images_dir = Path(env.ORACLE_USER) / "images"
-        ensure_parent(self.images_dir)
+        self.cache = cache or MediaCache.from_env()
     
     def download_image(self, message: Dict[str, Any]) -> Optional[Path]:
-        """Download an image from a Telegram message if it exists.
+        """Return the cached image of a message, downloading it if needed.
+        
+        For more than a handful of messages use `download_photos`, which
+        downloads concurrently over one Telegram session.
         
         Args:
-            message: Telegram message dictionary containing photo info
+            message: Compact message record containing photo info
             
         Returns:
             Path to downloaded image or None if no image
         """
-        if "photo" not in message:
-            return None
-            
-        # Get the largest photo size
-        photo = max(message["photo"], key=lambda p: p.get("size", 0))
-        file_id = photo["file_id"]
-        
-        # TODO: Implement actual download logic using Telethon
-        # This is a placeholder - you'll need to implement the download
-        # using your Telethon client
-        
-        return None  # Placeholder
+        return asyncio.run(download_photos([message], self.cache))[0]
     
     def detect_objects(self, image_path: Path) -> List[Dict[str, Any]]:
         """Run YOLO detection on an image.
@@ -62,7 +54,7 @@ class ImageProcessor:
             image_path: Path to image file
             
         Returns:
-            List of detection results with class, confidence, etc.
+            List of detection results with class, class name, confidence, etc.
         """
         results = self.model(image_path)
         detections = []
@@ -70,8 +62,10 @@ class ImageProcessor:
         for r in results:
             boxes = r.boxes
             for box in boxes:
+                class_id = int(box.cls.item())
                 detections.append({
-                    "class": box.cls.item(),
+                    "class": class_id,
+                    "name": r.names.get(class_id),
                     "confidence": box.conf.item(),
                     "bbox": box.xyxy[0].tolist()
                 })
@@ -81,48 +75,17 @@ class ImageProcessor:
     def store_detections(self, message_id: int, detections: List[Dict[str, Any]]) -> None:
         """Store detection results in Oracle.
         
+        Replaces earlier detections of the message. Daily aggregates are
+        maintained by `process_channel_images`, which sees a whole channel-day.
+        
         Args:
             message_id: Foreign key to TELEGRAM_RAW.MESSAGES
             detections: List of detection results
         """
         with get_connection() as conn:
             cur = conn.cursor()
-            
-            # Create table if not exists
-            cur.execute("""
-                BEGIN
-                    EXECUTE IMMEDIATE 'CREATE TABLE telegram_raw.image_detections (
-                        message_id      NUMBER REFERENCES telegram_raw.messages(message_id),
-                        detection_id    NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-                        class_id        NUMBER,
-                        confidence      NUMBER(5,4),
-                        bbox_x1         NUMBER,
-                        bbox_y1         NUMBER,
-                        bbox_x2         NUMBER,
-                        bbox_y2         NUMBER,
-                        created_at      TIMESTAMP DEFAULT SYSTIMESTAMP
-                    )';
-                EXCEPTION WHEN OTHERS THEN
-                    IF SQLCODE != -955 THEN RAISE; END IF;
-                END;
-            """)
-            
-            # Insert detections
-            for det in detections:
-                cur.execute("""
-                    INSERT INTO telegram_raw.image_detections (
-                        message_id, class_id, confidence, 
-                        bbox_x1, bbox_y1, bbox_x2, bbox_y2
-                    ) VALUES (
-                        :1, :2, :3, :4, :5, :6, :7
-                    )
-                """, [
-                    message_id,
-                    det["class"],
-                    det["confidence"],
-                    *det["bbox"]
-                ])
-            
+            ensure_detection_tables(cur)
+            write_detections(cur, [(message_id, detections)])
             conn.commit()
 
 
@@ -147,13 +110,27 @@ def process_channel_images(channel_slug: str, date: str) -> None:
             AND JSON_EXISTS(payload, '$.photo')
         """, [channel_slug, date])
         
-        for message_id, payload in cur:
-            message = json.loads(payload)
-            image_path = processor.download_image(message)
-            
-            if image_path:
-                detections = processor.detect_objects(image_path)
-                processor.store_detections(message_id, detections)
-                
-                # Clean up downloaded image
-                image_path.unlink(missing_ok=True)
+        rows = [
+            (message_id, json.loads(payload.read() if hasattr(payload, "read") else payload))
+            for message_id, payload in cur
+        ]
+
+    # Downloads run concurrently into the shared cache; files are kept so re-runs
+    # and reposts skip the download, and the cache evicts by age and size
+    image_paths = asyncio.run(download_photos([message for _, message in rows], processor.cache))
+    results = [
+        (message_id, processor.detect_objects(image_path))
+        for (message_id, _), image_path in zip(rows, image_paths)
+        if image_path
+    ]
+    failed = [message_id for (message_id, _), image_path in zip(rows, image_paths) if not image_path]
+
+    # One transaction for the channel-day: detections, their aggregates and the data version
+    with get_connection() as conn:
+        cur = conn.cursor()
+        record_enrichment(cur, channel_slug, date, results, failed)
+        conn.commit()
+
+    removed, freed = processor.cache.evict()
+    if removed:
+        print(f"Evicted {removed} cached photos ({freed / 1e6:.1f} MB)")
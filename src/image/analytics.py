@@ -0,0 +1,291 @@
+"""Pre-aggregated detection facts for the report endpoints.
+
+`telegram_raw.image_detections` holds one row per bounding box. Reports only
+need totals per channel, day and class, so each enrichment run also writes:
+
+- `telegram_raw.detection_class_daily`: detections, summed confidence (mean =
+  sum / count) and images containing the class, per channel, day and class;
+- `telegram_raw.detection_daily`: images processed, images with at least one
+  detection and total detections, per channel and day.
+
+`process_channel_images` handles every photo of one channel and day, so its
+results are the complete slice. The slice is replaced (delete + insert), which
+keeps re-runs idempotent and never touches other days. Images whose download
+failed keep their earlier detections, and those count towards the slice as
+before. `rebuild` recomputes
+the tables from `image_detections` for data enriched before they existed.
+
+Usage:
+    python -m src.image.analytics --rebuild
+    python -m src.image.analytics --rebuild --date 2025-07-16 --model yolov8n.pt
+"""
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.db import get_connection
+from src.db.watermark import bump_watermark
+
+# (message_id, detections) for every image processed in a run
+ImageResult = Tuple[int, List[Dict[str, Any]]]
+
+_LOOKUP_CHUNK = 500
+
+
+def ensure_detection_tables(cur) -> None:
+    """Create the detection and aggregate tables if they do not exist."""
+    for ddl in (
+        """CREATE TABLE telegram_raw.image_detections (
+                message_id      NUMBER REFERENCES telegram_raw.messages(message_id),
+                detection_id    NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                class_id        NUMBER,
+                confidence      NUMBER(5,4),
+                bbox_x1         NUMBER,
+                bbox_y1         NUMBER,
+                bbox_x2         NUMBER,
+                bbox_y2         NUMBER,
+                created_at      TIMESTAMP DEFAULT SYSTIMESTAMP
+            )""",
+        """CREATE TABLE telegram_raw.detection_class_daily (
+                channel_slug     VARCHAR2(100),
+                detection_date   DATE,
+                class_id         NUMBER,
+                class_name       VARCHAR2(100),
+                detection_count  NUMBER,
+                confidence_sum   NUMBER,
+                image_count      NUMBER,
+                PRIMARY KEY (channel_slug, detection_date, class_id)
+            )""",
+        """CREATE TABLE telegram_raw.detection_daily (
+                channel_slug            VARCHAR2(100),
+                detection_date          DATE,
+                images_processed        NUMBER,
+                images_with_detections  NUMBER,
+                detection_count         NUMBER,
+                PRIMARY KEY (channel_slug, detection_date)
+            )""",
+    ):
+        cur.execute(f"""
+            BEGIN
+                EXECUTE IMMEDIATE '{ddl}';
+            EXCEPTION WHEN OTHERS THEN
+                IF SQLCODE != -955 THEN RAISE; END IF;
+            END;
+        """)
+
+
+def write_detections(cur, results: Sequence[ImageResult]) -> None:
+    """Replace the detections of the given images (idempotent re-runs).
+
+    Args:
+        cur: Open cursor; the caller commits
+        results: (message_id, detections) per processed image
+    """
+    if not results:
+        return
+    cur.executemany(
+        "DELETE FROM telegram_raw.image_detections WHERE message_id = :1",
+        [(message_id,) for message_id, _ in results],
+    )
+    rows = [
+        (message_id, int(det["class"]), det["confidence"], *det["bbox"])
+        for message_id, detections in results
+        for det in detections
+    ]
+    if rows:
+        cur.executemany("""
+            INSERT INTO telegram_raw.image_detections (
+                message_id, class_id, confidence,
+                bbox_x1, bbox_y1, bbox_x2, bbox_y2
+            ) VALUES (:1, :2, :3, :4, :5, :6, :7)
+        """, rows)
+
+
+def aggregate(results: Iterable[ImageResult]) -> Tuple[List[tuple], Tuple[int, int, int]]:
+    """Fold one slice of image results into aggregate rows.
+
+    Returns:
+        (class_id, class_name, detection_count, confidence_sum, image_count)
+        per class, and (images_processed, images_with_detections, detection_count)
+    """
+    counts: Dict[int, List[Any]] = defaultdict(lambda: [None, 0, 0.0, 0])
+    images = with_detections = total = 0
+    for _, detections in results:
+        images += 1
+        if detections:
+            with_detections += 1
+        total += len(detections)
+        seen = set()
+        for det in detections:
+            class_id = int(det["class"])
+            entry = counts[class_id]
+            entry[0] = det.get("name") or entry[0] or str(class_id)
+            entry[1] += 1
+            entry[2] += det["confidence"]
+            if class_id not in seen:
+                seen.add(class_id)
+                entry[3] += 1
+    per_class = [(class_id, *entry) for class_id, entry in sorted(counts.items())]
+    return per_class, (images, with_detections, total)
+
+
+def store_aggregates(cur, channel_slug: str, day: datetime, results: Sequence[ImageResult]) -> None:
+    """Replace the aggregates of one channel and day with those of `results`.
+
+    Args:
+        cur: Open cursor; the caller commits
+        channel_slug: Channel identifier
+        day: Message date (midnight)
+        results: Every image of the channel on that day, with its detections
+    """
+    per_class, totals = aggregate(results)
+    key = {"channel_slug": channel_slug, "detection_date": day}
+    cur.execute(
+        "DELETE FROM telegram_raw.detection_class_daily "
+        "WHERE channel_slug = :channel_slug AND detection_date = :detection_date",
+        key,
+    )
+    cur.execute(
+        "DELETE FROM telegram_raw.detection_daily "
+        "WHERE channel_slug = :channel_slug AND detection_date = :detection_date",
+        key,
+    )
+    if per_class:
+        cur.executemany("""
+            INSERT INTO telegram_raw.detection_class_daily (
+                channel_slug, detection_date, class_id, class_name,
+                detection_count, confidence_sum, image_count
+            ) VALUES (:1, :2, :3, :4, :5, :6, :7)
+        """, [(channel_slug, day, *row) for row in per_class])
+    cur.execute("""
+        INSERT INTO telegram_raw.detection_daily (
+            channel_slug, detection_date, images_processed, images_with_detections, detection_count
+        ) VALUES (:1, :2, :3, :4, :5)
+    """, [channel_slug, day, *totals])
+
+
+def stored_detections(cur, channel_slug: str, day: datetime, message_ids: Sequence[int]) -> List[ImageResult]:
+    """Detections already stored for the given images, named as in the channel-day's aggregates.
+
+    Images without stored detections are left out: like `rebuild`, this cannot
+    tell an image that had no detections from one never processed.
+    """
+    cur.execute(
+        "SELECT class_id, class_name FROM telegram_raw.detection_class_daily "
+        "WHERE channel_slug = :channel_slug AND detection_date = :detection_date",
+        {"channel_slug": channel_slug, "detection_date": day},
+    )
+    names = {int(class_id): name for class_id, name in cur.fetchall()}
+
+    images: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    ids = list(dict.fromkeys(message_ids))
+    for start in range(0, len(ids), _LOOKUP_CHUNK):
+        binds = {f"m{i}": message_id for i, message_id in enumerate(ids[start:start + _LOOKUP_CHUNK])}
+        cur.execute(f"""
+            SELECT message_id, class_id, confidence
+            FROM telegram_raw.image_detections
+            WHERE message_id IN ({", ".join(f":{name}" for name in binds)})
+            ORDER BY message_id, detection_id
+        """, binds)
+        for message_id, class_id, confidence in cur.fetchall():
+            images[message_id].append(
+                {"class": int(class_id), "confidence": float(confidence), "name": names.get(int(class_id))}
+            )
+    return list(images.items())
+
+
+def record_enrichment(
+    cur,
+    channel_slug: str,
+    date: str,
+    results: Sequence[ImageResult],
+    failed: Sequence[int] = (),
+) -> None:
+    """Write one channel-day of detections and its aggregates, then bump the data version.
+
+    Args:
+        cur: Open cursor; the caller commits
+        channel_slug: Channel identifier
+        date: Date in YYYY-MM-DD format
+        results: Every image of the channel on that day that was processed now, with its detections
+        failed: Message ids of the day's images that could not be downloaded; their
+            earlier detections are kept and still counted in the aggregates
+    """
+    # DDL commits implicitly on Oracle, so it runs before any write
+    ensure_detection_tables(cur)
+    day = datetime.strptime(date, "%Y-%m-%d")
+    kept = stored_detections(cur, channel_slug, day, failed) if failed else []
+    write_detections(cur, results)
+    store_aggregates(cur, channel_slug, day, [*results, *kept])
+    bump_watermark(cur, "detections")
+
+
+def rebuild(cur, date: Optional[str] = None, class_names: Optional[Dict[int, str]] = None) -> int:
+    """Recompute the aggregate tables from `image_detections`.
+
+    Images without detections leave no row in `image_detections`, so for
+    rebuilt days `images_processed` equals `images_with_detections`.
+
+    Args:
+        cur: Open cursor; the caller commits
+        date: Only this day (YYYY-MM-DD); all days when None
+        class_names: Class id -> name (default: the id as text)
+
+    Returns:
+        Number of channel-days rebuilt
+    """
+    ensure_detection_tables(cur)
+    where, params = "", {}
+    if date:
+        where = "WHERE TRUNC(m.message_ts) = TO_DATE(:day, 'YYYY-MM-DD')"
+        params = {"day": date}
+    cur.execute(f"""
+        SELECT m.channel_slug, TRUNC(m.message_ts), d.message_id, d.class_id, d.confidence
+        FROM telegram_raw.image_detections d
+        JOIN telegram_raw.messages m ON m.message_id = d.message_id
+        {where}
+        ORDER BY m.channel_slug, TRUNC(m.message_ts), d.message_id
+    """, params)
+
+    slices: Dict[Tuple[str, Any], Dict[int, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+    for channel_slug, day, message_id, class_id, confidence in cur.fetchall():
+        if isinstance(day, str):  # SQLite stand-in
+            day = datetime.fromisoformat(day)
+        name = (class_names or {}).get(int(class_id))
+        slices[(channel_slug, day)][message_id].append(
+            {"class": class_id, "confidence": float(confidence), "name": name}
+        )
+    for (channel_slug, day), images in slices.items():
+        store_aggregates(cur, channel_slug, day, list(images.items()))
+    if slices:
+        bump_watermark(cur, "detections")
+    return len(slices)
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Maintain pre-aggregated detection tables")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute aggregates from image_detections")
+    parser.add_argument("--date", help="Only rebuild this date (YYYY-MM-DD)")
+    parser.add_argument("--model", help="YOLO model whose class names label the classes")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do (use --rebuild)")
+
+    class_names = None
+    if args.model:
+        from ultralytics import YOLO
+
+        class_names = dict(YOLO(args.model).names)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        days = rebuild(cur, args.date, class_names)
+        conn.commit()
+    print(f"Rebuilt detection aggregates for {days} channel-days")
+
+
+if __name__ == "__main__":
+    main()
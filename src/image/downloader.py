@@ -0,0 +1,381 @@
+"""Concurrent Telegram photo downloads with a content-addressed disk cache.
+
+This module provides:
+1. `PhotoRef`, the download reference stored in compact message records
+2. Size selection: the smallest rendition that covers the detector input size
+3. `MediaCache`, an on-disk cache keyed by Telegram photo id and rendition,
+   evicted by age and total size (least recently used first)
+4. `MediaDownloader`, which fetches many photos concurrently under a
+   concurrency cap and a token-bucket rate limit, downloading each photo once
+   per batch even when several messages repost it
+5. `TelethonMediaClient`, the adapter onto a Telethon client; anything with an
+   async `download_photo(ref, size_type)` method can stand in for it in tests
+
+Telegram photo ids identify the stored file, not the message, so reposts and
+forwards of the same picture hit the cache.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from src.constants import env
+
+# YOLOv8 letterboxes to 640 px; larger renditions only cost bandwidth
+DEFAULT_TARGET_PX = 640
+
+
+@dataclass(frozen=True)
+class PhotoRef:
+    """Everything needed to download one photo of one message."""
+
+    photo_id: int
+    access_hash: int
+    file_reference: bytes
+    dc_id: int
+    sizes: Tuple[Tuple[str, int, int, int], ...]  # (type, w, h, bytes)
+    channel_id: Optional[int] = None
+    message_id: Optional[int] = None
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> Optional["PhotoRef"]:
+        """Build from a compact message record (`src.scraper.records`); None if it has no photo."""
+        photo = message.get("photo")
+        if not isinstance(photo, dict) or photo.get("id") is None:
+            return None
+        try:
+            file_reference = bytes.fromhex(photo.get("file_reference") or "")
+        except ValueError:
+            # Pre-projection payloads hold an unusable repr; the client refreshes it
+            file_reference = b""
+        return cls(
+            photo_id=int(photo["id"]),
+            access_hash=int(photo.get("access_hash") or 0),
+            file_reference=file_reference,
+            dc_id=int(photo.get("dc_id") or 0),
+            sizes=tuple((s["type"], s.get("w") or 0, s.get("h") or 0, s.get("size") or 0) for s in photo.get("sizes") or ()),
+            channel_id=message.get("channel_id"),
+            message_id=message.get("id"),
+        )
+
+
+def choose_size(sizes: Sequence[Tuple[str, int, int, int]], target_px: int = DEFAULT_TARGET_PX) -> Optional[str]:
+    """Pick the smallest rendition whose longer side covers `target_px`, else the largest.
+
+    Args:
+        sizes: (type, w, h, bytes) renditions of one photo
+        target_px: Longer side the consumer needs (detector input size)
+
+    Returns:
+        The rendition type letter, or None if there are no downloadable sizes
+    """
+    if not sizes:
+        return None
+    by_side = sorted(sizes, key=lambda s: (max(s[1], s[2]), s[3]))
+    for size_type, w, h, _ in by_side:
+        if max(w, h) >= target_px:
+            return size_type
+    return by_side[-1][0]
+
+
+class MediaClient(Protocol):
+    async def download_photo(self, ref: PhotoRef, size_type: str) -> bytes: ...
+
+
+class MediaCache:
+    """Photo files on disk, addressed by Telegram photo id and rendition."""
+
+    def __init__(self, root: Path, max_bytes: int, max_age_seconds: float) -> None:
+        """Set up the cache directory.
+
+        Args:
+            root: Cache directory
+            max_bytes: Total size `evict()` trims the cache down to
+            max_age_seconds: Files unused for longer are evicted
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "MediaCache":
+        return cls(
+            Path(env.MEDIA_CACHE_DIR),
+            max_bytes=env.MEDIA_CACHE_MAX_MB * 1024 * 1024,
+            max_age_seconds=env.MEDIA_CACHE_MAX_AGE_DAYS * 86400,
+        )
+
+    def path(self, photo_id: int, size_type: str) -> Path:
+        # Two-level fan-out keeps directories small on large caches
+        return self.root / f"{photo_id % 256:02x}" / f"{photo_id}_{size_type}.jpg"
+
+    def get(self, photo_id: int, size_type: str) -> Optional[Path]:
+        """Return the cached file and mark it as recently used, or None."""
+        path = self.path(photo_id, size_type)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, photo_id: int, size_type: str, data: bytes) -> Path:
+        """Store a downloaded file atomically."""
+        path = self.path(photo_id, size_type)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        return path
+
+    def evict(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """Delete files older than `max_age_seconds`, then least recently used ones above `max_bytes`.
+
+        Returns:
+            (files removed, bytes freed)
+        """
+        now = time.time() if now is None else now
+        entries = []
+        for path in self.root.glob("*/*.jpg"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+
+def cached_photo(cache: MediaCache, message: Dict[str, Any], target_px: int = DEFAULT_TARGET_PX) -> Optional[Path]:
+    """Cached file of a message's photo at the size `MediaDownloader` would pick, or None."""
+    ref = PhotoRef.from_message(message)
+    size_type = choose_size(ref.sizes, target_px) if ref is not None else None
+    return cache.get(ref.photo_id, size_type) if size_type is not None else None
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class DownloadStats:
+    cached: int = 0
+    downloaded: int = 0
+    failed: int = 0
+    bytes: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class MediaDownloader:
+    """Downloads message photos concurrently into a `MediaCache`."""
+
+    def __init__(
+        self,
+        client: MediaClient,
+        cache: MediaCache,
+        concurrency: int = 8,
+        rate: float = 10.0,
+        target_px: int = DEFAULT_TARGET_PX,
+    ) -> None:
+        """Configure the downloader.
+
+        Args:
+            client: Object with an async `download_photo(ref, size_type) -> bytes`
+            cache: Where files are stored and looked up
+            concurrency: Maximum downloads in flight
+            rate: Maximum download starts per second (0 disables the limit)
+            target_px: Passed to `choose_size`
+        """
+        self.client = client
+        self.cache = cache
+        self.target_px = target_px
+        self.stats = DownloadStats()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._limiter = RateLimiter(rate, burst=concurrency)
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    async def fetch(self, message: Dict[str, Any]) -> Optional[Path]:
+        """Return the local path of a message's photo, downloading it if needed.
+
+        Returns:
+            Path to the cached file, or None if the message has no photo or the download failed
+        """
+        ref = PhotoRef.from_message(message)
+        if ref is None:
+            return None
+        size_type = choose_size(ref.sizes, self.target_px)
+        if size_type is None:
+            return None
+
+        cached = self.cache.get(ref.photo_id, size_type)
+        if cached is not None:
+            self.stats.cached += 1
+            return cached
+
+        key = (ref.photo_id, size_type)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(ref, size_type))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats.cached += 1
+        return await asyncio.shield(task)
+
+    async def _download(self, ref: PhotoRef, size_type: str) -> Optional[Path]:
+        async with self._semaphore:
+            await self._limiter.acquire()
+            try:
+                data = await self.client.download_photo(ref, size_type)
+            except Exception as e:
+                self.stats.failed += 1
+                self.stats.errors.append(f"photo {ref.photo_id} (message {ref.message_id}): {e}")
+                return None
+        self.stats.downloaded += 1
+        self.stats.bytes += len(data)
+        return self.cache.put(ref.photo_id, size_type, data)
+
+    async def fetch_many(self, messages: Iterable[Dict[str, Any]]) -> List[Optional[Path]]:
+        """`fetch` every message concurrently; results are in input order."""
+        return list(await asyncio.gather(*(self.fetch(m) for m in messages)))
+
+
+class TelethonMediaClient:
+    """`MediaClient` over a connected Telethon `TelegramClient`."""
+
+    def __init__(self, client, max_flood_wait: int = 300) -> None:
+        """Wrap a started client.
+
+        Args:
+            client: Connected `telethon.TelegramClient`
+            max_flood_wait: Longest FLOOD_WAIT (seconds) to sleep through before giving up
+        """
+        self.client = client
+        self.max_flood_wait = max_flood_wait
+
+    async def download_photo(self, ref: PhotoRef, size_type: str) -> bytes:
+        from telethon import errors
+        from telethon.tl import types
+
+        for _ in range(3):
+            location = types.InputPhotoFileLocation(
+                id=ref.photo_id,
+                access_hash=ref.access_hash,
+                file_reference=ref.file_reference,
+                thumb_size=size_type,
+            )
+            try:
+                return await self.client.download_file(location, bytes, dc_id=ref.dc_id or None)
+            except errors.FloodWaitError as e:
+                if e.seconds > self.max_flood_wait:
+                    raise
+                await asyncio.sleep(e.seconds)
+            except (errors.FileReferenceExpiredError, errors.FileReferenceInvalidError):
+                ref = await self._refresh(ref)
+        raise RuntimeError(f"Giving up on photo {ref.photo_id} after repeated retries")
+
+    async def _refresh(self, ref: PhotoRef) -> PhotoRef:
+        """Re-read the message to get a fresh file reference (they expire)."""
+        from telethon.tl import types
+
+        from src.scraper.records import MessageRecord
+
+        if ref.channel_id is None or ref.message_id is None:
+            raise RuntimeError(f"File reference of photo {ref.photo_id} expired and its message is unknown")
+        msg = await self.client.get_messages(types.PeerChannel(ref.channel_id), ids=ref.message_id)
+        fresh = PhotoRef.from_message(MessageRecord.from_message(msg).to_dict()) if msg else None
+        if fresh is None:
+            raise RuntimeError(f"Message {ref.message_id} no longer has photo {ref.photo_id}")
+        return fresh
+
+
+async def download_photos(messages: Sequence[Dict[str, Any]], cache: Optional[MediaCache] = None) -> List[Optional[Path]]:
+    """Download the photos of compact message records with the configured Telegram session.
+
+    Args:
+        messages: Compact message records (payloads of TELEGRAM_RAW.MESSAGES)
+        cache: Cache to use (default: `MediaCache.from_env()`)
+
+    Returns:
+        Local path per message, None where there is no photo or the download failed
+    """
+    from telethon import TelegramClient
+
+    from src.config import get_settings
+
+    cache = cache or MediaCache.from_env()
+    cached = [cached_photo(cache, m) for m in messages]
+    if all(path is not None or PhotoRef.from_message(m) is None for m, path in zip(messages, cached)):
+        return cached  # nothing to download: skip the Telegram login
+
+    settings = get_settings()
+    client = TelegramClient(settings.session_name, settings.api_id, settings.api_hash)
+    await client.start()
+    try:
+        downloader = MediaDownloader(
+            TelethonMediaClient(client),
+            cache,
+            concurrency=env.MEDIA_DOWNLOAD_CONCURRENCY,
+            rate=env.MEDIA_DOWNLOAD_RATE,
+        )
+        paths = await downloader.fetch_many(messages)
+    finally:
+        await client.disconnect()
+    stats = downloader.stats
+    print(f"Photos: {stats.downloaded} downloaded ({stats.bytes / 1e6:.1f} MB), {stats.cached} cached, {stats.failed} failed")
+    for error in stats.errors[:10]:
+        print(f"[WARN] {error}")
+    return paths
+
+
+def main() -> None:  # pragma: no cover
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Telegram photo cache maintenance")
+    parser.add_argument("--evict", action="store_true", help="Evict by MEDIA_CACHE_MAX_AGE_DAYS / MEDIA_CACHE_MAX_MB")
+    args = parser.parse_args()
+
+    cache = MediaCache.from_env()
+    if args.evict:
+        removed, freed = cache.evict()
+        print(f"Evicted {removed} files ({freed / 1e6:.1f} MB) from {cache.root}")
+    files = list(cache.root.glob("*/*.jpg"))
+    print(f"{cache.root}: {len(files)} files, {sum(p.stat().st_size for p in files) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ import argparse
 from datetime import datetime
 from typing import Optional
 
+from src.db import get_connection
 from src.image import process_channel_images
 
 
@@ -3,12 +3,26 @@
 Usage:
     python -m src.loaders.load_raw_to_oracle --date 2025-07-13
     python -m src.loaders.load_raw_to_oracle --path data/raw/telegram_messages/2025-07-13
+    python -m src.loaders.load_raw_to_oracle --date 2025-07-13 --extract-mentions
+    python -m src.loaders.load_raw_to_oracle --date 2025-07-13 --keep-raw
+    python -m src.loaders.load_raw_to_oracle --date 2025-07-13 --dedup --extract-mentions
+    python -m src.loaders.load_raw_to_oracle --date 2025-07-13 --dedup --index-similar
 
 The script performs the following:
 1. Recursively walks the provided path (or date partition) for `*.json` files.
 2. Creates a RAW table (`TELEGRAM_RAW.MESSAGES`) if it does not already exist.
 3. Inserts each message as a JSON column with metadata (channel, message_ts).
+   Full Telethon trees are projected to compact records first; `--keep-raw`
+   keeps the full tree under `raw`.
 4. Uses a MERGE statement to avoid duplicate message IDs.
+5. Bumps the `raw` data-version watermark so API caches revalidate.
+6. Optionally (`--dedup`) clusters near-duplicate messages with MinHash LSH and
+   stores each message's cluster in `TELEGRAM_RAW.MESSAGE_CLUSTERS`.
+7. Optionally (`--extract-mentions`) extracts product mentions per file and
+   adds them to the trending-products snapshot (`TRENDING_SNAPSHOT`). With
+   `--dedup`, only the first message of each cluster is extracted.
+8. Optionally (`--index-similar`) adds message vectors to the similar-message
+   index (`SIMILAR_INDEX`), again skipping near-duplicates with `--dedup`.
 
 It is idempotent and safe to re-run.
 """
@@ -16,6 +30,7 @@ from __future__ import annotations
 
 import argparse
 import json
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Iterable
@@ -24,6 +39,10 @@ from tqdm import tqdm
 
 from src.constants import env  # Oracle connection details
 from src.db import get_connection
+from src.db.watermark import bump_watermark
+from src.mentions import MentionExtractor, ensure_mentions_table, store_mentions
+from src.scraper.records import compact_payload
+from src.trending import mention_events, update_snapshot
 
 DATA_ROOT = Path("data/raw/telegram_messages")
 
@@ -72,7 +91,62 @@ def upsert_messages(cur, rows: list[tuple]):
     )
 
 
-def main(date: str | None, path: str | None):
+def load_file(
+    cur,
+    fp: Path,
+    extractor=None,
+    keep_raw: bool = False,
+    trending=None,
+    dedup=None,
+    similar=None,
+) -> int:
+    """Upsert every message of one channel JSON file; returns the row count.
+
+    If a `DedupStage` is given, the messages are clustered with earlier ones.
+    If a `MentionExtractor` is given, product mentions for the file are
+    extracted and stored in the same transaction, and counted in the
+    `TrendingStore` if one is given. If a `SimilarIndex` is given, the
+    messages are added to it. Near-duplicates of an earlier message are
+    neither extracted nor indexed.
+    """
+    messages = load_messages(fp)
+    rows: list[tuple] = []
+    channel_slug = fp.stem
+    for msg in messages:
+        payload = compact_payload(msg, keep_raw)
+        rows.append(
+            (
+                payload.get("id"),
+                channel_slug,
+                datetime.fromisoformat(payload.get("date")),
+                json.dumps(payload, ensure_ascii=False, default=str),
+            )
+        )
+    upsert_messages(cur, rows)
+    batch = [(mid, slug, msg.get("message"), ts) for (mid, slug, ts, _), msg in zip(rows, messages)]
+    clusters = {}
+    if dedup is not None:
+        clusters = dedup.process([(mid, slug, ts, text) for mid, slug, text, ts in batch])
+    # Clusters are keyed by (channel_slug, message_id); unclustered messages stand for themselves
+    originals = [m for m in batch if clusters.get((m[1], m[0]), (m[1], m[0])) == (m[1], m[0])]
+    if similar is not None:
+        similar.add([(slug, mid, text) for mid, slug, text, _ in originals])
+    if extractor is not None:
+        mentions = extractor.extract_batch(originals)
+        store_mentions(cur, [(mid, slug) for mid, slug, *_ in batch], mentions)
+        if trending is not None:
+            trending.add_mentions(mention_events(originals, mentions))
+    return len(rows)
+
+
+def main(
+    date: str | None,
+    path: str | None,
+    extract_mentions: bool = False,
+    keep_raw: bool = False,
+    dedup: bool = False,
+    index_similar: bool = False,
+):
     if path:
         base = Path(path)
     elif date:
@@ -83,33 +157,48 @@ def main(date: str | None, path: str | None):
     if not base.exists():
         raise FileNotFoundError(base)
 
-    with get_connection() as conn:
+    snapshot = update_snapshot(Path(env.TRENDING_SNAPSHOT)) if extract_mentions else nullcontext()
+    if index_similar:
+        # numpy/scipy are only needed for message vectors
+        from src.similar import update_index
+
+        similar_index = update_index(Path(env.SIMILAR_INDEX))
+    else:
+        similar_index = nullcontext()
+    with get_connection() as conn, snapshot as trending, similar_index as similar:
         cur = conn.cursor()
         ensure_table(cur)
 
+        stage = None
+        if dedup:
+            # numpy is only needed for MinHash signatures
+            from src.dedup import DedupStage
+
+            stage = DedupStage(cur, env.DEDUP_WINDOW_DAYS, env.DEDUP_THRESHOLD)
+
+        extractor = None
+        if extract_mentions:
+            extractor = MentionExtractor.from_csv()
+            ensure_mentions_table(cur)
+
         files = list(iter_message_files(base))
         pbar = tqdm(files, desc="Loading files")
         for fp in pbar:
-            messages = load_messages(fp)
-            rows: list[tuple] = []
-            channel_slug = fp.stem
-            for msg in messages:
-                rows.append(
-                    (
-                        msg.get("id"),
-                        channel_slug,
-                        datetime.fromisoformat(msg.get("date")),
-                        json.dumps(msg, ensure_ascii=False),
-                    )
-                )
-            upsert_messages(cur, rows)
+            inserted = load_file(cur, fp, extractor, keep_raw, trending, stage, similar)
             conn.commit()
-            pbar.set_postfix(inserted=len(rows))
+            pbar.set_postfix(inserted=inserted)
+
+        bump_watermark(cur, "raw")
+        conn.commit()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Load raw Telegram JSON into Oracle.")
     parser.add_argument("--date", help="Partition date YYYY-MM-DD to load")
     parser.add_argument("--path", help="Custom path to folder containing channel JSON files")
+    parser.add_argument("--extract-mentions", action="store_true", help="Also extract product mentions")
+    parser.add_argument("--keep-raw", action="store_true", help="Keep the full Telethon message tree in the payload")
+    parser.add_argument("--dedup", action="store_true", help="Cluster near-duplicate messages")
+    parser.add_argument("--index-similar", action="store_true", help="Add messages to the similar-message index")
     args = parser.parse_args()
-    main(args.date, args.path)
+    main(args.date, args.path, args.extract_mentions, args.keep_raw, args.dedup, args.index_similar)
@@ -0,0 +1,337 @@
+"""Product mention extraction from Telegram message text.
+
+This module provides:
+1. Amharic/English text normalisation (NFKC, case folding, Ethiopic homophone folding)
+2. A token-level Aho-Corasick automaton compiled from a product catalogue
+3. Edit-distance-1 correction of misspelled tokens before they enter the automaton
+4. Batch extraction and bulk storage of mentions in Oracle
+
+The automaton walks one normalised word at a time, so every catalogue name and
+alias is matched in a single pass over the message regardless of catalogue size,
+and matches always fall on word boundaries. Misspelled words are corrected
+against the catalogue vocabulary with a symmetric-delete index, which lets
+multi-word names match fuzzily too ("vitamen c" -> "Vitamin C").
+"""
+from __future__ import annotations
+
+import csv
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_CATALOGUE = Path(__file__).with_name("products.csv")
+
+EXACT_CONFIDENCE = 1.0
+ALIAS_CONFIDENCE = 0.95
+FUZZY_PENALTY = 0.9
+
+_TOKEN = re.compile(r"\w+")
+
+# Ethiopic letters that are pronounced identically and used interchangeably in
+# Amharic spelling; every vowel order of the series folds onto the first one.
+_ETHIOPIC_FOLD: Dict[int, int] = {}
+for _src, _dst in ((0x1210, 0x1200), (0x1280, 0x1200), (0x1220, 0x1230), (0x12D0, 0x12A0), (0x1340, 0x1338)):
+    for _order in range(8):
+        _ETHIOPIC_FOLD[_src + _order] = _dst + _order
+
+
+def normalize_token(token: str) -> str:
+    """NFKC-normalise and fold Ethiopic homophones in an already case-folded word."""
+    return unicodedata.normalize("NFKC", token).translate(_ETHIOPIC_FOLD)
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Split text into normalised word tokens."""
+    return [normalize_token(t) for t in _TOKEN.findall(text.casefold())]
+
+
+def _deletes(token: str) -> Iterator[str]:
+    for i in range(len(token)):
+        yield token[:i] + token[i + 1:]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:] or (
+            i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        )
+    return a[i + 1:] == b[i:] if la > lb else a[i:] == b[i + 1:]
+
+
+@dataclass(frozen=True)
+class Mention:
+    """A product found in a message."""
+
+    product_name: str
+    confidence: float
+    matched: str
+    fuzzy: bool
+
+
+class _TokenAutomaton:
+    """Aho-Corasick automaton whose alphabet is normalised words."""
+
+    def __init__(self) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, Any]]] = [[]]
+
+    def add(self, tokens: Sequence[str], payload: Any) -> None:
+        node = 0
+        for token in tokens:
+            nxt = self.goto[node].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(tokens), payload))
+
+    def build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and token not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(token, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def iter_matches(self, tokens: Sequence[str]) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) token spans for every pattern occurrence."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length, payload in out[state]:
+                yield i - length + 1, i + 1, payload
+
+
+class MentionExtractor:
+    """Finds catalogue products in message text."""
+
+    def __init__(
+        self,
+        catalogue: Dict[str, Iterable[str]],
+        fuzzy: bool = True,
+        min_fuzzy_length: int = 5,
+    ):
+        """Compile the automaton and the fuzzy index.
+
+        Args:
+            catalogue: Mapping of canonical product name to its aliases
+            fuzzy: Correct misspelled words (edit distance 1) before matching
+            min_fuzzy_length: Shortest word eligible for correction
+        """
+        self.fuzzy = fuzzy
+        self.min_fuzzy_length = min_fuzzy_length
+        self.automaton = _TokenAutomaton()
+        self.vocabulary: set[str] = set()
+        self._delete_index: Dict[str, List[str]] = {}
+        # raw case-folded word -> (canonical word, corrected?); message vocabularies
+        # are small, so normalisation and correction run once per distinct word
+        self._token_cache: Dict[str, Tuple[str, bool]] = {}
+
+        for product, aliases in catalogue.items():
+            for surface, confidence in [(product, EXACT_CONFIDENCE)] + [(a, ALIAS_CONFIDENCE) for a in aliases]:
+                tokens = normalize_tokens(surface)
+                if not tokens:
+                    continue
+                self.automaton.add(tokens, (product, confidence))
+                self.vocabulary.update(tokens)
+        self.automaton.build()
+
+        for word in self.vocabulary:
+            if len(word) >= min_fuzzy_length:
+                for variant in _deletes(word):
+                    self._delete_index.setdefault(variant, []).append(word)
+
+    @classmethod
+    def from_csv(cls, path: Path = DEFAULT_CATALOGUE, **kwargs) -> "MentionExtractor":
+        """Load a catalogue CSV with `product_name` and `|`-separated `aliases` columns."""
+        catalogue: Dict[str, List[str]] = {}
+        with Path(path).open("r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                aliases = [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+                catalogue.setdefault(row["product_name"].strip(), []).extend(aliases)
+        return cls(catalogue, **kwargs)
+
+    def _correct(self, token: str) -> Optional[str]:
+        """Closest vocabulary word within one edit, or None."""
+        if len(token) < self.min_fuzzy_length:
+            return None
+        candidates = list(self._delete_index.get(token, ()))
+        for variant in _deletes(token):
+            if variant in self.vocabulary:
+                candidates.append(variant)
+            candidates.extend(self._delete_index.get(variant, ()))
+        for word in sorted(set(candidates)):
+            if _within_one_edit(token, word):
+                return word
+        return None
+
+    def _canonical(self, raw: str) -> Tuple[str, bool]:
+        token = normalize_token(raw)
+        if self.fuzzy and token not in self.vocabulary:
+            fixed = self._correct(token)
+            if fixed is not None:
+                return fixed, True
+        return token, False
+
+    def extract(self, text: Optional[str]) -> List[Mention]:
+        """Return one mention per product found in `text` (best confidence wins)."""
+        if not text:
+            return []
+        cache = self._token_cache
+        tokens: List[str] = []
+        corrected: List[bool] = []
+        for raw in _TOKEN.findall(text.casefold()):
+            hit = cache.get(raw)
+            if hit is None:
+                hit = self._canonical(raw)
+                if len(cache) < 200_000:
+                    cache[raw] = hit
+            tokens.append(hit[0])
+            corrected.append(hit[1])
+
+        # Longest match wins where catalogue entries overlap ("vitamin c" vs "vitamin")
+        spans = sorted(self.automaton.iter_matches(tokens), key=lambda m: (m[0], m[0] - m[1]))
+        found: Dict[str, Mention] = {}
+        covered_until = 0
+        for start, end, (product, confidence) in spans:
+            if start < covered_until:
+                continue
+            covered_until = end
+            fuzzy = any(corrected[start:end])
+            score = round(confidence * FUZZY_PENALTY, 4) if fuzzy else confidence
+            current = found.get(product)
+            if current is None or score > current.confidence:
+                found[product] = Mention(product, score, " ".join(tokens[start:end]), fuzzy)
+        return list(found.values())
+
+    def extract_batch(self, messages: Iterable[Tuple[Any, ...]]) -> List[tuple]:
+        """Extract mentions for (message_id, channel_slug, text, ...) tuples.
+
+        Returns:
+            Rows of (message_id, channel_slug, product_name, confidence_score, match_type)
+        """
+        rows = []
+        for message_id, channel_slug, text, *_ in messages:
+            for m in self.extract(text):
+                rows.append((message_id, channel_slug, m.product_name, m.confidence, "fuzzy" if m.fuzzy else "exact"))
+        return rows
+
+
+def ensure_mentions_table(cur) -> None:
+    cur.execute("""
+        BEGIN
+            EXECUTE IMMEDIATE 'CREATE TABLE telegram_raw.product_mentions (
+                message_id       NUMBER,
+                channel_slug     VARCHAR2(100),
+                product_name     VARCHAR2(200),
+                confidence_score NUMBER(5,4),
+                match_type       VARCHAR2(10),
+                created_at       TIMESTAMP DEFAULT SYSTIMESTAMP
+            )';
+        EXCEPTION WHEN OTHERS THEN
+            IF SQLCODE != -955 THEN RAISE; END IF;
+        END;
+    """)
+
+
+def store_mentions(cur, message_ids: Sequence[Tuple[int, str]], rows: Sequence[tuple]) -> None:
+    """Replace the mentions of a batch of messages with `rows` (idempotent re-runs).
+
+    Args:
+        cur: Open cursor; the caller commits
+        message_ids: (message_id, channel_slug) of every message in the batch
+        rows: Output of `MentionExtractor.extract_batch`
+    """
+    if message_ids:
+        cur.executemany(
+            "DELETE FROM telegram_raw.product_mentions WHERE message_id = :1 AND channel_slug = :2",
+            list(message_ids),
+        )
+    if rows:
+        cur.executemany("""
+            INSERT INTO telegram_raw.product_mentions (
+                message_id, channel_slug, product_name, confidence_score, match_type
+            ) VALUES (:1, :2, :3, :4, :5)
+        """, list(rows))
+
+
+Batch = List[Tuple[int, str, Optional[str], Optional[datetime]]]
+
+
+def iter_db_batches(cur, date: str, batch_size: int = 5000) -> Iterator[Batch]:
+    """Yield batches of (message_id, channel_slug, text, message_ts) for one load date from TELEGRAM_RAW."""
+    cur.arraysize = batch_size
+    cur.execute("""
+        SELECT message_id, channel_slug, JSON_VALUE(payload, '$.message' RETURNING CLOB), message_ts
+        FROM telegram_raw.messages
+        WHERE TRUNC(message_ts) = TO_DATE(:1, 'YYYY-MM-DD')
+    """, [date])
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            return
+        yield [(mid, slug, text.read() if hasattr(text, "read") else text, ts) for mid, slug, text, ts in batch]
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def iter_lake_batches(base: Path, batch_size: int = 5000) -> Iterator[Batch]:
+    """Yield batches of (message_id, channel_slug, text, message_ts) from JSON or Parquet lake files.
+
+    Parquet files need `id` and `message` columns (plus `date` if present); only those are read.
+    """
+    from src.loaders.load_raw_to_oracle import load_messages
+
+    files = [base] if base.is_file() else sorted(p for p in base.rglob("*") if p.suffix in (".json", ".parquet"))
+    for fp in files:
+        slug = fp.stem
+        if fp.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(fp)
+            columns = ["id", "message"] + (["date"] if "date" in parquet.schema_arrow.names else [])
+            for record_batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+                cols = record_batch.to_pydict()
+                dates = cols.get("date") or [None] * len(cols["id"])
+                yield [
+                    (mid, slug, text, _parse_date(ts))
+                    for mid, text, ts in zip(cols["id"], cols["message"], dates)
+                ]
+            continue
+        messages = load_messages(fp)
+        for i in range(0, len(messages), batch_size):
+            yield [
+                (m.get("id"), slug, m.get("message"), _parse_date(m.get("date")))
+                for m in messages[i:i + batch_size]
+            ]
@@ -0,0 +1,82 @@
+"""CLI script to extract product mentions and store them in Oracle.
+
+Usage:
+    python -m src.mentions.extract_mentions --date 2025-07-13
+    python -m src.mentions.extract_mentions --path data/raw/telegram_messages/2025-07-13
+    python -m src.mentions.extract_mentions --path data/lake/messages.parquet --catalogue products.csv
+
+With `--date` messages are read from TELEGRAM_RAW.MESSAGES; with `--path` they
+are read from the JSON (or Parquet) data lake. Mentions are written to
+TELEGRAM_RAW.PRODUCT_MENTIONS in bulk, replacing earlier results for the same
+messages, so re-runs are idempotent. The trending-products snapshot
+(`TRENDING_SNAPSHOT`) is updated with the same mentions unless `--skip-trending`.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from tqdm import tqdm
+
+from src.constants import env
+from src.db import get_connection
+from src.mentions import (
+    DEFAULT_CATALOGUE,
+    MentionExtractor,
+    ensure_mentions_table,
+    iter_db_batches,
+    iter_lake_batches,
+    store_mentions,
+)
+from src.trending import mention_events, update_snapshot
+
+
+def main(
+    date: str | None,
+    path: str | None,
+    catalogue: str,
+    batch_size: int = 5000,
+    fuzzy: bool = True,
+    trending: bool = True,
+):
+    if not date and not path:
+        raise ValueError("Provide either --date or --path")
+
+    extractor = MentionExtractor.from_csv(Path(catalogue), fuzzy=fuzzy)
+
+    snapshot = update_snapshot(Path(env.TRENDING_SNAPSHOT)) if trending else nullcontext()
+    with get_connection() as conn, snapshot as store:
+        cur = conn.cursor()
+        ensure_mentions_table(cur)
+        # Separate cursor for reading so writes don't disturb the open result set
+        batches = iter_db_batches(conn.cursor(), date, batch_size) if date else iter_lake_batches(Path(path), batch_size)
+
+        processed = found = 0
+        started = time.perf_counter()
+        pbar = tqdm(batches, desc="Extracting mentions", unit="batch")
+        for batch in pbar:
+            rows = extractor.extract_batch(batch)
+            store_mentions(cur, [(mid, slug) for mid, slug, *_ in batch], rows)
+            conn.commit()
+            if store is not None:
+                store.add_mentions(mention_events(batch, rows))
+            processed += len(batch)
+            found += len(rows)
+            pbar.set_postfix(messages=processed, mentions=found)
+
+    elapsed = time.perf_counter() - started
+    print(f"Extracted {found} mentions from {processed} messages ({processed / elapsed if elapsed else 0:.0f} msg/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract product mentions from Telegram messages")
+    parser.add_argument("--date", help="Load date YYYY-MM-DD to process from TELEGRAM_RAW.MESSAGES")
+    parser.add_argument("--path", help="Data lake folder or file (JSON or Parquet) to process")
+    parser.add_argument("--catalogue", default=str(DEFAULT_CATALOGUE), help="Product catalogue CSV")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--no-fuzzy", action="store_true", help="Exact (normalised) matches only")
+    parser.add_argument("--skip-trending", action="store_true", help="Do not update the trending snapshot")
+    args = parser.parse_args()
+    main(args.date, args.path, args.catalogue, args.batch_size, not args.no_fuzzy, not args.skip_trending)
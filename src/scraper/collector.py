@@ -3,6 +3,13 @@
 This module provides `collect_channel` to fetch recent messages (optionally full
 history) from a channel and persist raw JSON snapshots in partitioned
 YYYY-MM-DD/<channel>.json format under data/raw.
+
+Messages are stored as compact `MessageRecord`s (see `src.scraper.records`);
+pass `--keep-raw` to also retain the full Telethon `to_dict()` tree.
+
+Channel ids and access hashes are cached across runs (see
+`src.scraper.entities`), so known channels are fetched without resolving their
+username first; pass `--refresh-entities` to resolve every channel again.
 """
 from __future__ import annotations
 
@@ -10,24 +17,38 @@ import asyncio
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Sequence
 
 from telethon import TelegramClient, functions, types
-from telethon.errors.rpcerrorlist import ChannelInvalidError, ChannelPrivateError
+from telethon.errors.rpcerrorlist import ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError
 from telethon.tl.functions.messages import GetHistoryRequest
 from tqdm import tqdm
 
-from src.config import settings
+from src.config import get_settings
+from src.scraper.entities import EntityCache
+from src.scraper.records import MessageRecord
 from src.utils.file_io import channel_slug, write_json_atomic
 
 DATE_FMT = "%Y-%m-%d"
 
+# Errors Telegram returns for a peer whose cached id/access hash is no longer valid
+STALE_PEER_ERRORS = (ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError)
+
 
 class ChannelScraper:
     """Encapsulates scraping logic for a single Telethon client session."""
 
-    def __init__(self, api_id: int, api_hash: str, session: str = "tk_session") -> None:
+    def __init__(
+        self,
+        api_id: int,
+        api_hash: str,
+        session: str = "tk_session",
+        keep_raw: bool = False,
+        entity_cache: Optional[EntityCache] = None,
+    ) -> None:
         self.client = TelegramClient(session, api_id, api_hash)
+        self.keep_raw = keep_raw
+        self.entity_cache = entity_cache
 
     async def __aenter__(self):  # type: ignore
         await self.client.start()
@@ -36,38 +57,78 @@ class ChannelScraper:
     async def __aexit__(self, exc_type, exc_val, exc_tb):  # type: ignore
         await self.client.disconnect()
 
+    async def resolve(self, channel: str) -> tuple[object, bool]:
+        """Return the peer to fetch `channel` from, and whether it came from the entity cache."""
+        slug = channel_slug(channel)
+        cached = self.entity_cache.get(slug) if self.entity_cache is not None else None
+        if cached is not None:
+            return types.InputPeerChannel(cached.channel_id, cached.access_hash), True
+
+        entity = await self.client.get_entity(channel)
+        if self.entity_cache is not None and isinstance(entity, types.Channel) and entity.access_hash is not None:
+            self.entity_cache.put(slug, entity.id, entity.access_hash)
+            self.entity_cache.save()
+        return entity, False
+
     async def fetch_history(self, channel: str, limit: int | None = None) -> list[dict]:
         """Return message history for a channel as list of dictionaries."""
         slug = channel_slug(channel)
-        try:
-            entity = await self.client.get_entity(channel)
-        except (ChannelInvalidError, ChannelPrivateError) as e:
-            print(f"[WARN] Could not access {channel} – {e}")
-            return []
-
+        while True:
+            try:
+                peer, cached = await self.resolve(channel)
+            except (ChannelInvalidError, ChannelPrivateError) as e:
+                print(f"[WARN] Could not access {channel} – {e}")
+                return []
+            try:
+                return await self._download(peer, slug, limit)
+            except STALE_PEER_ERRORS as e:
+                if not cached:
+                    print(f"[WARN] Could not access {channel} – {e}")
+                    return []
+                # Channel recreated or access revoked since it was cached: resolve the username again
+                print(f"[INFO] Cached entity for {slug} rejected ({e.__class__.__name__}); resolving again")
+                self.entity_cache.invalidate(slug)
+                self.entity_cache.save()
+
+    async def _download(self, peer: object, slug: str, limit: int | None) -> list[dict]:
         messages: list[dict] = []
         pbar = tqdm(total=limit or float("inf"), desc=f"Downloading {slug}")
+        try:
+            async for msg in self.client.iter_messages(peer, limit=limit):  # type: ignore[attr-defined]
+                messages.append(MessageRecord.from_message(msg, self.keep_raw).to_dict())
+                pbar.update(1)
+        finally:
+            pbar.close()
+        return messages
 
-        async for msg in self.client.iter_messages(entity, limit=limit):  # type: ignore[attr-defined]
-            messages.append(msg.to_dict())  # pyright: ignore[reportUnknownMemberType]
-            pbar.update(1)
 
-        pbar.close()
-        return messages
+def save_messages(channel: str, messages: list[dict], date_part: Optional[str] = None) -> Optional[Path]:
+    """Write a channel's messages to the data lake partition of `date_part` (today by default)."""
+    if not messages:
+        return None
+    date_part = date_part or datetime.utcnow().strftime(DATE_FMT)
+    out_path = Path(get_settings().data_dir) / "telegram_messages" / date_part / f"{channel_slug(channel)}.json"
+    write_json_atomic(out_path, messages, indent=None)
+    print(f"Saved {len(messages)} messages -> {out_path}")
+    return out_path
 
 
-async def collect_channels(channels: Sequence[str], limit: int | None = None) -> None:
+async def collect_channels(
+    channels: Sequence[str],
+    limit: int | None = None,
+    keep_raw: bool = False,
+    refresh_entities: bool = False,
+) -> None:
     """Collect messages for multiple channels and persist to data lake."""
+    settings = get_settings()
     date_part = datetime.utcnow().strftime(DATE_FMT)
-    async with ChannelScraper(settings.api_id, settings.api_hash, settings.session_name) as scraper:
+    entities = EntityCache.from_env()
+    if refresh_entities:
+        entities.ttl_seconds = 0
+    async with ChannelScraper(settings.api_id, settings.api_hash, settings.session_name, keep_raw, entities) as scraper:
         for ch in channels:
-            msgs = await scraper.fetch_history(ch, limit)
-            if not msgs:
-                continue
-            slug = channel_slug(ch)
-            out_path = Path(settings.data_dir) / "telegram_messages" / date_part / f"{slug}.json"
-            write_json_atomic(out_path, msgs)
-            print(f"Saved {len(msgs)} messages -> {out_path}")
+            save_messages(ch, await scraper.fetch_history(ch, limit), date_part)
+    print(f"Channels resolved: {entities.misses} via Telegram, {entities.hits} from {entities.path}")
 
 
 def main() -> None:  # pragma: no cover
@@ -76,9 +137,11 @@ def main() -> None:  # pragma: no cover
     parser = argparse.ArgumentParser(description="Telegram channel scraper")
     parser.add_argument("channels", nargs="+", help="Channel usernames or links")
     parser.add_argument("--limit", type=int, default=None, help="Maximum messages per channel")
+    parser.add_argument("--keep-raw", action="store_true", help="Also store the full Telethon message tree")
+    parser.add_argument("--refresh-entities", action="store_true", help="Resolve every channel again, ignoring the entity cache")
     args = parser.parse_args()
 
-    asyncio.run(collect_channels(args.channels, args.limit))
+    asyncio.run(collect_channels(args.channels, args.limit, args.keep_raw, args.refresh_entities))
 
 
 if __name__ == "__main__":
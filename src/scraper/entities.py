@@ -0,0 +1,117 @@
+"""Persistent cache of resolved Telegram channels for the scraper.
+
+Resolving a username (`client.get_entity("some_channel")`) is one of the most
+tightly rate-limited Telegram calls, and a long channel list runs into
+FLOOD_WAIT errors long before the history requests do. A channel only needs
+its id and access hash to be addressed (`InputPeerChannel`), and both stay
+valid for months, so `EntityCache` keeps them on disk keyed by
+`channel_slug`:
+
+- entries older than the TTL are resolved again, so renamed or recreated
+  channels are picked up eventually;
+- when Telegram rejects a cached peer (CHANNEL_INVALID, CHANNEL_PRIVATE,
+  PEER_ID_INVALID), the scraper drops the entry, resolves the username once
+  more and retries.
+
+The cache is a small JSON file. `save()` re-reads it and applies only this
+run's changes under an exclusive lock on `<path>.lock`, so scrapers running
+side by side do not drop each other's entries.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.constants import env
+from src.utils.file_io import write_json_atomic
+
+
+@dataclass(frozen=True)
+class ResolvedEntity:
+    """What is needed to address a channel without resolving its username."""
+
+    channel_id: int
+    access_hash: int
+    resolved_at: float  # epoch seconds
+
+
+class EntityCache:
+    """Resolved channels on disk, keyed by `channel_slug`."""
+
+    def __init__(self, path: Path, ttl_seconds: float) -> None:
+        """Load the cache file if it exists.
+
+        Args:
+            path: JSON file holding the entries
+            ttl_seconds: Entries resolved longer ago are treated as missing
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = self._read()
+        self._changes: Dict[str, Optional[ResolvedEntity]] = {}
+
+    @classmethod
+    def from_env(cls) -> "EntityCache":
+        return cls(Path(env.SCRAPER_ENTITY_CACHE), ttl_seconds=env.SCRAPER_ENTITY_TTL_DAYS * 86400)
+
+    def _read(self) -> Dict[str, ResolvedEntity]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable entity cache {self.path} – {e}")
+            return {}
+        entries = {}
+        for slug, item in data.items():
+            try:
+                entries[slug] = ResolvedEntity(int(item["channel_id"]), int(item["access_hash"]), float(item["resolved_at"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return entries
+
+    def get(self, slug: str, now: Optional[float] = None) -> Optional[ResolvedEntity]:
+        """Return the cached entry for `slug`, or None if it is missing or older than the TTL."""
+        now = time.time() if now is None else now
+        entry = self._entries.get(slug)
+        if entry is None or now - entry.resolved_at > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, slug: str, channel_id: int, access_hash: int, now: Optional[float] = None) -> ResolvedEntity:
+        entry = ResolvedEntity(channel_id, access_hash, time.time() if now is None else now)
+        self._entries[slug] = entry
+        self._changes[slug] = entry
+        return entry
+
+    def invalidate(self, slug: str) -> None:
+        """Forget `slug`, e.g. after Telegram rejected its access hash."""
+        self._entries.pop(slug, None)
+        self._changes[slug] = None
+
+    def save(self) -> None:
+        """Merge this run's changes into the file on disk and write it atomically."""
+        if not self._changes:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Held from the re-read to the rename, so a concurrent save cannot interleave
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self._read()
+            for slug, entry in self._changes.items():
+                if entry is None:
+                    entries.pop(slug, None)
+                else:
+                    entries[slug] = entry
+            write_json_atomic(self.path, {slug: asdict(entry) for slug, entry in sorted(entries.items())})
+        self._entries = entries
+        self._changes.clear()
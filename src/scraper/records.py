@@ -0,0 +1,208 @@
+"""Compact projection of Telethon messages for the data lake.
+
+`Message.to_dict()` serialises the whole TL object tree: peer and sender
+objects, entity lists, reply markup, reactions, stripped JPEG thumbnails and
+every flag. The marts only need the message identity, timestamp, text, media
+kind, the photo reference used by the image pipeline and a few engagement
+counters. `MessageRecord` keeps exactly those, and can optionally retain the
+full tree under `raw` for debugging or backfills.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Optional
+
+# MessageMedia* constructor -> media_type stored in the lake (documents are split by MIME type)
+MEDIA_TYPES = {
+    "MessageMediaPhoto": "image",
+    "MessageMediaWebPage": "webpage",
+    "MessageMediaGeo": "geo",
+    "MessageMediaGeoLive": "geo",
+    "MessageMediaVenue": "venue",
+    "MessageMediaContact": "contact",
+    "MessageMediaPoll": "poll",
+    "MessageMediaDice": "dice",
+    "MessageMediaGame": "game",
+    "MessageMediaInvoice": "invoice",
+    "MessageMediaStory": "story",
+    "MessageMediaGiveaway": "giveaway",
+    "MessageMediaUnsupported": "unsupported",
+}
+
+
+def _get(obj: Any, name: str) -> Any:
+    """Read a field from a Telethon TL object or its `to_dict()` form."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _kind(obj: Any) -> str:
+    return obj.get("_", "") if isinstance(obj, dict) else type(obj).__name__
+
+
+def _iso(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    try:
+        # `to_dict()` trees dumped with default=str use "YYYY-MM-DD HH:MM:SS+00:00"
+        return datetime.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _media_type(media: Any) -> Optional[str]:
+    if media is None:
+        return None
+    kind = _kind(media)
+    if kind == "MessageMediaEmpty":
+        return None
+    if kind == "MessageMediaDocument":
+        mime = _get(_get(media, "document"), "mime_type") or ""
+        for prefix, media_type in (("video/", "video"), ("audio/", "audio"), ("image/", "image")):
+            if mime.startswith(prefix):
+                return media_type
+        return "document"
+    return MEDIA_TYPES.get(kind, kind.removeprefix("MessageMedia").lower() or None)
+
+
+def _photo(media: Any) -> Optional[dict[str, Any]]:
+    """The fields needed to download a photo again, with its downloadable sizes."""
+    photo = _get(media, "photo")
+    if photo is None or _kind(photo) != "Photo":
+        return None
+    sizes = []
+    for size in _get(photo, "sizes") or []:
+        # Stripped / path thumbnails carry inline bytes, not a downloadable size
+        if _get(size, "w") is None:
+            continue
+        nbytes = _get(size, "size")
+        if nbytes is None:
+            nbytes = max(_get(size, "sizes") or [0])  # PhotoSizeProgressive
+        sizes.append({"type": _get(size, "type"), "w": _get(size, "w"), "h": _get(size, "h"), "size": nbytes})
+    file_reference = _get(photo, "file_reference")
+    return {
+        "id": _get(photo, "id"),
+        "access_hash": _get(photo, "access_hash"),
+        "file_reference": file_reference.hex() if isinstance(file_reference, bytes) else file_reference,
+        "dc_id": _get(photo, "dc_id"),
+        "sizes": sizes,
+    }
+
+
+def _photo_of_object(photo: Any) -> dict[str, Any]:
+    """`_photo` for a Telethon `Photo` object, reading attributes directly."""
+    sizes = []
+    for size in photo.sizes or ():
+        w = getattr(size, "w", None)
+        if w is None:
+            continue
+        nbytes = getattr(size, "size", None)
+        if nbytes is None:
+            nbytes = max(getattr(size, "sizes", None) or [0])
+        sizes.append({"type": size.type, "w": w, "h": size.h, "size": nbytes})
+    file_reference = photo.file_reference
+    return {
+        "id": photo.id,
+        "access_hash": photo.access_hash,
+        "file_reference": file_reference.hex() if isinstance(file_reference, bytes) else file_reference,
+        "dc_id": photo.dc_id,
+        "sizes": sizes,
+    }
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    """The message fields the raw schema and marts use."""
+
+    id: int
+    date: Optional[str]
+    channel_id: Optional[int] = None
+    message: str = ""
+    media_type: Optional[str] = None
+    photo: Optional[dict[str, Any]] = None
+    views: Optional[int] = None
+    forwards: Optional[int] = None
+    replies: Optional[int] = None
+    edit_date: Optional[str] = None
+    grouped_id: Optional[int] = None
+    reply_to_msg_id: Optional[int] = None
+    raw: Optional[dict[str, Any]] = None
+
+    @classmethod
+    def from_message(cls, msg: Any, keep_raw: bool = False) -> "MessageRecord":
+        """Project a Telethon `Message` (or its `to_dict()` tree).
+
+        Args:
+            msg: Telethon message object or dictionary from `Message.to_dict()`
+            keep_raw: Also keep the full `to_dict()` tree under `raw`
+
+        Returns:
+            The compact record
+        """
+        if not isinstance(msg, dict):
+            return cls._from_object(msg, msg.to_dict() if keep_raw else None)
+        media = _get(msg, "media")
+        return cls(
+            id=_get(msg, "id"),
+            date=_iso(_get(msg, "date")),
+            channel_id=_get(_get(msg, "peer_id"), "channel_id"),
+            message=_get(msg, "message") or "",
+            media_type=_media_type(media),
+            photo=_photo(media),
+            views=_get(msg, "views"),
+            forwards=_get(msg, "forwards"),
+            replies=_get(_get(msg, "replies"), "replies"),
+            edit_date=_iso(_get(msg, "edit_date")),
+            grouped_id=_get(msg, "grouped_id"),
+            reply_to_msg_id=_get(_get(msg, "reply_to"), "reply_to_msg_id"),
+            raw=msg if keep_raw else None,
+        )
+
+    @classmethod
+    def _from_object(cls, msg: Any, raw: Optional[dict[str, Any]]) -> "MessageRecord":
+        """`from_message` for a Telethon object: the scraper's path, so no per-field `_get` dispatch."""
+        media = getattr(msg, "media", None)
+        photo = getattr(media, "photo", None)
+        date = msg.date
+        edit_date = getattr(msg, "edit_date", None)
+        return cls(
+            id=msg.id,
+            date=date.isoformat() if date is not None else None,
+            channel_id=getattr(msg.peer_id, "channel_id", None),
+            message=getattr(msg, "message", None) or "",
+            media_type=_media_type(media),
+            photo=_photo_of_object(photo) if type(photo).__name__ == "Photo" else None,
+            views=getattr(msg, "views", None),
+            forwards=getattr(msg, "forwards", None),
+            replies=getattr(getattr(msg, "replies", None), "replies", None),
+            edit_date=edit_date.isoformat() if edit_date is not None else None,
+            grouped_id=getattr(msg, "grouped_id", None),
+            reply_to_msg_id=getattr(getattr(msg, "reply_to", None), "reply_to_msg_id", None),
+            raw=raw,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready dictionary; unset (None) fields are omitted."""
+        return {name: value for name in _FIELD_NAMES if (value := getattr(self, name)) is not None}
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(MessageRecord))
+
+
+def compact_payload(message: dict[str, Any], keep_raw: bool = False) -> dict[str, Any]:
+    """Project a lake message to its compact form.
+
+    Full `to_dict()` trees (files written before the projection existed) are
+    projected; compact records pass through, minus `raw` unless `keep_raw`.
+    """
+    if "_" in message:
+        return MessageRecord.from_message(message, keep_raw).to_dict()
+    if not keep_raw and "raw" in message:
+        return {k: v for k, v in message.items() if k != "raw"}
+    return message
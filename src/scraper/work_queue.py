@@ -0,0 +1,479 @@
+"""Lease-based work queue for scraping channels from several hosts.
+
+Usage:
+    python -m src.scraper.work_queue add lobelia4cosmetics tikvahpharma ...
+    python -m src.scraper.work_queue work            # on every scraper host
+    python -m src.scraper.work_queue status
+
+Every tracked channel is one row of TELEGRAM_RAW.SCRAPE_QUEUE with the time
+it is next due. A worker claims a due channel by taking a lease on it: a
+conditional UPDATE that only succeeds while nobody else holds an unexpired
+lease, so two hosts never scrape the same channel at once. The worker renews
+the lease while the download runs and releases it when done, scheduling the
+next run (`SCRAPE_INTERVAL_MINUTES` later, or an exponential backoff after a
+failure). A worker that crashes stops renewing; once its lease expires the
+channel is due to anyone again.
+
+Each claim bumps `lease_version`, and renew/release only match the version
+they claimed. A worker that stalled past its lease therefore cannot extend or
+release a lease another host has since taken; it finds out (`LeaseLost`) and
+abandons the channel.
+
+Workers write what they scrape to the data lake (`DATA_LAKE_DIR`), which the
+loader reads from one place, so every host must mount the same lake. The first
+worker registers the lake's id (a `.scrape-lake` file in it) in
+TELEGRAM_RAW.SCRAPE_LAKE; a worker whose lake carries another id, or none,
+refuses to start (`LakeMismatch`) instead of splitting the lake across hosts.
+A worker renews its lease once more right before writing, so a worker whose
+channel was reclaimed never overwrites the new owner's file.
+
+The same statements run on Oracle and on the SQLite stand-in (DB_BACKEND=local),
+where the worker processes share the database files. Lease times come from the
+workers' clocks, so hosts must be NTP-synced; `SCRAPE_LEASE_SECONDS` should be
+far larger than any skew.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from src.constants import env
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 1000
+LAKE_MARKER = ".scrape-lake"
+
+
+class LeaseLost(RuntimeError):
+    """The lease expired and was claimed by another worker (or the channel was removed)."""
+
+
+class LakeMismatch(RuntimeError):
+    """This host's data lake is not the one the other workers write to."""
+
+
+@dataclass(frozen=True)
+class Lease:
+    channel_slug: str
+    channel: str
+    worker_id: str
+    version: int
+    expires_at: datetime
+    attempts: int = 0  # consecutive failures before this claim
+    reclaimed_from: Optional[str] = None  # owner of the expired lease this claim replaced
+
+
+def ensure_queue_table(cur) -> None:
+    """Create TELEGRAM_RAW.SCRAPE_QUEUE and TELEGRAM_RAW.SCRAPE_LAKE if they do not exist."""
+    for ddl in (
+        """CREATE TABLE telegram_raw.scrape_queue (
+                channel_slug        VARCHAR2(100) PRIMARY KEY,
+                channel             VARCHAR2(200),
+                next_run_at         TIMESTAMP,
+                lease_owner         VARCHAR2(200),
+                lease_expires_at    TIMESTAMP,
+                lease_version       NUMBER DEFAULT 0,
+                attempts            NUMBER DEFAULT 0,
+                last_run_at         TIMESTAMP,
+                last_message_count  NUMBER,
+                last_error          VARCHAR2(1000)
+            )""",
+        """CREATE INDEX telegram_raw.scrape_queue_due_ix
+            ON telegram_raw.scrape_queue (next_run_at)""",
+        """CREATE TABLE telegram_raw.scrape_lake (
+                lake_id             VARCHAR2(36),
+                registered_at       TIMESTAMP
+            )""",
+    ):
+        cur.execute(f"""
+            BEGIN
+                EXECUTE IMMEDIATE '{ddl}';
+            EXCEPTION WHEN OTHERS THEN
+                IF SQLCODE NOT IN (-955, -1408) THEN RAISE; END IF;
+            END;
+        """)
+
+
+class WorkQueue:
+    """Channel work items with time-limited leases, stored in TELEGRAM_RAW.SCRAPE_QUEUE."""
+
+    def __init__(
+        self,
+        conn,
+        lease_seconds: float = 300,
+        interval_seconds: float = 3600,
+        retry_seconds: float = 300,
+    ) -> None:
+        """Bind the queue to a connection. Every method commits its own changes.
+
+        Args:
+            conn: Oracle connection (or the SQLite stand-in)
+            lease_seconds: How long a claim or renewal holds a channel
+            interval_seconds: Delay from a successful run to the next one
+            retry_seconds: Delay after a first failure, doubled per consecutive failure (capped at the interval)
+        """
+        self.conn = conn
+        self.lease_seconds = lease_seconds
+        self.interval_seconds = interval_seconds
+        self.retry_seconds = retry_seconds
+
+    @classmethod
+    def from_env(cls, conn) -> "WorkQueue":
+        return cls(
+            conn,
+            lease_seconds=env.SCRAPE_LEASE_SECONDS,
+            interval_seconds=env.SCRAPE_INTERVAL_MINUTES * 60,
+            retry_seconds=env.SCRAPE_RETRY_SECONDS,
+        )
+
+    def ensure_table(self) -> None:
+        ensure_queue_table(self.conn.cursor())
+        self.conn.commit()
+
+    def check_lake(self, data_dir: Path, now: Optional[datetime] = None) -> str:
+        """Make sure `data_dir` is the lake every worker writes to; returns its id.
+
+        The lake's id lives in a marker file inside it. The first worker to
+        start registers that id; workers started on a different lake (another
+        host's local disk) then disagree with the registered id.
+
+        Raises:
+            LakeMismatch: If `data_dir` is not the registered lake
+        """
+        marker = Path(data_dir) / LAKE_MARKER
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Exclusive create: workers starting together on one lake agree on its id
+            with marker.open("x", encoding="utf-8") as f:
+                f.write(str(uuid.uuid4()))
+        except FileExistsError:
+            pass
+        lake_id = marker.read_text(encoding="utf-8").strip()
+        cur = self.conn.cursor()
+        cur.execute("""
+            INSERT INTO telegram_raw.scrape_lake (lake_id, registered_at)
+            SELECT :lake_id, :now FROM dual
+            WHERE NOT EXISTS (SELECT 1 FROM telegram_raw.scrape_lake)
+        """, {"lake_id": lake_id, "now": now or datetime.utcnow()})
+        self.conn.commit()
+        # Two lakes registering at once both insert; the smallest id wins
+        cur.execute("SELECT MIN(lake_id) FROM telegram_raw.scrape_lake")
+        registered = cur.fetchone()[0]
+        if registered != lake_id:
+            raise LakeMismatch(
+                f"{data_dir} is not the data lake the other workers write to (lake {registered}). "
+                f"Point DATA_LAKE_DIR at the shared lake (e.g. an NFS mount); if the lake has moved, "
+                f"copy its {LAKE_MARKER} file along or clear TELEGRAM_RAW.SCRAPE_LAKE."
+            )
+        return lake_id
+
+    def enqueue(self, channels: Iterable[str], now: Optional[datetime] = None) -> int:
+        """Add channels, due immediately. Channels already queued keep their schedule.
+
+        Returns:
+            Number of channels added
+        """
+        from src.utils.file_io import channel_slug
+
+        now = now or datetime.utcnow()
+        rows = {channel_slug(ch): ch for ch in channels}
+        cur = self.conn.cursor()
+        cur.executemany(
+            """
+            MERGE INTO telegram_raw.scrape_queue tgt
+            USING (SELECT :1 AS channel_slug, :2 AS channel, :3 AS next_run_at FROM dual) src
+            ON (tgt.channel_slug = src.channel_slug)
+            WHEN NOT MATCHED THEN INSERT (channel_slug, channel, next_run_at)
+            VALUES (src.channel_slug, src.channel, src.next_run_at)
+            """,
+            [(slug, ch, now) for slug, ch in rows.items()],
+        )
+        added = cur.rowcount
+        self.conn.commit()
+        return added
+
+    def remove(self, channels: Iterable[str]) -> int:
+        """Stop tracking channels; a worker holding one of them loses its lease."""
+        from src.utils.file_io import channel_slug
+
+        cur = self.conn.cursor()
+        removed = 0
+        for ch in channels:
+            cur.execute("DELETE FROM telegram_raw.scrape_queue WHERE channel_slug = :slug", {"slug": channel_slug(ch)})
+            removed += cur.rowcount
+        self.conn.commit()
+        return removed
+
+    def claim(self, worker_id: str, limit: int = 1, now: Optional[datetime] = None) -> List[Lease]:
+        """Lease up to `limit` due channels, most overdue first.
+
+        Candidates are read without locks and then claimed one by one with a
+        conditional UPDATE; a candidate another worker claimed in between
+        simply updates no row and is skipped.
+        """
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        cur = self.conn.cursor()
+        # Over-fetch so that losing a few races to other workers still fills the batch
+        cur.execute(f"""
+            SELECT channel_slug, lease_owner
+            FROM telegram_raw.scrape_queue
+            WHERE next_run_at <= :now
+              AND (lease_owner IS NULL OR lease_expires_at < :now)
+            ORDER BY next_run_at
+            FETCH FIRST {int(limit) * 4} ROWS ONLY
+        """, {"now": now})
+        candidates: List[Tuple[str, Optional[str]]] = cur.fetchall()
+
+        leases: List[Lease] = []
+        for slug, previous_owner in candidates:
+            if len(leases) >= limit:
+                break
+            cur.execute("""
+                UPDATE telegram_raw.scrape_queue
+                SET lease_owner = :worker, lease_expires_at = :expires_at, lease_version = lease_version + 1
+                WHERE channel_slug = :slug
+                  AND next_run_at <= :now
+                  AND (lease_owner IS NULL OR lease_expires_at < :now)
+            """, {"worker": worker_id, "expires_at": expires_at, "slug": slug, "now": now})
+            if cur.rowcount != 1:
+                self.conn.rollback()
+                continue
+            cur.execute(
+                "SELECT channel, lease_version, attempts FROM telegram_raw.scrape_queue WHERE channel_slug = :slug",
+                {"slug": slug},
+            )
+            channel, version, attempts = cur.fetchone()
+            self.conn.commit()
+            leases.append(Lease(slug, channel, worker_id, int(version), expires_at, int(attempts or 0), previous_owner))
+        return leases
+
+    def renew(self, lease: Lease, now: Optional[datetime] = None) -> Lease:
+        """Extend a lease by `lease_seconds` from now.
+
+        Raises:
+            LeaseLost: If another worker has claimed the channel since, or it was removed
+        """
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        cur = self.conn.cursor()
+        cur.execute("""
+            UPDATE telegram_raw.scrape_queue
+            SET lease_expires_at = :expires_at
+            WHERE channel_slug = :slug AND lease_owner = :worker AND lease_version = :version
+        """, {"expires_at": expires_at, "slug": lease.channel_slug, "worker": lease.worker_id, "version": lease.version})
+        renewed = cur.rowcount == 1
+        self.conn.commit()
+        if not renewed:
+            raise LeaseLost(f"Lease on {lease.channel_slug} (version {lease.version}) is no longer held by {lease.worker_id}")
+        return replace(lease, expires_at=expires_at)
+
+    def release(
+        self,
+        lease: Lease,
+        message_count: Optional[int] = None,
+        error: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> bool:
+        """Give the channel back and schedule its next run.
+
+        Args:
+            lease: Lease returned by `claim` or `renew`
+            message_count: Messages fetched (recorded on success)
+            error: Failure description; the channel is retried with backoff instead of the regular interval
+            now: Release time (default: current UTC time)
+
+        Returns:
+            False if the lease had already been lost, in which case nothing is changed
+        """
+        now = now or datetime.utcnow()
+        if error is None:
+            attempts, delay = 0, self.interval_seconds
+        else:
+            attempts = lease.attempts + 1
+            delay = min(self.retry_seconds * 2 ** lease.attempts, self.interval_seconds)
+        cur = self.conn.cursor()
+        cur.execute("""
+            UPDATE telegram_raw.scrape_queue
+            SET lease_owner = NULL,
+                lease_expires_at = NULL,
+                next_run_at = :next_run_at,
+                attempts = :attempts,
+                last_run_at = :now,
+                last_message_count = :message_count,
+                last_error = :error
+            WHERE channel_slug = :slug AND lease_owner = :worker AND lease_version = :version
+        """, {
+            "next_run_at": now + timedelta(seconds=delay),
+            "attempts": attempts,
+            "now": now,
+            "message_count": message_count,
+            "error": error[:MAX_ERROR_LENGTH] if error else None,
+            "slug": lease.channel_slug,
+            "worker": lease.worker_id,
+            "version": lease.version,
+        })
+        released = cur.rowcount == 1
+        self.conn.commit()
+        return released
+
+    def status(self) -> List[tuple]:
+        """(channel_slug, next_run_at, lease_owner, lease_expires_at, attempts, last_run_at, last_message_count, last_error) rows."""
+        cur = self.conn.cursor()
+        cur.execute("""
+            SELECT channel_slug, next_run_at, lease_owner, lease_expires_at, attempts,
+                   last_run_at, last_message_count, last_error
+            FROM telegram_raw.scrape_queue
+            ORDER BY next_run_at
+        """)
+        return cur.fetchall()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _abandon(task: asyncio.Future) -> None:
+    """Cancel `task` and wait until it has stopped (closing its Telegram requests)."""
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass  # cancelled, or failed before the cancel landed; the result is discarded either way
+
+
+async def work_lease(scraper, queue: WorkQueue, lease: Lease, limit: Optional[int] = None) -> bool:
+    """Scrape one leased channel into the data lake, renewing the lease until the download finishes.
+
+    Args:
+        scraper: Started `ChannelScraper`
+        queue: Queue the lease came from
+        lease: Claimed lease
+        limit: Maximum messages to fetch
+
+    Returns:
+        True if the channel was scraped and released
+    """
+    from src.scraper.collector import save_messages
+
+    fetch = asyncio.ensure_future(scraper.fetch_history(lease.channel, limit))
+    try:
+        while True:
+            done, _ = await asyncio.wait({fetch}, timeout=queue.lease_seconds / 3)
+            if done:
+                break
+            lease = queue.renew(lease)
+        messages = fetch.result()
+        # Only the lease's owner may write the channel's file
+        lease = queue.renew(lease)
+        save_messages(lease.channel, messages)
+    except LeaseLost as e:
+        await _abandon(fetch)
+        logger.warning(f"{e}; abandoning {lease.channel_slug}")
+        return False
+    except asyncio.CancelledError:
+        await _abandon(fetch)
+        queue.release(lease, error="worker stopped")
+        raise
+    except Exception as e:
+        await _abandon(fetch)
+        logger.warning(f"Scraping {lease.channel} failed – {e}")
+        queue.release(lease, error=f"{e.__class__.__name__}: {e}")
+        return False
+    return queue.release(lease, message_count=len(messages))
+
+
+async def run_worker(
+    worker_id: Optional[str] = None,
+    once: bool = False,
+    limit: Optional[int] = None,
+    keep_raw: bool = False,
+) -> int:
+    """Claim and scrape due channels until stopped (or, with `once`, until none are due).
+
+    Returns:
+        Number of channels scraped
+    """
+    from src.config import get_settings
+    from src.db import get_connection
+    from src.scraper.collector import ChannelScraper
+    from src.scraper.entities import EntityCache
+
+    worker_id = worker_id or default_worker_id()
+    settings = get_settings()
+    scraped = 0
+    with get_connection() as conn:
+        queue = WorkQueue.from_env(conn)
+        queue.ensure_table()
+        queue.check_lake(settings.data_dir)
+        entities = EntityCache.from_env()
+        async with ChannelScraper(settings.api_id, settings.api_hash, settings.session_name, keep_raw, entities) as scraper:
+            logger.info(f"Worker {worker_id} started")
+            while True:
+                leases = queue.claim(worker_id)
+                if not leases:
+                    if once:
+                        break
+                    await asyncio.sleep(env.SCRAPE_POLL_SECONDS)
+                    continue
+                lease = leases[0]
+                if lease.reclaimed_from:
+                    logger.info(f"Reclaimed {lease.channel_slug} from expired lease of {lease.reclaimed_from}")
+                if await work_lease(scraper, queue, lease, limit):
+                    scraped += 1
+    logger.info(f"Worker {worker_id} scraped {scraped} channels")
+    return scraped
+
+
+def main() -> None:  # pragma: no cover
+    import argparse
+
+    from src.db import get_connection
+
+    parser = argparse.ArgumentParser(description="Distributed channel scraping queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Queue channels for scraping")
+    add.add_argument("channels", nargs="+", help="Channel usernames or links")
+    remove = sub.add_parser("remove", help="Stop scraping channels")
+    remove.add_argument("channels", nargs="+")
+    work = sub.add_parser("work", help="Claim and scrape due channels")
+    work.add_argument("--worker-id", default=None, help="Lease owner name (default: host:pid)")
+    work.add_argument("--once", action="store_true", help="Exit when no channel is due instead of polling")
+    work.add_argument("--limit", type=int, default=None, help="Maximum messages per channel")
+    work.add_argument("--keep-raw", action="store_true", help="Also store the full Telethon message tree")
+    sub.add_parser("status", help="Show the queue")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        try:
+            asyncio.run(run_worker(args.worker_id, args.once, args.limit, args.keep_raw))
+        except LakeMismatch as e:
+            raise SystemExit(f"[ERROR] {e}")
+        return
+
+    with get_connection() as conn:
+        queue = WorkQueue.from_env(conn)
+        queue.ensure_table()
+        if args.command == "add":
+            print(f"Queued {queue.enqueue(args.channels)} new channels")
+        elif args.command == "remove":
+            print(f"Removed {queue.remove(args.channels)} channels")
+        else:
+            for slug, next_run_at, owner, expires_at, attempts, last_run_at, count, error in queue.status():
+                lease = f"leased by {owner} until {expires_at}" if owner else "idle"
+                last = f"last run {last_run_at} ({count} messages)" if last_run_at else "never run"
+                failing = f", {attempts} failures: {error}" if attempts else ""
+                print(f"{slug:30} next {next_run_at}  {lease}; {last}{failing}")
+
+
+if __name__ == "__main__":
+    main()
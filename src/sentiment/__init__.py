@@ -0,0 +1,330 @@
+"""Lexicon-based sentiment scoring of messages, CPU only.
+
+Scores follow the VADER recipe with a small English/Amharic lexicon tuned to
+pharmacy adverts (`lexicon.csv`, scores from -4 to 4):
+
+- each lexicon word contributes its score, raised by a booster ("very",
+  "በጣም") in the two preceding words and flipped (x -0.74) by a negation
+  in the three preceding words ("not") or, Amharic putting it after the
+  predicate, a trailing negation in the two following words ("ጥሩ አይደለም",
+  "ችግር የለም");
+- the sum is squashed into [-1, 1] as `s / sqrt(s^2 + 15)`;
+- `confidence_score` grows with the number of lexicon words matched
+  (`hits / (hits + 2)`), 0 when none matched.
+
+A batch of texts is scored in one vectorised pass over the flat array of
+token ids. Scores are keyed by a hash of the lexicon version and the
+case-folded tokens, so identical reposts (and reloads) hit
+`telegram_raw.sentiment_cache` instead of being scored again.
+
+`SentimentStage` scores messages that have no row in
+`telegram_raw.message_sentiment` yet and writes the results back in bulk;
+`sync_mart` copies them onto `telegram_mart.messages`. Scores are stored per
+(channel_slug, message_id): Telegram message ids are only unique within a
+channel.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.mentions import normalize_token
+
+DEFAULT_LEXICON = Path(__file__).with_name("lexicon.csv")
+
+NEGATION_FACTOR = -0.74
+NORMALIZATION_ALPHA = 15.0
+NEGATION_SCOPE = 3
+TRAILING_NEGATION_SCOPE = 2
+BOOSTER_SCOPE = 2
+
+_TOKEN = re.compile(r"\w+")
+_TOKEN_CACHE_SIZE = 1 << 20
+# Oracle allows at most 1000 expressions in an IN list
+_LOOKUP_CHUNK = 1000
+
+# (channel_slug, message_id)
+MessageKey = Tuple[str, int]
+
+
+class LexiconScorer:
+    """Vectorised lexicon scorer; see the module docstring for the rules."""
+
+    def __init__(
+        self,
+        polarity: Dict[str, float],
+        negations: Sequence[str] = (),
+        boosters: Optional[Dict[str, float]] = None,
+        trailing_negations: Sequence[str] = (),
+    ) -> None:
+        boosters = boosters or {}
+        terms = sorted(set(polarity) | set(negations) | set(boosters) | set(trailing_negations))
+        # Id 0 is "not in the lexicon"
+        self._ids = {normalize_token(term.casefold()): i for i, term in enumerate(terms, start=1)}
+        self._polarity = np.zeros(len(terms) + 1, dtype=np.float64)
+        self._negation = np.zeros(len(terms) + 1, dtype=bool)
+        self._trailing_negation = np.zeros(len(terms) + 1, dtype=bool)
+        self._boost = np.zeros(len(terms) + 1, dtype=np.float64)
+        for i, term in enumerate(terms, start=1):
+            self._polarity[i] = polarity.get(term, 0.0)
+            self._negation[i] = term in negations
+            self._trailing_negation[i] = term in trailing_negations
+            self._boost[i] = boosters.get(term, 0.0)
+        entries = "\n".join(
+            f"{t}\t{polarity.get(t, 0.0)}\t{t in negations}\t{t in trailing_negations}\t{boosters.get(t, 0.0)}"
+            for t in terms
+        )
+        self.version = hashlib.blake2b(entries.encode("utf-8"), digest_size=6).hexdigest()
+        self._token_cache: Dict[str, int] = {}
+
+    @classmethod
+    def from_csv(cls, path: Path = DEFAULT_LEXICON) -> "LexiconScorer":
+        """Load a lexicon CSV with `term`, `score` and `kind` columns.
+
+        `kind` is empty for polarity words, or `negation`, `trailing_negation` or `booster`.
+        """
+        polarity: Dict[str, float] = {}
+        negations: List[str] = []
+        trailing: List[str] = []
+        boosters: Dict[str, float] = {}
+        with Path(path).open("r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                term, kind = row["term"].strip(), (row.get("kind") or "").strip()
+                if kind == "negation":
+                    negations.append(term)
+                elif kind == "trailing_negation":
+                    trailing.append(term)
+                elif kind == "booster":
+                    boosters[term] = float(row["score"])
+                else:
+                    polarity[term] = float(row["score"])
+        return cls(polarity, negations, boosters, trailing)
+
+    def tokens(self, text: Optional[str]) -> List[str]:
+        return _TOKEN.findall((text or "").casefold())
+
+    def content_hash(self, tokens: Sequence[str]) -> str:
+        """Cache key of a text: lexicon version plus its case-folded words."""
+        key = self.version + "\0" + " ".join(tokens)
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _token_ids(self, tokens: Sequence[str]) -> List[int]:
+        cache = self._token_cache
+        ids = list(map(cache.get, tokens))
+        if None in ids:
+            if len(cache) > _TOKEN_CACHE_SIZE:
+                cache.clear()
+            for i, (token, known) in enumerate(zip(tokens, ids)):
+                if known is None:
+                    ids[i] = cache[token] = self._ids.get(normalize_token(token), 0)
+        return ids
+
+    def score_tokens(self, batch: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score already tokenised texts.
+
+        Returns:
+            (sentiment_score in [-1, 1], confidence_score in [0, 1]) arrays, one value per text
+        """
+        per_text = [self._token_ids(tokens) for tokens in batch]
+        lengths = np.array([len(ids) for ids in per_text], dtype=np.int64)
+        ids = np.fromiter(chain.from_iterable(per_text), dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(batch)), lengths)
+        # Position of each token within its own text, to keep look-arounds inside it
+        position = np.arange(len(ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        remaining = np.repeat(lengths, lengths) - position - 1
+
+        values = self._polarity[ids]
+        boost = np.zeros(len(ids))
+        negated = np.zeros(len(ids), dtype=bool)
+        for back in range(1, max(NEGATION_SCOPE, BOOSTER_SCOPE) + 1):
+            inside = position >= back
+            before = np.zeros(len(ids), dtype=np.int64)
+            if back < len(ids):
+                before[back:] = ids[:-back]
+            before[~inside] = 0
+            if back <= BOOSTER_SCOPE:
+                boost += self._boost[before]
+            if back <= NEGATION_SCOPE:
+                negated |= self._negation[before]
+        for ahead in range(1, TRAILING_NEGATION_SCOPE + 1):
+            after = np.zeros(len(ids), dtype=np.int64)
+            if ahead < len(ids):
+                after[:-ahead] = ids[ahead:]
+            after[remaining < ahead] = 0
+            negated |= self._trailing_negation[after]
+        values = values * (1 + boost)
+        values[negated] *= NEGATION_FACTOR
+
+        totals = np.bincount(rows, weights=values, minlength=len(batch))
+        hits = np.bincount(rows, weights=self._polarity[ids] != 0, minlength=len(batch))
+        scores = totals / np.sqrt(totals * totals + NORMALIZATION_ALPHA)
+        return scores, hits / (hits + 2)
+
+    def score(self, texts: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        return self.score_tokens([self.tokens(text) for text in texts])
+
+
+def ensure_sentiment_tables(cur) -> None:
+    """Create the score cache and per-message score tables if they do not exist."""
+    for ddl in (
+        """CREATE TABLE telegram_raw.sentiment_cache (
+                content_hash     VARCHAR2(32) PRIMARY KEY,
+                sentiment_score  NUMBER(5,4),
+                confidence_score NUMBER(5,4)
+            )""",
+        """CREATE TABLE telegram_raw.message_sentiment (
+                channel_slug     VARCHAR2(100),
+                message_id       NUMBER,
+                content_hash     VARCHAR2(32),
+                sentiment_score  NUMBER(5,4),
+                confidence_score NUMBER(5,4),
+                scored_at        TIMESTAMP DEFAULT SYSTIMESTAMP,
+                PRIMARY KEY (channel_slug, message_id)
+            )""",
+    ):
+        cur.execute(f"""
+            BEGIN
+                EXECUTE IMMEDIATE '{ddl}';
+            EXCEPTION WHEN OTHERS THEN
+                IF SQLCODE != -955 THEN RAISE; END IF;
+            END;
+        """)
+
+
+def iter_unscored(cur, batch_size: int = 5000, rescore: bool = False) -> Iterator[List[Tuple[str, int, Optional[str]]]]:
+    """Yield batches of (channel_slug, message_id, text) without a stored score, in key order.
+
+    Each batch is a fresh keyset-paginated query, so the caller can write and
+    commit scores between batches.
+    """
+    unscored = "" if rescore else """
+        AND NOT EXISTS (
+            SELECT 1 FROM telegram_raw.message_sentiment s
+            WHERE s.channel_slug = m.channel_slug AND s.message_id = m.message_id
+        )"""
+    after, params = "", {}
+    while True:
+        cur.execute(f"""
+            SELECT m.channel_slug, m.message_id, JSON_VALUE(m.payload, '$.message' RETURNING CLOB)
+            FROM telegram_raw.messages m
+            WHERE 1 = 1{after}{unscored}
+            ORDER BY m.channel_slug, m.message_id
+            FETCH FIRST {int(batch_size)} ROWS ONLY
+        """, params)
+        batch = [(slug, mid, text.read() if hasattr(text, "read") else text) for slug, mid, text in cur.fetchall()]
+        if not batch:
+            return
+        yield batch
+        after = """
+            AND (m.channel_slug > :slug OR (m.channel_slug = :slug AND m.message_id > :after))"""
+        params = {"slug": batch[-1][0], "after": batch[-1][1]}
+
+
+class SentimentStage:
+    """Scores message batches through the content-hash cache and stores the results."""
+
+    def __init__(self, cur, scorer: Optional[LexiconScorer] = None) -> None:
+        self.cur = cur
+        self.scorer = scorer or LexiconScorer.from_csv()
+        self.scored = 0
+        self.cached = 0
+        ensure_sentiment_tables(cur)
+
+    def _lookup(self, hashes: Sequence[str]) -> Dict[str, Tuple[float, float]]:
+        found: Dict[str, Tuple[float, float]] = {}
+        for start in range(0, len(hashes), _LOOKUP_CHUNK):
+            chunk = hashes[start:start + _LOOKUP_CHUNK]
+            binds = {f"h{i}": h for i, h in enumerate(chunk)}
+            self.cur.execute(f"""
+                SELECT content_hash, sentiment_score, confidence_score
+                FROM telegram_raw.sentiment_cache
+                WHERE content_hash IN ({", ".join(f":{name}" for name in binds)})
+            """, binds)
+            found.update((h, (float(s), float(c))) for h, s, c in self.cur.fetchall())
+        return found
+
+    def process(self, rows: Sequence[Tuple[str, int, Optional[str]]]) -> Dict[MessageKey, Tuple[float, float]]:
+        """Score and store (channel_slug, message_id, text) rows, replacing earlier scores.
+
+        Args:
+            rows: One batch of messages; the caller commits
+
+        Returns:
+            (channel_slug, message_id) -> (sentiment_score, confidence_score)
+        """
+        if not rows:
+            return {}
+        tokens = [self.scorer.tokens(text) for _, _, text in rows]
+        hashes = [self.scorer.content_hash(t) for t in tokens]
+        unique = list(dict.fromkeys(hashes))
+        known = self._lookup(unique)
+
+        missing = [h for h in unique if h not in known]
+        if missing:
+            first = {}
+            for h, t in zip(hashes, tokens):
+                first.setdefault(h, t)
+            scores, confidence = self.scorer.score_tokens([first[h] for h in missing])
+            fresh = [(h, round(float(s), 4), round(float(c), 4)) for h, s, c in zip(missing, scores, confidence)]
+            self.cur.executemany(
+                """
+                MERGE INTO telegram_raw.sentiment_cache tgt
+                USING (SELECT :1 AS content_hash, :2 AS sentiment_score, :3 AS confidence_score FROM dual) src
+                ON (tgt.content_hash = src.content_hash)
+                WHEN NOT MATCHED THEN INSERT (content_hash, sentiment_score, confidence_score)
+                VALUES (src.content_hash, src.sentiment_score, src.confidence_score)
+                """,
+                fresh,
+            )
+            known.update((h, (s, c)) for h, s, c in fresh)
+        self.scored += len(missing)
+        self.cached += len(rows) - len(missing)
+
+        keyed = {(slug, mid): h for (slug, mid, _), h in zip(rows, hashes)}
+        results = {key: known[h] for key, h in keyed.items()}
+        self.cur.executemany(
+            "DELETE FROM telegram_raw.message_sentiment WHERE channel_slug = :1 AND message_id = :2",
+            list(keyed),
+        )
+        self.cur.executemany(
+            """
+            INSERT INTO telegram_raw.message_sentiment (
+                channel_slug, message_id, content_hash, sentiment_score, confidence_score
+            ) VALUES (:1, :2, :3, :4, :5)
+            """,
+            [(*key, h, *results[key]) for key, h in keyed.items()],
+        )
+        return results
+
+
+def sync_mart(cur, overwrite: bool = False) -> int:
+    """Copy stored scores onto `telegram_mart.messages` in one set-based UPDATE.
+
+    Only rows without a score are touched unless `overwrite`, so this also
+    restores scores after the mart is rebuilt. The caller commits.
+
+    Returns:
+        Number of mart rows updated
+    """
+    only_missing = "" if overwrite else "m.sentiment_score IS NULL AND"
+    # Mart channel names are the raw channel slugs
+    score_of_row = """
+            FROM telegram_raw.message_sentiment s
+            JOIN telegram_mart.channels c ON c.channel_name = s.channel_slug
+            WHERE c.channel_id = m.channel_id AND s.message_id = m.message_id"""
+    cur.execute(f"""
+        UPDATE telegram_mart.messages m
+        SET (sentiment_score, confidence_score) = (
+            SELECT s.sentiment_score, s.confidence_score{score_of_row}
+        )
+        WHERE {only_missing} EXISTS (
+            SELECT 1{score_of_row}
+        )
+    """)
+    return cur.rowcount
@@ -0,0 +1,59 @@
+"""CLI script to score the sentiment of newly loaded messages.
+
+Usage:
+    python -m src.sentiment.score_messages
+    python -m src.sentiment.score_messages --lexicon my_lexicon.csv --rescore
+
+Messages in TELEGRAM_RAW.MESSAGES without a row in
+TELEGRAM_RAW.MESSAGE_SENTIMENT are scored in batches. Texts already scored
+with the same lexicon (reposts, reloads) are served from
+TELEGRAM_RAW.SENTIMENT_CACHE. Scores are then copied onto the mart rows that
+lack one, and the `sentiment` data-version watermark is bumped so API caches
+revalidate. `--rescore` scores every message again (after a lexicon change)
+and overwrites the mart scores.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+from src.db import get_connection
+from src.db.watermark import bump_watermark
+from src.sentiment import DEFAULT_LEXICON, LexiconScorer, SentimentStage, iter_unscored, sync_mart
+
+
+def main(lexicon: str = str(DEFAULT_LEXICON), batch_size: int = 5000, rescore: bool = False) -> None:
+    started = time.perf_counter()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        stage = SentimentStage(cur, LexiconScorer.from_csv(Path(lexicon)))
+        processed = 0
+        pbar = tqdm(iter_unscored(conn.cursor(), batch_size, rescore), desc="Scoring sentiment", unit="batch")
+        for batch in pbar:
+            stage.process(batch)
+            conn.commit()
+            processed += len(batch)
+            pbar.set_postfix(messages=processed, cached=stage.cached)
+
+        updated = sync_mart(cur, overwrite=rescore)
+        if processed or updated:
+            bump_watermark(cur, "sentiment")
+        conn.commit()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Scored {processed} messages ({stage.scored} new texts, {stage.cached} from cache) "
+        f"in {elapsed:.1f}s; updated {updated} mart rows"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score message sentiment with a local lexicon")
+    parser.add_argument("--lexicon", default=str(DEFAULT_LEXICON), help="Lexicon CSV (term, score, kind)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--rescore", action="store_true", help="Score every message again and overwrite the mart")
+    args = parser.parse_args()
+    main(args.lexicon, args.batch_size, args.rescore)
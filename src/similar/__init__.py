@@ -0,0 +1,418 @@
+"""Similar-message lookup over hashed TF-IDF vectors with an IVF index.
+
+Messages are turned into vectors without any model download or network call:
+
+1. Words are normalised as for mention extraction, with every number (prices,
+   phone numbers) folded into one token so that reposts at a new price stay
+   close. Every word and word bigram is hashed into one of `N_FEATURES`
+   buckets (no vocabulary to maintain).
+2. Counts get sublinear TF and an IDF fitted on the first batch the index
+   sees (`python -m src.similar.build_index` refits it on the whole table).
+3. The sparse TF-IDF rows (SciPy CSR) are L2-normalised and projected onto
+   `DIM` dimensions with a fixed Gaussian random projection, which preserves
+   cosine similarity up to a small distortion, then normalised again.
+
+Vectors are stored as int8 (components of a unit vector scaled by
+`QUANT_SCALE`, 128 bytes per message), grouped by their nearest of `nlist`
+spherical k-means centroids (an inverted-file index). A query scores the centroids,
+then scans only the `nprobe` closest lists, so its cost grows with
+n * nprobe / nlist instead of n. Corpora below `MIN_IVF_SIZE` use one list
+(exact search).
+
+Telegram message ids are only unique within a channel, so messages are
+addressed by (channel_slug, message_id). Internally each is one int64 key,
+the channel's position in the index's channel table in the high 32 bits and
+the message id in the low 32 bits, so lookups and exclusions stay vectorised.
+
+New messages are vectorised with the frozen IDF and appended to their
+nearest list on the next `save`. The centroids are retrained when the index
+has grown 4x since they were fitted. The index file is written atomically and
+memory-mapped by readers, so API workers share one copy of the vectors.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import re
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.mentions import normalize_token
+
+N_FEATURES = 1 << 16
+DIM = 128
+MIN_IVF_SIZE = 20_000
+DEFAULT_NPROBE = 16
+# Projected unit vectors have components well inside +-0.5
+QUANT_SCALE = 254.0
+
+_MAGIC = b"SIMX2\n"
+_TOKEN = re.compile(r"\w+")
+_DIGIT = re.compile(r"\d")
+# Odd multipliers mixing the two word hashes of a bigram
+_BIGRAM_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F], dtype=np.uint64)
+_TOKEN_CACHE_SIZE = 1 << 20
+_ALIGN = 64
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+# (channel_slug, message_id)
+MessageKey = Tuple[str, int]
+# (channel_slug, message_id, cosine similarity)
+Hit = Tuple[str, int, float]
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def _quantize(x: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(x * QUANT_SCALE), -127, 127).astype(np.int8)
+
+
+class HashedTfidf:
+    """Hashed word/bigram TF-IDF, randomly projected to dense unit vectors."""
+
+    def __init__(self, dim: int = DIM, seed: int = 7, idf: Optional[np.ndarray] = None) -> None:
+        self.dim = dim
+        self.seed = seed
+        self.idf = idf
+        rng = np.random.default_rng(seed)
+        self.projection = rng.standard_normal((N_FEATURES, dim), dtype=np.float32)
+        self._token_cache: Dict[str, int] = {}
+
+    def _token_hashes(self, text: Optional[str]) -> List[int]:
+        cache = self._token_cache
+        tokens = _TOKEN.findall((text or "").casefold())
+        hashes = list(map(cache.get, tokens))
+        if None in hashes:
+            if len(cache) > _TOKEN_CACHE_SIZE:
+                cache.clear()
+            for i, (token, h) in enumerate(zip(tokens, hashes)):
+                if h is None:
+                    word = "#" if _DIGIT.search(token) else normalize_token(token)
+                    hashes[i] = cache[token] = zlib.crc32(word.encode("utf-8"))
+        return hashes
+
+    def term_matrix(self, texts: Sequence[Optional[str]]) -> sparse.csr_matrix:
+        """Sublinear term frequencies of words and word bigrams, one row per text."""
+        per_text = [self._token_hashes(text) for text in texts]
+        lengths = np.array([len(h) for h in per_text], dtype=np.int64)
+        words = np.fromiter((h for hashes in per_text for h in hashes), dtype=np.uint64, count=int(lengths.sum()))
+        # Bigrams pair each word with the next one of the same text
+        follows = np.ones(len(words), dtype=bool)
+        follows[np.cumsum(lengths)[lengths > 0] - 1] = False
+        first = np.flatnonzero(follows[:-1]) if len(words) else np.zeros(0, dtype=np.int64)
+        bigrams = (words[first] * _BIGRAM_MIX[0]) ^ (words[first + 1] * _BIGRAM_MIX[1])
+        features = np.concatenate([words, bigrams >> np.uint64(32)]) & np.uint64(N_FEATURES - 1)
+        word_rows = np.repeat(np.arange(len(texts)), lengths)
+        rows = np.concatenate([word_rows, word_rows[first]])
+        tf = sparse.csr_matrix(
+            (np.ones(len(features), dtype=np.float32), (rows, features.astype(np.int32))),
+            shape=(len(texts), N_FEATURES),
+        )
+        tf.sum_duplicates()
+        np.log(tf.data, out=tf.data)
+        tf.data += 1.0
+        return tf
+
+    def fit(self, texts: Sequence[Optional[str]]) -> "HashedTfidf":
+        return self.fit_batches([texts])
+
+    def fit_batches(self, batches: Iterable[Sequence[Optional[str]]]) -> "HashedTfidf":
+        """Fit the IDF on a corpus streamed in batches."""
+        df = np.zeros(N_FEATURES, dtype=np.int64)
+        docs = 0
+        for texts in batches:
+            tf = self.term_matrix(texts)
+            df += np.bincount(tf.indices, minlength=N_FEATURES)
+            docs += tf.shape[0]
+        self.idf = (np.log((1 + docs) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Unit vectors (n, dim) float32, and a mask of texts that had any words."""
+        tf = self.term_matrix(texts)
+        weighted = tf @ sparse.diags(self.idf)
+        dense = _normalize_rows(np.asarray(weighted @ self.projection, dtype=np.float32))
+        return dense, tf.getnnz(axis=1) > 0
+
+
+def _spherical_kmeans(x: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        labels = _nearest(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        empty = ~sums.any(axis=1)
+        sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    labels = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), chunk):
+        block = np.asarray(x[start:start + chunk], dtype=np.float32)
+        labels[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+class SimilarIndex:
+    """Inverted-file index of message vectors, addressed by `MessageKey`."""
+
+    def __init__(self, vectorizer: Optional[HashedTfidf] = None, channels: Sequence[str] = ()) -> None:
+        self.vectorizer = vectorizer or HashedTfidf()
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self.offsets = np.zeros(2, dtype=np.int64)
+        self.channels: List[str] = list(channels)
+        self._channel_codes = {slug: code for code, slug in enumerate(self.channels)}
+        # Packed keys (see the module docstring), in list order
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, self.vectorizer.dim), dtype=np.int8)
+        self._pending_ids: List[np.ndarray] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._id_order: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids) + sum(len(i) for i in self._pending_ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.offsets) - 1
+
+    def _pack(self, channel_slug: str, message_id: int, add: bool = False) -> Optional[int]:
+        """Packed key of a message; None for a channel the index has never seen (unless `add`)."""
+        code = self._channel_codes.get(channel_slug)
+        if code is None:
+            if not add:
+                return None
+            code = self._channel_codes[channel_slug] = len(self.channels)
+            self.channels.append(channel_slug)
+        if not 0 <= message_id <= _ID_MASK:
+            raise ValueError(f"Message id {message_id} does not fit in {_ID_BITS} bits")
+        return (code << _ID_BITS) | message_id
+
+    def _unpack(self, key: int) -> MessageKey:
+        return self.channels[key >> _ID_BITS], key & _ID_MASK
+
+    def _row_of(self, key: int) -> Optional[int]:
+        if self._id_order is None:
+            self._id_order = np.argsort(self.ids, kind="stable")
+        pos = np.searchsorted(self.ids, key, sorter=self._id_order)
+        if pos < len(self.ids) and self.ids[self._id_order[pos]] == key:
+            return int(self._id_order[pos])
+        return None
+
+    def _vector_of_key(self, key: int) -> Optional[np.ndarray]:
+        row = self._row_of(key)
+        if row is not None:
+            return self.vectors[row] / np.float32(QUANT_SCALE)
+        for ids, vectors in zip(self._pending_ids, self._pending_vectors):
+            hit = np.flatnonzero(ids == key)
+            if len(hit):
+                return vectors[hit[0]] / np.float32(QUANT_SCALE)
+        return None
+
+    def vector_of(self, channel_slug: str, message_id: int) -> Optional[np.ndarray]:
+        """Stored vector of an indexed message."""
+        key = self._pack(channel_slug, message_id)
+        return None if key is None else self._vector_of_key(key)
+
+    def add(self, messages: Sequence[Tuple[str, int, Optional[str]]]) -> int:
+        """Vectorise and queue (channel_slug, message_id, text) rows; returns how many were new.
+
+        Messages already indexed and messages without words are skipped. The
+        IDF is fitted on the first batch if the index has none yet.
+        """
+        by_key = {self._pack(slug, int(mid), add=True): text for slug, mid, text in messages}
+        if self.vectorizer.idf is None:
+            self.vectorizer.fit(list(by_key.values()))
+        ids = np.fromiter(by_key, dtype=np.int64, count=len(by_key))
+        known = np.isin(ids, np.concatenate([self.ids, *self._pending_ids]))
+        fresh = [m for m, seen in zip(by_key.items(), known) if not seen]
+        if not fresh:
+            return 0
+        vectors, ok = self.vectorizer.transform([text for _, text in fresh])
+        ids = np.array([key for key, _ in fresh], dtype=np.int64)[ok]
+        self._pending_ids.append(ids)
+        self._pending_vectors.append(_quantize(vectors[ok]))
+        return len(ids)
+
+    def compact(self) -> None:
+        """Merge queued vectors into the lists, retraining centroids when the index has grown 4x."""
+        if not self._pending_ids:
+            return
+        ids = np.concatenate([self.ids, *self._pending_ids])
+        vectors = np.concatenate([np.asarray(self.vectors), *self._pending_vectors])
+        self._pending_ids, self._pending_vectors = [], []
+
+        if len(ids) >= MIN_IVF_SIZE and (self.centroids is None or len(ids) > 4 * self.trained_size):
+            nlist = int(np.sqrt(len(ids)))
+            sample = np.random.default_rng(0).choice(len(ids), min(len(ids), 64 * nlist), replace=False)
+            self.centroids = _spherical_kmeans(vectors[sample] / np.float32(QUANT_SCALE), nlist)
+            self.trained_size = len(ids)
+
+        if self.centroids is None:
+            labels = np.zeros(len(ids), dtype=np.int32)
+            nlist = 1
+        else:
+            labels = _nearest(vectors, self.centroids)
+            nlist = len(self.centroids)
+        order = np.argsort(labels, kind="stable")
+        self.ids, self.vectors = ids[order], vectors[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+        self._id_order = None
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        nprobe: int = DEFAULT_NPROBE,
+        exclude: Iterable[MessageKey] = (),
+    ) -> List[Hit]:
+        """(channel_slug, message_id, cosine similarity) of the `k` best matches, best first."""
+        query = np.asarray(query, dtype=np.float32)
+        if self.centroids is not None and self.nlist > nprobe:
+            probe = np.argpartition(-(self.centroids @ query), nprobe)[:nprobe]
+        else:
+            probe = range(self.nlist)
+        scores, ids = [], []
+        for lst in probe:
+            lo, hi = self.offsets[lst], self.offsets[lst + 1]
+            if hi > lo:
+                scores.append(self.vectors[lo:hi] @ query)
+                ids.append(self.ids[lo:hi])
+        for pending_ids, pending_vectors in zip(self._pending_ids, self._pending_vectors):
+            scores.append(pending_vectors @ query)
+            ids.append(pending_ids)
+        if not scores:
+            return []
+        scores, ids = np.concatenate(scores) / np.float32(QUANT_SCALE), np.concatenate(ids)
+        excluded = [key for key in (self._pack(slug, mid) for slug, mid in exclude) if key is not None]
+        scores[np.isin(ids, excluded)] = -np.inf
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(*self._unpack(int(ids[i])), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def similar_to(
+        self, channel_slug: str, message_id: int, k: int = 10, nprobe: int = DEFAULT_NPROBE
+    ) -> Optional[List[Hit]]:
+        """Messages most similar to an indexed one, or None if it is not indexed."""
+        vector = self.vector_of(channel_slug, message_id)
+        if vector is None:
+            return None
+        return self.search(vector, k, nprobe, exclude=((channel_slug, message_id),))
+
+    def similar_to_text(self, text: str, k: int = 10, nprobe: int = DEFAULT_NPROBE) -> List[Hit]:
+        vectors, ok = self.vectorizer.transform([text])
+        return self.search(vectors[0], k, nprobe) if ok[0] else []
+
+    def save(self, path: Path) -> None:
+        """Compact and write the index atomically (temp file, then rename)."""
+        self.compact()
+        header = {
+            "dim": self.vectorizer.dim,
+            "seed": self.vectorizer.seed,
+            "size": len(self.ids),
+            "nlist": self.nlist,
+            "trained": self.centroids is not None,
+            "trained_size": self.trained_size,
+            "channels": self.channels,
+        }
+        raw_header = json.dumps(header).encode("utf-8")
+        idf = self.vectorizer.idf if self.vectorizer.idf is not None else np.ones(N_FEATURES, dtype=np.float32)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            f.write(_MAGIC + struct.pack("<Q", len(raw_header)) + raw_header)
+            arrays = [idf.astype(np.float32), self.offsets, self.ids]
+            if self.centroids is not None:
+                arrays.append(self.centroids.astype(np.float32))
+            for array in arrays:
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            f.write(np.ascontiguousarray(self.vectors, dtype=np.int8).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SimilarIndex":
+        """Read an index written by `save`; the vectors are memory-mapped read-only."""
+        with Path(path).open("rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(
+                    f"{path} is not a similar-message index of this version; rebuild it with python -m src.similar.build_index"
+                )
+            (size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+            dim, n, nlist = header["dim"], header["size"], header["nlist"]
+            idf = np.fromfile(f, dtype=np.float32, count=N_FEATURES)
+            index = cls(HashedTfidf(dim, header["seed"], idf), header["channels"])
+            index.offsets = np.fromfile(f, dtype=np.int64, count=nlist + 1)
+            index.ids = np.fromfile(f, dtype=np.int64, count=n)
+            if header["trained"]:
+                index.centroids = np.fromfile(f, dtype=np.float32, count=nlist * dim).reshape(nlist, dim)
+            index.trained_size = header["trained_size"]
+            offset = f.tell() + (-f.tell() % _ALIGN)
+        if n:
+            index.vectors = np.memmap(path, dtype=np.int8, mode="r", offset=offset, shape=(n, dim))
+        return index
+
+
+@contextmanager
+def update_index(path: Path, fresh: bool = False) -> Iterator[SimilarIndex]:
+    """Load (or create) the index at `path`, yield it for additions and save it.
+
+    An exclusive lock on `<path>.lock` serialises concurrent writers.
+
+    Args:
+        path: Index file
+        fresh: Start from an empty index (rebuilds) instead of the saved one
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        index = SimilarIndex.load(path) if path.exists() and not fresh else SimilarIndex()
+        yield index
+        index.save(path)
+
+
+class IndexReader:
+    """Serves the index to API workers, reloading it when the file changes."""
+
+    def __init__(self, path: Path, check_interval: float = 60.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._index: Optional[SimilarIndex] = None
+        self._mtime: Optional[float] = None
+        self._checked = float("-inf")
+
+    def get(self, monotonic: float) -> Optional[SimilarIndex]:
+        """The current index, or None if none has been built yet.
+
+        Args:
+            monotonic: Current `time.monotonic()`; the file is stat'ed at most once per `check_interval`
+        """
+        if monotonic - self._checked < self.check_interval:
+            return self._index
+        self._checked = monotonic
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return self._index
+        if mtime != self._mtime:
+            self._index = SimilarIndex.load(self.path)
+            self._mtime = mtime
+        return self._index
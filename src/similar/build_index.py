@@ -0,0 +1,72 @@
+"""CLI script to rebuild the similar-message index from TELEGRAM_RAW.MESSAGES.
+
+Usage:
+    python -m src.similar.build_index
+    python -m src.similar.build_index --since 2025-01-01 --skip-duplicates
+
+The loader (`--index-similar`) keeps the index up to date incrementally, with
+the IDF fitted on the first file it indexed. This script reads the table
+twice: once to fit the IDF on the whole corpus, once to vectorise and index
+every message, then replaces `SIMILAR_INDEX` atomically. API workers pick the
+new file up within `SIMILAR_CHECK_SECONDS`.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from src.constants import env
+from src.db import get_connection
+from src.similar import update_index
+
+
+def iter_texts(cur, since: Optional[str], skip_duplicates: bool, batch_size: int) -> Iterator[List[Tuple[str, int, Optional[str]]]]:
+    """Yield batches of (channel_slug, message_id, text), oldest first."""
+    where, params = [], {}
+    join = ""
+    if since:
+        where.append("m.message_ts >= TO_DATE(:since, 'YYYY-MM-DD')")
+        params["since"] = since
+    if skip_duplicates:
+        join = """LEFT JOIN telegram_raw.message_clusters mc
+            ON mc.channel_slug = m.channel_slug AND mc.message_id = m.message_id"""
+        where.append("(mc.cluster_id IS NULL OR (mc.cluster_slug = m.channel_slug AND mc.cluster_id = m.message_id))")
+    cur.arraysize = batch_size
+    cur.execute(f"""
+        SELECT m.channel_slug, m.message_id, JSON_VALUE(m.payload, '$.message' RETURNING CLOB)
+        FROM telegram_raw.messages m
+        {join}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY m.message_ts, m.channel_slug, m.message_id
+    """, params)
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            return
+        yield [(slug, mid, text.read() if hasattr(text, "read") else text) for slug, mid, text in batch]
+
+
+def main(since: Optional[str], skip_duplicates: bool = False, batch_size: int = 20000) -> None:
+    started = time.perf_counter()
+    with get_connection() as conn, update_index(Path(env.SIMILAR_INDEX), fresh=True) as index:
+        cur = conn.cursor()
+        batches = iter_texts(cur, since, skip_duplicates, batch_size)
+        index.vectorizer.fit_batches([text for *_, text in batch] for batch in tqdm(batches, desc="Fitting IDF", unit="batch"))
+        for batch in tqdm(iter_texts(cur, since, skip_duplicates, batch_size), desc="Indexing", unit="batch"):
+            index.add(batch)
+        print("Training and writing the index...")
+    elapsed = time.perf_counter() - started
+    print(f"Indexed {len(index)} messages in {index.nlist} lists ({elapsed:.1f}s) -> {env.SIMILAR_INDEX}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the similar-message index")
+    parser.add_argument("--since", help="Only index messages from this date (YYYY-MM-DD)")
+    parser.add_argument("--skip-duplicates", action="store_true", help="Index one message per near-duplicate cluster")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.since, args.skip_duplicates, args.batch_size)
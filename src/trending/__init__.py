@@ -0,0 +1,370 @@
+"""Streaming product trend detection over ingested mentions.
+
+This module provides:
+1. A count-min sketch for per-product mention counts in bounded memory
+2. Space-Saving heavy-hitter summaries per channel, which supply the candidates
+3. `TrendingStore`, a ring of hourly buckets updated as mentions are ingested
+   and queried for "what is spiking in the last N hours" without touching Oracle
+4. Binary snapshots so writers and API workers share state and restart warm
+
+Error bounds: each bucket's sketch has width w and depth d. A product's count in
+a bucket is over-estimated by at most e/w * N (N = mentions counted in that
+bucket, channel and global keys included) with probability at least 1 - e^-d,
+and is never under-estimated. Window counts sum bucket estimates, so a window's
+error bound is e/w times the mentions in the window. The defaults (w=2048, d=4)
+give 0.13% of the window's mentions with 98% confidence. Space-Saving keeps the
+k most frequent products per channel and bucket; a product is only missed as a
+candidate if it is outside the top k of every bucket in the window.
+
+Messages are counted once per bucket, so re-running extraction on the same
+messages does not inflate counts.
+"""
+from __future__ import annotations
+
+import calendar
+import fcntl
+import hashlib
+import json
+import math
+import os
+import struct
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_MAGIC = b"TRND1\n"
+ALL_CHANNELS = "*"
+
+
+def _epoch(ts: datetime) -> int:
+    """Seconds since the epoch; naive timestamps are taken as UTC."""
+    if ts.tzinfo is None:
+        return calendar.timegm(ts.timetuple())
+    return int(ts.timestamp())
+
+
+class CountMinSketch:
+    """Count-min sketch over string keys with 32-bit counters."""
+
+    def __init__(self, width: int = 2048, depth: int = 4, table: Optional[array] = None) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else array("i", bytes(4 * width * depth))
+        self.total = 0
+
+    @staticmethod
+    def _hashes(key: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def _cells(self, key: str) -> List[int]:
+        # Double hashing (Kirsch-Mitzenmacher): row i uses h1 + i * h2
+        h1, h2 = self._hashes(key)
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> None:
+        table = self.table
+        for cell in self._cells(key):
+            table[cell] += count
+        self.total += count
+
+    def estimate(self, key: str) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(key))
+
+
+class SpaceSaving:
+    """Space-Saving top-k summary: the k most frequent keys, each over-counted by at most N/k."""
+
+    def __init__(self, k: int = 32) -> None:
+        self.k = k
+        self.counts: Dict[str, int] = {}
+
+    def offer(self, key: str, count: int = 1) -> None:
+        counts = self.counts
+        if key in counts or len(counts) < self.k:
+            counts[key] = counts.get(key, 0) + count
+            return
+        victim = min(counts, key=counts.__getitem__)
+        counts[key] = counts.pop(victim) + count
+
+
+class _Bucket:
+    __slots__ = ("index", "sketch", "heavy", "seen")
+
+    def __init__(self, index: int, width: int, depth: int) -> None:
+        self.index = index
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy: Dict[str, SpaceSaving] = {}
+        self.seen: set[int] = set()
+
+
+def _message_key(channel: str, message_id: Any) -> int:
+    digest = hashlib.blake2b(f"{channel}\x1f{message_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class TrendingStore:
+    """Hourly (by default) buckets of mention sketches, kept for `retention` buckets."""
+
+    def __init__(
+        self,
+        bucket_seconds: int = 3600,
+        retention: int = 168,
+        width: int = 2048,
+        depth: int = 4,
+        top_k: int = 32,
+    ) -> None:
+        """Create an empty store.
+
+        Args:
+            bucket_seconds: Bucket length; queries are answered at this granularity
+            retention: Number of buckets kept (default one week of hours)
+            width: Sketch width; error bound is e / width of the window's mentions
+            depth: Sketch depth; the bound holds with probability 1 - e^-depth
+            top_k: Products tracked per channel and bucket as trend candidates
+        """
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self._buckets: List[Optional[_Bucket]] = [None] * retention
+        self.latest = -1
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _bucket(self, index: int, create: bool) -> Optional[_Bucket]:
+        slot = index % self.retention
+        bucket = self._buckets[slot]
+        if bucket is not None and bucket.index == index:
+            return bucket
+        if not create or index <= self.latest - self.retention:
+            return None
+        bucket = _Bucket(index, self.width, self.depth)
+        self._buckets[slot] = bucket
+        self.latest = max(self.latest, index)
+        return bucket
+
+    def add_mentions(self, mentions: Iterable[Tuple[datetime, str, Any, str]]) -> int:
+        """Count (timestamp, channel_slug, message_id, product_name) mentions.
+
+        Mentions of a message already counted in its bucket are skipped, as
+        are mentions older than the retention window.
+
+        Returns:
+            Number of mentions counted
+        """
+        counted = 0
+        fresh: set[int] = set()
+        for ts, channel, message_id, product in mentions:
+            bucket = self._bucket(_epoch(ts) // self.bucket_seconds, create=True)
+            if bucket is None:
+                continue
+            key = _message_key(channel, message_id)
+            if key in bucket.seen and key not in fresh:
+                continue
+            bucket.seen.add(key)
+            fresh.add(key)
+
+            bucket.sketch.add(f"{channel}\x1f{product}")
+            bucket.sketch.add(f"{ALL_CHANNELS}\x1f{product}")
+            for scope in (channel, ALL_CHANNELS):
+                summary = bucket.heavy.get(scope)
+                if summary is None:
+                    summary = bucket.heavy[scope] = SpaceSaving(self.top_k)
+                summary.offer(product)
+            counted += 1
+        return counted
+
+    def _window(self, end: int, count: int) -> List[_Bucket]:
+        return [b for b in (self._bucket(i, create=False) for i in range(end - count + 1, end + 1)) if b is not None]
+
+    def trending(
+        self,
+        hours: int = 1,
+        baseline_hours: int = 24,
+        channel: Optional[str] = None,
+        limit: int = 10,
+        min_count: int = 3,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Products whose mention rate in the last `hours` most exceeds the preceding baseline.
+
+        Args:
+            hours: Window length in buckets, ending with the bucket containing `now`
+            baseline_hours: Buckets before the window used as the expected rate
+            channel: Channel slug, or None for all channels
+            limit: Number of products to return
+            min_count: Ignore products with fewer (estimated) mentions in the window
+            now: End of the window (default: current UTC time)
+
+        Returns:
+            Dictionary with the window bounds, error bound and ranked products
+        """
+        scope = channel or ALL_CHANNELS
+        end = _epoch(now or datetime.now(timezone.utc)) // self.bucket_seconds
+        window = self._window(end, hours)
+        baseline = self._window(end - hours, baseline_hours)
+
+        candidates = set()
+        for bucket in window:
+            summary = bucket.heavy.get(scope)
+            if summary is not None:
+                candidates.update(summary.counts)
+
+        # Every mention is added under its channel key and the all-channels key
+        sketch_total = sum(b.sketch.total for b in window)
+        items = []
+        for product in candidates:
+            key = f"{scope}\x1f{product}"
+            count = sum(b.sketch.estimate(key) for b in window)
+            if count < min_count:
+                continue
+            base = sum(b.sketch.estimate(key) for b in baseline)
+            expected = base * hours / baseline_hours if baseline_hours else 0.0
+            items.append({
+                "product_name": product,
+                "mention_count": count,
+                "baseline_count": base,
+                "expected_count": round(expected, 2),
+                "growth": round((count + 1) / (expected + 1), 3),
+            })
+        items.sort(key=lambda item: (item["growth"], item["mention_count"]), reverse=True)
+
+        def bucket_time(index: int) -> datetime:
+            return datetime.fromtimestamp(index * self.bucket_seconds, timezone.utc).replace(tzinfo=None)
+
+        return {
+            "channel": channel,
+            "window_start": bucket_time(end - hours + 1),
+            "window_end": bucket_time(end + 1),
+            "baseline_start": bucket_time(end - hours - baseline_hours + 1),
+            "window_mentions": sketch_total // 2,
+            "error_bound": math.ceil(self.epsilon * sketch_total),
+            "confidence": round(1 - self.delta, 4),
+            "products": items[:limit],
+        }
+
+    def save(self, path: Path) -> None:
+        """Write a snapshot atomically (temp file, then rename)."""
+        buckets = [b for b in self._buckets if b is not None]
+        header = {
+            "bucket_seconds": self.bucket_seconds,
+            "retention": self.retention,
+            "width": self.width,
+            "depth": self.depth,
+            "top_k": self.top_k,
+            "latest": self.latest,
+            "buckets": [
+                {
+                    "index": b.index,
+                    "total": b.sketch.total,
+                    "seen": len(b.seen),
+                    "heavy": {scope: s.counts for scope, s in b.heavy.items()},
+                }
+                for b in buckets
+            ],
+        }
+        raw_header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            f.write(_MAGIC + struct.pack("<Q", len(raw_header)) + raw_header)
+            for b in buckets:
+                b.sketch.table.tofile(f)
+                array("q", sorted(b.seen)).tofile(f)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TrendingStore":
+        """Read a snapshot written by `save`."""
+        with Path(path).open("rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a trending snapshot")
+            (size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+            store = cls(header["bucket_seconds"], header["retention"], header["width"], header["depth"], header["top_k"])
+            store.latest = header["latest"]
+            for meta in header["buckets"]:
+                bucket = _Bucket(meta["index"], store.width, store.depth)
+                bucket.sketch.table = array("i")
+                bucket.sketch.table.fromfile(f, store.width * store.depth)
+                bucket.sketch.total = meta["total"]
+                seen = array("q")
+                seen.fromfile(f, meta["seen"])
+                bucket.seen = set(seen)
+                for scope, counts in meta["heavy"].items():
+                    summary = bucket.heavy[scope] = SpaceSaving(store.top_k)
+                    summary.counts = counts
+                store._buckets[bucket.index % store.retention] = bucket
+        return store
+
+
+@contextmanager
+def update_snapshot(path: Path) -> Iterator[TrendingStore]:
+    """Load (or create) the snapshot at `path`, yield it for updates and save it.
+
+    An exclusive lock on `<path>.lock` serialises concurrent writers.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        store = TrendingStore.load(path) if path.exists() else TrendingStore()
+        yield store
+        store.save(path)
+
+
+class SnapshotReader:
+    """Serves a snapshot to API workers, reloading it when the file changes."""
+
+    def __init__(self, path: Path, check_interval: float = 30.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._store: Optional[TrendingStore] = None
+        self._mtime: Optional[float] = None
+        self._checked = float("-inf")
+
+    def get(self, monotonic: float) -> Optional[TrendingStore]:
+        """The current store, or None if no snapshot has been written yet.
+
+        Args:
+            monotonic: Current `time.monotonic()`; the file is stat'ed at most once per `check_interval`
+        """
+        if monotonic - self._checked < self.check_interval:
+            return self._store
+        self._checked = monotonic
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return self._store
+        if mtime != self._mtime:
+            self._store = TrendingStore.load(self.path)
+            self._mtime = mtime
+        return self._store
+
+
+def mention_events(
+    messages: Iterable[Tuple[Any, ...]], rows: Iterable[Tuple[Any, ...]]
+) -> Iterator[Tuple[datetime, str, Any, str]]:
+    """Pair mention rows with their message timestamps for `TrendingStore.add_mentions`.
+
+    Args:
+        messages: (message_id, channel_slug, text, message_ts) tuples the rows were extracted from
+        rows: Output of `MentionExtractor.extract_batch`
+    """
+    timestamps = {(mid, slug): ts for mid, slug, _, ts in messages if ts is not None}
+    for message_id, channel_slug, product_name, *_ in rows:
+        ts = timestamps.get((message_id, channel_slug))
+        if ts is not None:
+            yield ts, channel_slug, message_id, product_name
@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import json
+import os
+import uuid
 from pathlib import Path
 from typing import Any
 
@@ -19,10 +21,19 @@ def ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def write_json_atomic(path: Path, data: Any) -> None:
-    """Write JSON atomically (write temp then rename) to avoid partial files."""
+def write_json_atomic(path: Path, data: Any, indent: int | None = 2) -> None:
+    """Write JSON atomically (write temp then rename) to avoid partial files.
+
+    Pass `indent=None` for large machine-read files (no whitespace, faster).
+    """
     ensure_parent(path)
-    tmp = path.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-    tmp.replace(path)
+    # A unique temp name per writer, so concurrent writers (other processes or
+    # hosts sharing the directory) never write into the same file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent, default=str)
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,38 @@
+"""Shared fixtures: the API and pipeline code against the SQLite stand-in (`src/db/local.py`)."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.constants import env  # noqa: E402
+
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    """Point `get_db` at a fresh stand-in seeded with a few synthetic channels."""
+    from benchmarks.synthetic import channel_names, seed_mart
+    from src.db.local import connect_local
+
+    monkeypatch.setattr(env, "DB_BACKEND", "local")
+    monkeypatch.setattr(env, "LOCAL_DB_DIR", str(tmp_path))
+    monkeypatch.setattr(env, "API_CACHE_TTL", 0)
+    conn = connect_local(tmp_path)
+    dataset = seed_mart(conn, channel_names(3), per_channel=200, days=30)
+    conn.commit()
+    conn.close()
+    return dataset
+
+
+@pytest.fixture
+def breaker():
+    """The API's circuit breaker, closed again after the test."""
+    from api.query import breaker
+
+    yield breaker
+    breaker.record_success()
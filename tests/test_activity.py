@@ -0,0 +1,62 @@
+"""Activity rollups and series downsampling (`src.activity`)."""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.activity import lttb, refresh_buckets
+
+
+def test_lttb_keeps_ends_order_and_an_isolated_spike():
+    rng = np.random.default_rng(0)
+    y = rng.normal(100, 5, 10_000)
+    y[6_543] = 1_000
+    keep = lttb(y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 6_543 in keep
+
+    # Short series, or thresholds too small to bucket, come back whole
+    assert lttb(y[:50], 200).tolist() == list(range(50))
+    assert lttb(y[:50], 2).tolist() == list(range(50))
+
+
+def _bucket_start(day: datetime, granularity: str) -> datetime:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+@pytest.mark.parametrize("granularity", ["day", "week", "month"])
+def test_rollups_match_the_raw_daily_query(local_db, granularity):
+    import api.crud as crud
+    from api.database import get_db
+    from src.db import get_connection
+
+    with get_connection() as conn:
+        assert refresh_buckets(conn.cursor()) > 0
+        conn.commit()
+
+    start, end = datetime(2000, 1, 1), local_db.end + timedelta(days=1)
+    with get_db() as db:
+        for channel in local_db.channels:
+            raw = crud.get_channel_activity(db, channel, start, end)
+            series = crud.get_activity_series(db, channel, granularity, start, end, points=10_000)
+            assert series["total_messages"] == raw.total_messages
+            assert series["total_media"] == raw.total_media
+
+            expected = Counter()
+            for day in raw.activity_history:
+                expected[_bucket_start(day.date.replace(tzinfo=None), granularity)] += day.message_count
+            got = {
+                datetime.utcfromtimestamp(t): count
+                for t, count in zip(series["series"]["t"], series["series"]["message_count"])
+                if count
+            }
+            assert got == dict(expected)
@@ -0,0 +1,82 @@
+"""Detection aggregates (`src.image.analytics`) on the SQLite stand-in."""
+from __future__ import annotations
+
+import pytest
+
+from src.db.local import connect_local
+from src.image.analytics import record_enrichment
+
+
+def det(class_id: int, confidence: float, name: str = "bottle") -> dict:
+    return {"class": class_id, "name": name, "confidence": confidence, "bbox": [0, 0, 10, 10]}
+
+
+def daily(cur):
+    cur.execute("SELECT images_processed, images_with_detections, detection_count FROM telegram_raw.detection_daily")
+    return cur.fetchall()
+
+
+def per_class(cur):
+    cur.execute("""
+        SELECT class_id, class_name, detection_count, image_count
+        FROM telegram_raw.detection_class_daily ORDER BY class_id
+    """)
+    return cur.fetchall()
+
+
+def test_failed_downloads_keep_their_earlier_detections(tmp_path):
+    conn = connect_local(tmp_path)
+    cur = conn.cursor()
+    record_enrichment(cur, "chan-a", "2025-03-01", [
+        (1, [det(39, 0.9)]),
+        (2, [det(39, 0.8), det(41, 0.7, "cup")]),
+        (3, []),
+    ])
+    assert daily(cur) == [(3, 2, 3)]
+
+    # Re-run: image 1 is processed again, images 2 and 3 fail to download
+    record_enrichment(cur, "chan-a", "2025-03-01", [(1, [det(39, 0.95), det(39, 0.6)])], failed=[2, 3])
+    # Image 2 still counts with its earlier detections; image 3 left no rows to keep
+    assert daily(cur) == [(2, 2, 4)]
+    assert per_class(cur) == [(39, "bottle", 3, 2), (41, "cup", 1, 1)]
+    cur.execute("SELECT message_id, COUNT(*) FROM telegram_raw.image_detections GROUP BY message_id ORDER BY 1")
+    assert cur.fetchall() == [(1, 2), (2, 2)]
+    conn.close()
+
+
+def test_failure_after_the_aggregates_persists_nothing(local_db, monkeypatch):
+    import src.image.analytics as analytics
+    from src.db import get_connection
+    from src.db.watermark import read_watermark
+
+    with get_connection() as conn:
+        record_enrichment(conn.cursor(), "chan-a", "2025-03-01", [(1, [det(39, 0.9)])])
+        conn.commit()
+        before = read_watermark(conn.cursor())
+
+    stored = []
+    store_aggregates = analytics.store_aggregates
+
+    def store_then_record(*args, **kwargs):
+        store_aggregates(*args, **kwargs)
+        stored.append(args[1:3])
+
+    def fail(cur, source):
+        raise RuntimeError("ORA-03113: end-of-file on communication channel")
+
+    monkeypatch.setattr(analytics, "store_aggregates", store_then_record)
+    monkeypatch.setattr(analytics, "bump_watermark", fail)
+    # Same shape as src.image.process_channel_images: one transaction for the channel-day
+    with pytest.raises(RuntimeError):
+        with get_connection() as conn:
+            record_enrichment(conn.cursor(), "chan-a", "2025-03-01", [(1, [det(39, 0.9)]), (2, [det(41, 0.7, "cup")])])
+            conn.commit()
+    assert stored
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        assert daily(cur) == [(1, 1, 1)]
+        assert per_class(cur) == [(39, "bottle", 1, 1)]
+        cur.execute("SELECT message_id FROM telegram_raw.image_detections")
+        assert cur.fetchall() == [(1,)]
+        assert read_watermark(cur) == before
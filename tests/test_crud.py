@@ -0,0 +1,83 @@
+"""Query helpers (`api.crud`) against the stand-in database."""
+from __future__ import annotations
+
+import random
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import api.crud as crud
+from src.constants import env
+
+
+def test_default_range_hits_the_query_cache(local_db, monkeypatch):
+    monkeypatch.setattr(env, "API_CACHE_TTL", 300)
+    crud.clear_query_caches()
+    queries = []
+    execute_query = crud.execute_query
+
+    def counting(db, name, *args, **kwargs):
+        queries.append(name)
+        return execute_query(db, name, *args, **kwargs)
+
+    monkeypatch.setattr(crud, "execute_query", counting)
+
+    from api.database import get_db
+
+    with get_db() as db:
+        for _ in range(3):
+            crud.get_channel_activity_payload(db, local_db.channels[0], *crud.default_range(None, None))
+    assert len(queries) == 1
+    crud.clear_query_caches()
+
+
+def test_default_range_rounds_now_up_to_the_cache_window(monkeypatch):
+    monkeypatch.setattr(env, "API_CACHE_TTL", 300)
+    start, end = crud.default_range(None, None)
+    assert end >= datetime.utcnow() and (end - datetime(1970, 1, 1)).total_seconds() % 300 == 0
+    assert start == end - timedelta(days=30)
+
+    given = datetime(2025, 3, 1, 12, 34, 56)
+    assert crud.default_range(given, given) == (given, given)
+
+    monkeypatch.setattr(env, "API_CACHE_TTL", 0)
+    assert crud.default_range(None, None)[1] <= datetime.utcnow()
+
+
+def test_query_cache_under_concurrent_access(monkeypatch):
+    monkeypatch.setattr(env, "API_CACHE_TTL", 300)
+    calls = []
+
+    @crud._query_cache(maxsize=4)
+    def lookup(db, key):
+        calls.append(key)
+        return key * 10
+
+    errors = []
+    start = threading.Barrier(8)
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        start.wait()
+        try:
+            for _ in range(5000):
+                key = rng.randrange(8)
+                assert lookup(None, key) == key * 10
+                if rng.random() < 0.01:
+                    lookup.cache_clear()
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=hammer, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    # Hits were served: far fewer queries than calls
+    assert len(calls) < 8 * 5000
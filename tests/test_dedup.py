@@ -0,0 +1,50 @@
+"""Near-duplicate clustering (`src.dedup`) on the SQLite stand-in."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from src.db.local import connect_local
+from src.dedup import DedupStage
+
+T0 = datetime(2025, 3, 1, 9, 0, 0)
+ADVERT = (
+    "new arrival vitamin c serum 30ml brightening formula for all skin types "
+    "price 1500 birr free delivery in addis call or message us today"
+)
+OTHER = (
+    "baby diapers size 4 pack of 60 extra soft with wetness indicator "
+    "price 2200 birr visit our shop near bole medhanialem"
+)
+
+
+def test_same_message_id_in_two_channels_clusters_separately(tmp_path):
+    conn = connect_local(tmp_path)
+    stage = DedupStage(conn.cursor())
+    # Message 7 exists in both channels with unrelated texts
+    clusters = stage.process([
+        (7, "chan-a", T0, ADVERT),
+        (7, "chan-b", T0 + timedelta(minutes=1), OTHER),
+    ])
+    assert clusters == {("chan-a", 7): ("chan-a", 7), ("chan-b", 7): ("chan-b", 7)}
+
+    # A cross-post of chan-a's advert joins chan-a's cluster, not chan-b's message 7
+    assert stage.process([(8, "chan-c", T0 + timedelta(hours=1), ADVERT.replace("1500", "1450"))]) == {
+        ("chan-c", 8): ("chan-a", 7),
+    }
+    conn.commit()
+
+    # A later run reloads the stored clusters by (channel, message id)
+    again = DedupStage(conn.cursor())
+    assert again.process([(9, "chan-b", T0 + timedelta(days=1), OTHER)]) == {("chan-b", 9): ("chan-b", 7)}
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT channel_slug, message_id, cluster_slug, cluster_id
+        FROM telegram_raw.message_clusters ORDER BY channel_slug, message_id
+    """)
+    assert cur.fetchall() == [
+        ("chan-a", 7, "chan-a", 7),
+        ("chan-b", 7, "chan-b", 7),
+        ("chan-b", 9, "chan-b", 7),
+        ("chan-c", 8, "chan-a", 7),
+    ]
+    conn.close()
@@ -0,0 +1,135 @@
+"""Photo downloads and the media cache (`src.image.downloader`) with a fake Telegram client."""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+from src.image.downloader import MediaCache, MediaDownloader, choose_size
+
+SIZES = (("s", 90, 67, 1500), ("m", 320, 240, 12000), ("x", 800, 600, 60000), ("y", 1280, 960, 140000))
+
+
+def photo_message(photo_id: int, message_id: int = 1, sizes=SIZES) -> dict:
+    return {
+        "id": message_id,
+        "channel_id": 7,
+        "photo": {
+            "id": photo_id,
+            "access_hash": 1,
+            "file_reference": "00ff",
+            "dc_id": 4,
+            "sizes": [{"type": t, "w": w, "h": h, "size": n} for t, w, h, n in sizes],
+        },
+    }
+
+
+class FakeClient:
+    """Records calls; each download takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.01, fail: frozenset = frozenset()) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.started = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def download_photo(self, ref, size_type: str) -> bytes:
+        self.calls.append((ref.photo_id, size_type))
+        self.started.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if ref.photo_id in self.fail:
+            raise RuntimeError("FILE_REFERENCE_EXPIRED")
+        return f"{ref.photo_id}:{size_type}".encode()
+
+
+def test_choose_size_smallest_covering_target():
+    assert choose_size(SIZES, 640) == "x"
+    assert choose_size(SIZES, 320) == "m"
+    # Nothing covers the target: the largest rendition
+    assert choose_size(SIZES, 2000) == "y"
+    # Portrait photos are measured by their longer side
+    assert choose_size((("m", 240, 320, 1), ("x", 480, 640, 2)), 600) == "x"
+    assert choose_size((), 640) is None
+
+
+def test_cache_hit_by_photo_id_and_size(tmp_path):
+    client = FakeClient()
+    downloader = MediaDownloader(client, MediaCache(tmp_path, 1 << 30, 86400), rate=0)
+
+    first = asyncio.run(downloader.fetch(photo_message(42, message_id=1)))
+    # A repost of the same photo in another message is served from disk
+    again = asyncio.run(downloader.fetch(photo_message(42, message_id=2)))
+    assert first == again
+    assert first.read_bytes() == b"42:x"
+    assert client.calls == [(42, "x")]
+    assert (downloader.stats.downloaded, downloader.stats.cached) == (1, 1)
+
+    # Another rendition of the same photo is a different cache entry
+    small = MediaDownloader(client, downloader.cache, rate=0, target_px=300)
+    assert asyncio.run(small.fetch(photo_message(42))).read_bytes() == b"42:m"
+    assert client.calls == [(42, "x"), (42, "m")]
+
+
+def test_concurrent_fetches_of_one_photo_download_once(tmp_path):
+    client = FakeClient(delay=0.05)
+    downloader = MediaDownloader(client, MediaCache(tmp_path, 1 << 30, 86400), rate=0)
+
+    paths = asyncio.run(downloader.fetch_many([photo_message(5, message_id=i) for i in range(10)]))
+    assert len(set(paths)) == 1
+    assert client.calls == [(5, "x")]
+    assert (downloader.stats.downloaded, downloader.stats.cached) == (1, 9)
+
+
+def test_failed_download_returns_none_and_is_retried_later(tmp_path):
+    client = FakeClient(fail=frozenset({9}))
+    downloader = MediaDownloader(client, MediaCache(tmp_path, 1 << 30, 86400), rate=0)
+
+    paths = asyncio.run(downloader.fetch_many([photo_message(9), photo_message(10)]))
+    assert paths[0] is None and paths[1] is not None
+    assert downloader.stats.failed == 1
+    assert "photo 9" in downloader.stats.errors[0]
+
+    client.fail = frozenset()
+    assert asyncio.run(downloader.fetch(photo_message(9))) is not None
+    assert client.calls.count((9, "x")) == 2
+
+
+def test_rate_and_concurrency_limits(tmp_path):
+    client = FakeClient(delay=0.02)
+    rate, concurrency = 20.0, 2
+    downloader = MediaDownloader(client, MediaCache(tmp_path, 1 << 30, 86400), concurrency=concurrency, rate=rate)
+
+    asyncio.run(downloader.fetch_many([photo_message(i) for i in range(8)]))
+    assert len(client.calls) == 8
+    assert client.max_in_flight <= concurrency
+    # The bucket starts full (`concurrency` tokens); every later start waits for a token
+    spread = client.started[-1] - client.started[0]
+    assert spread >= (8 - concurrency) / rate * 0.9
+
+
+def test_evict_by_age_then_least_recently_used(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=250, max_age_seconds=3600)
+    now = time.time()
+    paths = {}
+    for photo_id, age in ((1, 7200), (2, 300), (3, 200), (4, 100)):
+        paths[photo_id] = cache.put(photo_id, "x", b"\0" * 100)
+        os.utime(paths[photo_id], (now - age, now - age))
+
+    # Photo 1 is too old; of the rest, 2 is least recently used and the total (300) exceeds 250
+    assert cache.evict(now) == (2, 200)
+    assert not paths[1].exists() and not paths[2].exists()
+    assert paths[3].exists() and paths[4].exists()
+
+    # A cache hit refreshes the file's use time
+    assert cache.get(3, "x") is not None
+    assert cache.get(1, "x") is None
+    cache.max_bytes = 100
+    assert cache.evict() == (1, 100)
+    assert paths[3].exists() and not paths[4].exists()
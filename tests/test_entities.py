@@ -0,0 +1,40 @@
+"""Resolved-channel cache (`src.scraper.entities`) shared by concurrent scrapers."""
+from __future__ import annotations
+
+import json
+import threading
+
+from src.scraper.entities import EntityCache
+
+
+def test_concurrent_saves_keep_both_entries(tmp_path):
+    path = tmp_path / "entities.json"
+    a = EntityCache(path, ttl_seconds=3600)
+    b = EntityCache(path, ttl_seconds=3600)
+    a.put("chan-a", 1, 11)
+    b.put("chan-b", 2, 22)
+
+    # Pause A between re-reading the file and writing it back
+    read_done, resume = threading.Event(), threading.Event()
+    read = a._read
+
+    def slow_read():
+        entries = read()
+        read_done.set()
+        resume.wait(0.5)
+        return entries
+
+    a._read = slow_read
+    saver = threading.Thread(target=a.save)
+    saver.start()
+    assert read_done.wait(5)
+    b_saved = threading.Thread(target=b.save)
+    b_saved.start()
+    b_saved.join(0.2)
+    resume.set()
+    saver.join()
+    b_saved.join()
+
+    assert sorted(json.loads(path.read_text())) == ["chan-a", "chan-b"]
+    assert EntityCache(path, ttl_seconds=3600).get("chan-a").access_hash == 11
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,74 @@
+"""Conditional GETs (`api.http_cache`) against a stub watermark."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from email.utils import format_datetime
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import api.http_cache as http_cache
+from api.http_cache import ConditionalGetMiddleware, DataVersion
+
+WATERMARK = datetime(2025, 3, 1, 2, 30, 0)
+
+
+class StubVersion(DataVersion):
+    def __init__(self, values, on_change=None) -> None:
+        super().__init__(connect=None, ttl=0, on_change=on_change)
+        self.values = list(values)
+
+    def _read(self):
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def frozen_clock(monkeypatch, now: datetime) -> None:
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+
+    monkeypatch.setattr(http_cache, "datetime", Clock)
+
+
+@pytest.fixture
+def client():
+    from starlette.testclient import TestClient
+
+    app = Starlette(routes=[Route("/api/reports/x", lambda request: JSONResponse({"ok": True}))])
+    app.add_middleware(ConditionalGetMiddleware, version=StubVersion([WATERMARK] * 10), prefixes=("/api/reports",))
+    return TestClient(app)
+
+
+def test_if_modified_since_expires_at_midnight(client, monkeypatch):
+    frozen_clock(monkeypatch, datetime(2025, 3, 1, 18, 0, 0))
+    response = client.get("/api/reports/x")
+    last_modified = response.headers["last-modified"]
+    assert last_modified == format_datetime(WATERMARK.replace(tzinfo=http_cache.timezone.utc), usegmt=True)
+    assert client.get("/api/reports/x", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    # Next day, same watermark: the default "last 30 days" body has moved on
+    frozen_clock(monkeypatch, datetime(2025, 3, 2, 0, 5, 0))
+    response = client.get("/api/reports/x", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == "Sun, 02 Mar 2025 00:00:00 GMT"
+    assert client.get("/api/reports/x", headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+
+
+def test_failed_watermark_read_keeps_the_last_version():
+    changes = []
+    later = datetime(2025, 3, 2)
+    version = StubVersion([WATERMARK, RuntimeError("ORA-12541: no listener"), later], on_change=lambda: changes.append(1))
+
+    async def read_three():
+        return [await version.get() for _ in range(3)]
+
+    assert asyncio.run(read_three()) == [WATERMARK, WATERMARK, later]
+    # Caches were dropped for the first version and the real change, not the failed read
+    assert len(changes) == 2
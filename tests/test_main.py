@@ -0,0 +1,81 @@
+"""API endpoints against the stand-in database."""
+from __future__ import annotations
+
+import inspect
+import json
+
+import pytest
+
+from api.crud import _padded_in_list
+from api.database import get_db_session
+from api.main import app
+
+
+@pytest.fixture
+def client(local_db, breaker):
+    from starlette.testclient import TestClient
+
+    return TestClient(app)  # no lifespan: the pool and warm-up are not needed on the stand-in
+
+
+def test_database_endpoints_run_in_threadpool():
+    # execute_query sleeps between retries; on the event loop that would stall every request
+    routes = [
+        route for route in app.routes
+        if hasattr(route, "dependant") and any(d.call is get_db_session for d in route.dependant.dependencies)
+    ]
+    assert routes
+    for route in routes:
+        assert not inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_top_products(client):
+    response = client.get("/api/reports/top-products", params={"limit": 3})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+
+def test_activity_of_unknown_channel_is_404(client, local_db):
+    assert client.get("/api/channels/no-such-channel/activity").status_code == 404
+    params = {"start_date": local_db.start.isoformat(), "end_date": local_db.end.isoformat()}
+    assert client.get(f"/api/channels/{local_db.channels[0]}/activity", params=params).status_code == 200
+
+
+@pytest.mark.parametrize("fmt", ["rows", "columnar"])
+def test_bulk_channel_activity(client, local_db, fmt):
+    known = list(reversed(local_db.channels))
+    params = {"start_date": local_db.start.isoformat(), "end_date": local_db.end.isoformat(), "format": fmt}
+    requested = [known[0], "no-such-channel", known[1], known[0], *known[2:]]
+    response = client.get("/api/channels/activity", params={**params, "channel": requested})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    payloads = [json.loads(line) for line in response.text.splitlines()]
+
+    # Request order, duplicates collapsed
+    assert [p["channel_name"] for p in payloads] == [known[0], "no-such-channel", *known[1:]]
+    unknown = payloads[1]
+    assert (unknown["total_messages"], unknown["total_media"]) == (0, 0)
+    assert not (unknown.get("activity_history") or any(unknown.get("activity_columns", {}).values()))
+
+    for payload in payloads:
+        if payload["channel_name"] == "no-such-channel":
+            continue
+        single = client.get(f"/api/channels/{payload['channel_name']}/activity", params=params)
+        assert single.status_code == 200
+        assert payload == single.json()
+
+
+def test_bulk_channel_activity_caps_the_channel_count(client):
+    response = client.get("/api/channels/activity", params={"channel": [f"chan-{i}" for i in range(101)]})
+    assert response.status_code == 422
+    # Duplicates do not count against the cap
+    assert client.get("/api/channels/activity", params={"channel": ["chan-a"] * 150}).status_code == 200
+
+
+def test_padded_in_list_rounds_up_to_a_power_of_two():
+    placeholders, params = _padded_in_list("c", ("a", "b", "c"))
+    assert placeholders.count(":c") == 8
+    assert list(params.values()) == ["a", "b", "c"] + ["c"] * 5
+    assert _padded_in_list("c", tuple(range(9)))[0].count(":c") == 16
+    assert _padded_in_list("c", tuple(range(16)))[0].count(":c") == 16
@@ -0,0 +1,81 @@
+"""Product mention extraction (`src.mentions`)."""
+from __future__ import annotations
+
+from src.mentions import (
+    ALIAS_CONFIDENCE,
+    EXACT_CONFIDENCE,
+    FUZZY_PENALTY,
+    MentionExtractor,
+    ensure_mentions_table,
+    store_mentions,
+)
+
+CATALOGUE = {
+    "Vitamin": [],
+    "Vitamin C": ["vit c", "ascorbic acid"],
+    "Paracetamol": ["panadol"],
+    "Zinc": [],
+}
+
+
+def found(extractor: MentionExtractor, text: str) -> dict:
+    return {m.product_name: (m.confidence, m.fuzzy) for m in extractor.extract(text)}
+
+
+def test_longest_match_wins_where_entries_overlap():
+    extractor = MentionExtractor(CATALOGUE)
+    assert found(extractor, "New vitamin C serum in stock") == {"Vitamin C": (EXACT_CONFIDENCE, False)}
+    # Without the longer entry following, the shorter one still matches
+    assert found(extractor, "vitamin tablets, and vitamin c") == {
+        "Vitamin": (EXACT_CONFIDENCE, False),
+        "Vitamin C": (EXACT_CONFIDENCE, False),
+    }
+
+
+def test_alias_matches_get_alias_confidence():
+    extractor = MentionExtractor(CATALOGUE)
+    assert found(extractor, "Panadol 500mg and ascorbic acid") == {
+        "Paracetamol": (ALIAS_CONFIDENCE, False),
+        "Vitamin C": (ALIAS_CONFIDENCE, False),
+    }
+    # Both forms in one message: the better confidence is kept
+    assert found(extractor, "panadol (paracetamol)")["Paracetamol"] == (EXACT_CONFIDENCE, False)
+
+
+def test_fuzzy_correction_only_for_long_enough_words():
+    extractor = MentionExtractor(CATALOGUE, min_fuzzy_length=5)
+    assert found(extractor, "paracetmol available") == {
+        "Paracetamol": (round(EXACT_CONFIDENCE * FUZZY_PENALTY, 4), True),
+    }
+    # "zinx" is one edit from "zinc" but shorter than min_fuzzy_length
+    assert found(extractor, "zinx tablets") == {}
+    assert found(MentionExtractor(CATALOGUE, min_fuzzy_length=4), "zinx tablets") == {
+        "Zinc": (round(EXACT_CONFIDENCE * FUZZY_PENALTY, 4), True),
+    }
+    assert found(MentionExtractor(CATALOGUE, fuzzy=False), "paracetmol") == {}
+
+
+def test_store_mentions_replaces_earlier_rows(local_db):
+    from src.db import get_connection
+
+    extractor = MentionExtractor(CATALOGUE)
+    messages = [(1, "chan-a", "panadol and vitamin c"), (2, "chan-a", "zinc"), (1, "chan-b", "zinc")]
+    with get_connection() as conn:
+        cur = conn.cursor()
+        ensure_mentions_table(cur)
+        store_mentions(cur, [(mid, slug) for mid, slug, _ in messages], extractor.extract_batch(messages))
+        conn.commit()
+
+        # Message 1 of chan-a was edited; re-extract only that message
+        edited = [(1, "chan-a", "paracetmol only")]
+        store_mentions(cur, [(1, "chan-a")], extractor.extract_batch(edited))
+        conn.commit()
+        cur.execute("""
+            SELECT channel_slug, message_id, product_name, match_type
+            FROM telegram_raw.product_mentions ORDER BY channel_slug, message_id, product_name
+        """)
+        assert cur.fetchall() == [
+            ("chan-a", 1, "Paracetamol", "fuzzy"),
+            ("chan-a", 2, "Zinc", "exact"),
+            ("chan-b", 1, "Zinc", "exact"),
+        ]
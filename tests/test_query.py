@@ -0,0 +1,91 @@
+"""Circuit breaker accounting for streamed reads (`api.query.guarded_stream`)."""
+from __future__ import annotations
+
+import pytest
+
+from api.query import CircuitOpenError, guarded_stream
+
+
+def _half_open(breaker, monkeypatch):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    monkeypatch.setattr(breaker, "reset_seconds", 0)
+    assert breaker.state == "half-open"
+
+
+def test_completed_stream_closes_half_open_circuit(breaker, monkeypatch):
+    _half_open(breaker, monkeypatch)
+    assert list(guarded_stream(iter([b"a", b"b"]))) == [b"a", b"b"]
+    assert breaker.state == "closed"
+
+
+def test_abandoned_stream_releases_probe(breaker, monkeypatch):
+    _half_open(breaker, monkeypatch)
+    stream = guarded_stream(iter([b"a", b"b"]))
+    next(stream)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # the probe is in flight
+    stream.close()
+    assert breaker.state == "half-open"
+    breaker.before_call()  # the next call gets to probe
+
+
+def test_transient_error_reopens_circuit(breaker, monkeypatch):
+    _half_open(breaker, monkeypatch)
+
+    def failing():
+        yield b"a"
+        raise RuntimeError("ORA-03113: end-of-file on communication channel")
+
+    stream = guarded_stream(failing())
+    next(stream)
+    monkeypatch.setattr(breaker, "reset_seconds", 60)
+    with pytest.raises(RuntimeError):
+        next(stream)
+    assert breaker.state == "open"
+
+
+def test_export_during_half_open_does_not_block_next_request(local_db, breaker, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from starlette.testclient import TestClient
+
+    from api.main import app
+
+    client = TestClient(app)  # no lifespan: the pool and warm-up are not needed on the stand-in
+    _half_open(breaker, monkeypatch)
+
+    response = client.get("/api/export/messages", params={"column": ["message_id", "channel"]})
+    assert response.status_code == 200
+    assert response.content
+    assert breaker.state == "closed"
+
+    assert client.get("/api/reports/top-products").status_code == 200
+
+
+def test_transient_connect_error_counts_towards_opening(local_db, breaker, monkeypatch):
+    from api import database
+
+    def refuse():
+        raise RuntimeError("DPY-6005: cannot connect to database")
+
+    monkeypatch.setattr(database, "_connect", refuse)
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RuntimeError, match="DPY-6005"):
+            with database.get_db():
+                pass
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        with database.get_db():
+            pass
+
+
+def test_open_circuit_answers_503_before_connecting(local_db, breaker):
+    from starlette.testclient import TestClient
+
+    from api.main import app
+
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    response = TestClient(app).get("/api/reports/top-products")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
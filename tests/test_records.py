@@ -0,0 +1,27 @@
+"""Message projection (`src.scraper.records`) for Telethon objects and `to_dict()` trees."""
+from __future__ import annotations
+
+import pytest
+
+from benchmarks import synthetic
+from src.scraper.records import MessageRecord, compact_payload
+
+pytest.importorskip("telethon")
+
+
+def test_object_and_dict_projections_agree():
+    records = list(synthetic.iter_messages(synthetic.channel_names(2), 300))
+    assert {rec["media_type"] for rec in records} >= {None, "image"}
+    for rec in records:
+        message = synthetic.telethon_message(rec)
+        projected = MessageRecord.from_message(message).to_dict()
+        assert projected == MessageRecord.from_message(message.to_dict()).to_dict()
+        assert compact_payload(message.to_dict()) == projected
+
+
+def test_photo_keeps_downloadable_sizes_only():
+    rec = next(rec for rec in synthetic.iter_messages(synthetic.channel_names(1), 50) if rec["media_type"] == "image")
+    record = MessageRecord.from_message(synthetic.telethon_message(rec), keep_raw=True)
+    assert record.media_type == "image"
+    assert record.photo["sizes"] and all(size["w"] and size["size"] for size in record.photo["sizes"])
+    assert record.raw["_"] == "Message"
@@ -0,0 +1,28 @@
+"""Sentiment scores (`src.sentiment`) stored per channel and message id."""
+from __future__ import annotations
+
+from src.db.local import connect_local
+from src.sentiment import SentimentStage, sync_mart
+
+
+def test_scores_are_kept_per_channel(tmp_path):
+    conn = connect_local(tmp_path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO telegram_mart.channels (channel_id, channel_name) VALUES (1, 'chan-a'), (2, 'chan-b')")
+    cur.execute("INSERT INTO telegram_mart.messages (message_id, channel_id, message_text) VALUES (7, 2, 'bad')")
+
+    stage = SentimentStage(cur)
+    scores = stage.process([("chan-a", 7, "great quality, excellent price"), ("chan-b", 7, "terrible, broken and fake")])
+    assert set(scores) == {("chan-a", 7), ("chan-b", 7)}
+    assert scores["chan-a", 7][0] > 0 > scores["chan-b", 7][0]
+
+    # Rescoring one replaces only that channel's row
+    stage.process([("chan-a", 7, "excellent")])
+    cur.execute("SELECT channel_slug, message_id FROM telegram_raw.message_sentiment ORDER BY channel_slug")
+    assert cur.fetchall() == [("chan-a", 7), ("chan-b", 7)]
+
+    # The mart row of chan-b's message 7 gets chan-b's score
+    sync_mart(cur)
+    cur.execute("SELECT sentiment_score FROM telegram_mart.messages WHERE message_id = 7")
+    assert cur.fetchone()[0] == round(scores["chan-b", 7][0], 4)
+    conn.close()
@@ -0,0 +1,22 @@
+"""Similar-message search (`src.similar`) keyed by channel and message id."""
+from __future__ import annotations
+
+from src.similar import SimilarIndex
+from tests.test_dedup import ADVERT, OTHER
+
+
+def test_message_ids_are_scoped_to_their_channel(tmp_path):
+    index = SimilarIndex()
+    index.add([("chan-a", 7, ADVERT), ("chan-b", 7, OTHER), ("chan-c", 8, ADVERT.replace("1500", "1450"))])
+    index.compact()
+
+    hits = index.similar_to("chan-a", 7, k=1)
+    assert [(slug, mid) for slug, mid, _ in hits] == [("chan-c", 8)]
+    # Only chan-b's own message 7 is excluded from its results, not chan-a's
+    assert {(slug, mid) for slug, mid, _ in index.similar_to("chan-b", 7)} == {("chan-a", 7), ("chan-c", 8)}
+    assert index.similar_to("chan-z", 7) is None
+
+    index.save(tmp_path / "similar.idx")
+    loaded = SimilarIndex.load(tmp_path / "similar.idx")
+    assert loaded.similar_to("chan-a", 7, k=1)[0][:2] == ("chan-c", 8)
+    assert loaded.vector_of("chan-b", 7) is not None
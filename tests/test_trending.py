@@ -0,0 +1,84 @@
+"""Streaming trend detection (`src.trending`): sketches, heavy hitters and snapshots."""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+from src.trending import CountMinSketch, SnapshotReader, SpaceSaving, TrendingStore, update_snapshot
+
+NOW = datetime(2025, 3, 1, 12, 30, 0)
+
+
+def mentions(product: str, count: int, channel: str = "chan-a", first_id: int = 1):
+    return [(NOW, channel, first_id + i, product) for i in range(count)]
+
+
+def test_reloading_a_batch_does_not_double_count():
+    store = TrendingStore(top_k=8)
+    batch = mentions("paracetamol", 5) + mentions("vitamin c", 3, first_id=100)
+    assert store.add_mentions(batch) == 8
+    assert store.add_mentions(batch) == 0
+    # Two products in one message are both counted, once
+    assert store.add_mentions([(NOW, "chan-a", 1, "paracetamol"), (NOW, "chan-a", 1, "ibuprofen")]) == 0
+    assert store.add_mentions([(NOW, "chan-a", 500, "ibuprofen"), (NOW, "chan-a", 500, "zinc")]) == 2
+    # The same message id in another channel is another message
+    assert store.add_mentions(mentions("paracetamol", 1, channel="chan-b")) == 1
+
+    products = {p["product_name"]: p["mention_count"] for p in store.trending(hours=1, min_count=1, now=NOW)["products"]}
+    assert products == {"paracetamol": 6, "vitamin c": 3, "ibuprofen": 1, "zinc": 1}
+
+
+def test_heavy_hitters_survive_eviction():
+    summary = SpaceSaving(k=4)
+    for i in range(1000):
+        summary.offer("heavy")
+        summary.offer(f"rare-{i}")
+    assert "heavy" in summary.counts
+    # Over-counted by at most N/k, never under-counted
+    assert 1000 <= summary.counts["heavy"] <= 1000 + 2000 / 4
+
+    # Guaranteed to be kept: more than N/k = 300/4 mentions, arriving before the noise
+    store = TrendingStore(top_k=4)
+    events = mentions("amoxicillin", 100)
+    events += [(NOW, "chan-a", 1000 + i, f"product-{i}") for i in range(200)]
+    store.add_mentions(events)
+    top = store.trending(hours=1, min_count=10, now=NOW)["products"]
+    assert [p["product_name"] for p in top] == ["amoxicillin"]
+    assert top[0]["mention_count"] >= 100
+
+
+def test_count_min_never_underestimates():
+    sketch = CountMinSketch(width=16, depth=4)
+    truth = {f"key-{i}": i % 7 + 1 for i in range(200)}
+    for key, count in truth.items():
+        sketch.add(key, count)
+    assert all(sketch.estimate(key) >= count for key, count in truth.items())
+
+
+def test_reader_reloads_a_snapshot_written_by_another_process(tmp_path):
+    path = tmp_path / "trending.bin"
+    with update_snapshot(path) as store:
+        store.add_mentions(mentions("paracetamol", 5))
+    reader = SnapshotReader(path, check_interval=0)
+    first = reader.get(0.0)
+    assert first.trending(hours=1, min_count=1, now=NOW)["products"][0]["mention_count"] == 5
+    assert reader.get(1.0) is first
+
+    # Another process (the loader) adds mentions to the same snapshot
+    code = (
+        "from datetime import datetime\n"
+        "from src.trending import update_snapshot\n"
+        f"with update_snapshot({str(path)!r}) as store:\n"
+        f"    store.add_mentions([(datetime({NOW.year}, {NOW.month}, {NOW.day}, {NOW.hour}), 'chan-a', 100 + i, 'paracetamol') for i in range(3)])\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root)
+    stamp = path.stat().st_mtime + 5
+    os.utime(path, (stamp, stamp))  # coarse filesystem clocks: make the change visible
+
+    reloaded = reader.get(2.0)
+    assert reloaded is not first
+    assert reloaded.trending(hours=1, min_count=1, now=NOW)["products"][0]["mention_count"] == 8
+
@@ -0,0 +1,37 @@
+"""Data-version watermark (`src.db.watermark`) on the SQLite stand-in."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from src.db.local import connect_local
+from src.db.watermark import bump_watermark, read_watermark
+
+
+class _RecordingCursor:
+    def __init__(self, cur) -> None:
+        self._cur = cur
+        self.statements = []
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(statement)
+        return self._cur.execute(statement, parameters)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def test_bump_joins_the_callers_transaction(tmp_path):
+    conn = connect_local(tmp_path)
+    cur = _RecordingCursor(conn.cursor())
+    bump_watermark(cur, "raw", datetime(2025, 3, 1))
+    bump_watermark(cur, "raw", datetime(2025, 3, 2))
+    # DDL would implicitly commit the caller's pending writes on Oracle
+    assert all(s.split()[0].upper() in ("UPDATE", "INSERT") for s in cur.statements)
+    conn.rollback()
+    assert read_watermark(conn.cursor()) is None
+
+    bump_watermark(cur, "raw", datetime(2025, 3, 2))
+    bump_watermark(cur, "mart", datetime(2025, 3, 3))
+    conn.commit()
+    assert read_watermark(conn.cursor()) == datetime(2025, 3, 3)
+    conn.close()
@@ -0,0 +1,229 @@
+"""Channel leases (`src.scraper.work_queue`) on the SQLite stand-in."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.db.local import connect_local
+from src.scraper.work_queue import LeaseLost, WorkQueue
+
+T0 = datetime(2025, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def open_queue(tmp_path):
+    """Factory for queues on separate connections to one database, like workers on separate hosts."""
+    conns = []
+
+    def factory(conn_wrapper=None) -> WorkQueue:
+        conn = connect_local(tmp_path)
+        conns.append(conn)
+        queue = WorkQueue(conn_wrapper(conn) if conn_wrapper else conn, lease_seconds=300, interval_seconds=3600, retry_seconds=60)
+        queue.ensure_table()
+        return queue
+
+    yield factory
+    for conn in conns:
+        conn.close()
+
+
+class _ClaimAfterSelect:
+    """Connection proxy that runs `between()` right after `claim` read its candidates."""
+
+    def __init__(self, conn, between) -> None:
+        self._conn = conn
+        self._between = between
+
+    def cursor(self):
+        return _InterleavedCursor(self._conn.cursor(), self._between)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _InterleavedCursor:
+    def __init__(self, cur, between) -> None:
+        self._cur = cur
+        self._between = between
+        self._candidates = False
+
+    def execute(self, statement, parameters=None):
+        self._candidates = "FETCH FIRST" in statement
+        self._cur.execute(statement, parameters)
+        return self
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        if self._candidates:
+            self._between()
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def test_claim_race_leases_each_channel_once(open_queue):
+    b = open_queue()
+    b.enqueue(["chan-a"], now=T0)
+    won_by_b = []
+    a = open_queue(lambda conn: _ClaimAfterSelect(conn, lambda: won_by_b.extend(b.claim("worker-b", now=T0))))
+
+    # A saw chan-a as a candidate, but B leased it before A's conditional UPDATE
+    assert a.claim("worker-a", now=T0) == []
+    assert [lease.channel_slug for lease in won_by_b] == ["chan-a"]
+    assert [row[2] for row in a.status()] == ["worker-b"]
+
+
+def test_concurrent_workers_never_share_a_channel(open_queue):
+    channels = [f"chan-{i}" for i in range(20)]
+    open_queue().enqueue(channels, now=T0)
+    queues = [open_queue() for _ in range(2)]
+    claimed = [[], []]
+    start = threading.Barrier(len(queues))
+
+    def work(i):
+        start.wait()
+        while True:
+            leases = queues[i].claim(f"worker-{i}", limit=2, now=T0)
+            if not leases:
+                return
+            claimed[i].extend(lease.channel_slug for lease in leases)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(len(queues))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed[0] + claimed[1]) == sorted(channels)
+
+
+def test_stale_lease_version_cannot_renew_or_release(open_queue):
+    queue = open_queue()
+    queue.enqueue(["chan-a"], now=T0)
+    (stale,) = queue.claim("worker-a", now=T0)
+
+    # worker-a stalls past its lease; worker-b takes the channel over
+    later = T0 + timedelta(seconds=301)
+    (current,) = queue.claim("worker-b", now=later)
+    assert current.version == stale.version + 1
+
+    with pytest.raises(LeaseLost):
+        queue.renew(stale, now=later)
+    assert queue.release(stale, message_count=10, now=later) is False
+    # Same owner, old version: still refused
+    with pytest.raises(LeaseLost):
+        queue.renew(replace(current, version=stale.version), now=later)
+
+    assert queue.renew(current, now=later).expires_at == later + timedelta(seconds=300)
+    assert queue.release(current, message_count=10, now=later) is True
+
+
+def test_expired_lease_is_reclaimed(open_queue):
+    queue = open_queue()
+    queue.enqueue(["chan-a"], now=T0)
+    (first,) = queue.claim("worker-a", now=T0)
+    assert first.reclaimed_from is None
+
+    # Not while the lease is live
+    assert queue.claim("worker-b", now=T0 + timedelta(seconds=299)) == []
+    (second,) = queue.claim("worker-b", now=T0 + timedelta(seconds=301))
+    assert second.worker_id == "worker-b"
+    assert second.reclaimed_from == "worker-a"
+
+
+def test_release_schedules_next_run_with_backoff(open_queue):
+    queue = open_queue()
+    queue.enqueue(["chan-a"], now=T0)
+
+    def next_run_at():
+        return queue.status()[0][1]
+
+    now = T0
+    delays = []
+    for _ in range(8):
+        (lease,) = queue.claim("worker-a", now=now)
+        assert queue.release(lease, error="FloodWaitError: wait 60s", now=now)
+        delays.append((next_run_at() - now).total_seconds())
+        now = next_run_at()
+    # 60s doubling per consecutive failure, capped at the regular interval
+    assert delays == [60, 120, 240, 480, 960, 1920, 3600, 3600]
+    assert queue.status()[0][4] == 8
+
+    (lease,) = queue.claim("worker-a", now=now)
+    assert lease.attempts == 8
+    assert queue.release(lease, message_count=5, now=now)
+    assert (next_run_at() - now).total_seconds() == 3600
+    assert queue.status()[0][4] == 0
+
+
+def test_lost_lease_stops_the_download_before_returning(open_queue, monkeypatch):
+    from src.scraper.work_queue import work_lease
+
+    class SlowScraper:
+        stopped = False
+
+        async def fetch_history(self, channel, limit):
+            try:
+                await asyncio.sleep(60)
+            finally:
+                self.stopped = True
+
+    queue = open_queue()
+    queue.lease_seconds = 0.03  # renew every 10ms
+    queue.enqueue(["chan-a"])
+    (lease,) = queue.claim("worker-a")
+
+    def lost(lease, now=None):
+        raise LeaseLost("taken over by worker-b")
+
+    monkeypatch.setattr(queue, "renew", lost)
+    scraper = SlowScraper()
+
+    async def run():
+        assert await work_lease(scraper, queue, lease) is False
+        # Checked before asyncio.run() cancels leftover tasks on its own
+        assert scraper.stopped
+
+    asyncio.run(run())
+
+
+def test_lease_lost_during_the_last_batch_writes_nothing(open_queue, monkeypatch):
+    import src.scraper.collector as collector
+    from src.scraper.work_queue import work_lease
+
+    class Scraper:
+        async def fetch_history(self, channel, limit):
+            # worker-b reclaims the channel just as the download finishes
+            queue.conn.cursor().execute(
+                "UPDATE telegram_raw.scrape_queue SET lease_owner = 'worker-b', lease_version = lease_version + 1"
+            )
+            queue.conn.commit()
+            return [{"id": 1}]
+
+    saved = []
+    monkeypatch.setattr(collector, "save_messages", lambda channel, messages: saved.append(channel))
+    queue = open_queue()
+    queue.enqueue(["chan-a"])
+    (lease,) = queue.claim("worker-a")
+
+    assert asyncio.run(work_lease(Scraper(), queue, lease)) is False
+    assert saved == []
+    assert [row[2] for row in queue.status()] == ["worker-b"]
+
+
+def test_workers_must_share_one_lake(open_queue, tmp_path):
+    from src.scraper.work_queue import LAKE_MARKER, LakeMismatch
+
+    shared, local = tmp_path / "lake", tmp_path / "host-b-disk"
+    first, second = open_queue(), open_queue()
+    lake_id = first.check_lake(shared)
+    # Same lake on another host: agreed
+    assert second.check_lake(shared) == lake_id
+    assert (shared / LAKE_MARKER).read_text() == lake_id
+
+    with pytest.raises(LakeMismatch, match="DATA_LAKE_DIR"):
+        second.check_lake(local)